@@ -1,17 +1,23 @@
-from flask import Flask, redirect, url_for
+from flask import Flask, redirect, url_for, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, current_user
 from flask_admin import Admin
-from flask_admin.contrib.sqla import ModelView
+from flask_admin.contrib.sqla import ModelView, filters
 from flask_admin import AdminIndexView
 from flask_mail import Mail
 from app.config import Config
+from app.utility_modules.db_routing import RoutingSession, init_db_routing
+from app.utility_modules.metrics import init_metrics
 
 
 # Initialize Application and Extensions
 app = Flask(__name__)
 app.config.from_object(Config)
-database = SQLAlchemy(app)
+# The routing session sends read-only requests to the replicas when DATABASE_REPLICA_URLS is set
+database = SQLAlchemy(app, session_options={'class_': RoutingSession})
+init_db_routing(app, database)
+# Request, SQL and template timings for /metrics
+init_metrics(app)
 login_manager = LoginManager(app)
 
 # Initialize Mail
@@ -47,18 +53,108 @@ class RestrictedModelView(ModelView):
             return self.inaccessible_callback(name, **kwargs)
 
 
-class RatingView(RestrictedModelView):
+class UserView(RestrictedModelView):
+    # Role or confirmation changes must not wait for the user cache to expire
+    def after_model_change(self, form, model, is_created):
+        invalidate_cached_user(model.id)
+
+    def after_model_delete(self, model):
+        invalidate_cached_user(model.id)
+
+
+class CatalogView(RestrictedModelView):
+    # Derived from the genres list, never edited by hand
+    column_exclude_list = ('genre_mask',)
+    form_excluded_columns = ('genre_mask',)
+
+    # Any change to movies or genres invalidates the cached catalog and movie fragments
+    # and recomputes the recommender features (the normalization spans the whole catalog)
+    def after_model_change(self, form, model, is_created):
+        refresh_movie_features(database.session.connection())
+        database.session.commit()
+        bump_catalog_version()
+
+    def after_model_delete(self, model):
+        refresh_movie_features(database.session.connection())
+        database.session.commit()
+        bump_catalog_version()
+
+
+class LargeTableView(RestrictedModelView):
+    """
+    List view for tables that grow with the number of users (ratings, seen and to-watch lists).
+    User and movie are loaded in the page query, no exact COUNT(*) runs per page (an estimate is
+    shown instead) and the default newest-first order is paginated by id instead of OFFSET.
+    """
+    list_template = 'admin/keyset_list.html'
+    simple_list_pager = True
+    can_set_page_size = False
+    column_default_sort = ('id', True)
+    # Date column offered as a range filter
+    date_column = 'date_added'
+
+    def __init__(self, model, *args, **kwargs):
+        # Built per model because one view class serves several tables
+        # The 'user' and 'movie' relationships are joined into the page query (no lazy load per row)
+        self.column_select_related_list = (model.user, model.movie)
+        self.column_filters = self.indexed_filters(model)
+        super().__init__(model, *args, **kwargs)
+
+    def indexed_filters(self, model):
+        # Only filters backed by an index: user (unique username or id), movie id and date range
+        return [
+            filters.FilterEqual(User.username, 'User'),
+            filters.IntEqualFilter(model.user_id, 'User ID'),
+            filters.IntEqualFilter(model.movie_id, 'Movie ID'),
+            filters.DateTimeBetweenFilter(getattr(model, self.date_column), 'Date')
+        ]
+
+    def keyset_enabled(self):
+        # Keyset pagination only follows the default order; sorting by another column falls back to pages
+        return request.args.get('sort') is None
+
+    def keyset_url(self, after=None):
+        # Current list URL (filters included) starting after the given id
+        args = request.args.to_dict()
+        args.pop('page', None)
+        args.pop('after', None)
+        if after is not None:
+            args['after'] = after
+        return url_for('.index_view', **args)
+
+    def estimated_total(self):
+        return estimated_row_count(self.model)
+
+    def _apply_pagination(self, query, page, page_size):
+        after = request.args.get('after', type=int) if self.keyset_enabled() else None
+        if after is not None:
+            # WHERE id < last id of the previous page: deep pages cost the same as the first one
+            query = query.filter(self.model.id < after)
+            page = 0
+        return super()._apply_pagination(query, page, page_size)
+
+
+class RatingView(LargeTableView):
     # Listing columns (uses unified 'user' and 'movie' relationships)
-    column_list = ('id', 'user', 'movie', 'score', 'timestamp') 
-    # Simplified filter to avoid AttributeErrors during initialization
-    column_filters = ('score',) 
+    column_list = ('id', 'user', 'movie', 'score', 'timestamp')
+    date_column = 'timestamp'
 
+    def indexed_filters(self, model):
+        # Score is not indexed on its own, but cheap once combined with the user filter
+        return super().indexed_filters(model) + [filters.IntEqualFilter(model.score, 'Score')]
 
-class ListView(RestrictedModelView):
+
+class ListView(LargeTableView):
     # Listing columns (uses unified 'user' and 'movie' relationships)
-    column_list = ('id', 'user', 'movie', 'date_added') 
-    # Simplified filter
-    column_filters = ()
+    column_list = ('id', 'user', 'movie', 'date_added')
+
+
+class OutboxView(RestrictedModelView):
+    # Queued emails are written by the application only, the panel is for monitoring and retries
+    can_create = False
+    column_list = ('id', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'last_error', 'created_at', 'sent_at')
+    column_filters = ('status',)
+    column_default_sort = ('id', True)
 
 
 # Initialize Flask-Admin
@@ -71,14 +167,23 @@ admin = Admin(app,
 
 # Import Models and Add Views
 # Import moved here (after 'app' and 'database' are defined)
-from app.models import User, Movie, Rating, SeenList, ToWatchList 
+from app.models import User, Movie, Rating, SeenList, ToWatchList, OutgoingEmail
+from app.utility_modules.page_cache import bump_catalog_version
+from app.utility_modules.movie_features import refresh_movie_features
+from app.utility_modules.genre_mask import init_genre_masks
+from app.utility_modules.sql_helpers import estimated_row_count
+from app.utility_modules.user_cache import load_cached_user, invalidate_cached_user
+
+# Movie.genre_mask follows every ORM change of Movie.genres (admin edits included)
+init_genre_masks(RoutingSession)
 
 # Add Model Views (using custom classes)
-admin.add_view(RestrictedModelView(User, database.session, name="1. Users"))
-admin.add_view(RestrictedModelView(Movie, database.session, name="2. Movie Catalog"))
+admin.add_view(UserView(User, database.session, name="1. Users"))
+admin.add_view(CatalogView(Movie, database.session, name="2. Movie Catalog"))
 admin.add_view(RatingView(Rating, database.session, name="3. Ratings"))
 admin.add_view(ListView(SeenList, database.session, name="4. Seen Lists"))
 admin.add_view(ListView(ToWatchList, database.session, name="5. To Watch Lists"))
+admin.add_view(OutboxView(OutgoingEmail, database.session, name="6. Email Outbox"))
 
 
 # User Loader and Routes
@@ -87,8 +192,8 @@ login_manager.login_message_category = 'info'
 
 @login_manager.user_loader
 def load_user(user_id):
-    # User is now available
-    return User.query.get(int(user_id))
+    # Served from a short-lived cache of the authentication fields (no query in the common case)
+    return load_cached_user(int(user_id))
 
 # Import routes to register them with the application (Last line)
 from app import routes
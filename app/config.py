@@ -17,3 +17,104 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
+
+    # Rendered fragment cache for the catalog and movie pages
+    # Backend can be 'memory' (per worker LRU), 'filesystem' (shared by all workers) or 'none'; both keep
+    # the catalog version in PAGE_CACHE_DIR (default instance/page_cache), shared by every process
+    PAGE_CACHE_BACKEND = os.environ.get('PAGE_CACHE_BACKEND', 'memory')
+    PAGE_CACHE_DIR = os.environ.get('PAGE_CACHE_DIR')
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL') or 300)
+    PAGE_CACHE_MAX_BYTES = int(os.environ.get('PAGE_CACHE_MAX_BYTES') or 64 * 1024 * 1024)
+
+    # Outbound email queue (see app/utility_modules/mail_dispatcher.py)
+    MAIL_WORKER_BATCH_SIZE = int(os.environ.get('MAIL_WORKER_BATCH_SIZE') or 50)
+    MAIL_WORKER_POLL_INTERVAL = float(os.environ.get('MAIL_WORKER_POLL_INTERVAL') or 5)
+    MAIL_WORKER_MAX_ATTEMPTS = int(os.environ.get('MAIL_WORKER_MAX_ATTEMPTS') or 6)
+    # Start the worker as a thread of the development server instead of a separate process
+    MAIL_WORKER_THREAD = os.environ.get('MAIL_WORKER_THREAD') == 'True'
+
+    # Seconds the authentication fields of a logged-in user are reused without a query (0 disables)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 60)
+
+    # Ratings import (CSV exports from other sites)
+    IMPORT_MAX_BYTES = int(os.environ.get('IMPORT_MAX_BYTES') or 5 * 1024 * 1024)
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE') or 1000)
+    # Jobs are processed by import_worker.py (see app/utility_modules/ratings_importer.py)
+    IMPORT_WORKER_POLL_INTERVAL = float(os.environ.get('IMPORT_WORKER_POLL_INTERVAL') or 2)
+    # Seconds without a heartbeat after which a running job counts as abandoned (worker crashed or
+    # was stopped) and is claimed again, and claims after which a job is given up
+    IMPORT_JOB_LEASE_SECONDS = int(os.environ.get('IMPORT_JOB_LEASE_SECONDS') or 300)
+    IMPORT_MAX_ATTEMPTS = int(os.environ.get('IMPORT_MAX_ATTEMPTS') or 3)
+    # Start the worker as a thread of the development server instead of a separate process
+    IMPORT_WORKER_THREAD = os.environ.get('IMPORT_WORKER_THREAD') == 'True'
+
+    # Read replicas (comma-separated database URLs); read-only requests are spread over them
+    DATABASE_REPLICA_URLS = [url.strip() for url in (os.environ.get('DATABASE_REPLICA_URLS') or '').split(',') if url.strip()]
+    # Registered as extra binds 'replica_0', 'replica_1', ... (no model uses them, so create_all() leaves them alone)
+    SQLALCHEMY_BINDS = {f'replica_{index}': url for index, url in enumerate(DATABASE_REPLICA_URLS)}
+    # Seconds a user keeps reading from the primary after a write (read-your-writes while replicas catch up)
+    REPLICA_READ_YOUR_WRITES_SECONDS = float(os.environ.get('REPLICA_READ_YOUR_WRITES_SECONDS') or 5)
+
+    # Prometheus metrics (request latency, SQL and template timings) exposed at /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+    # When set, /metrics also requires 'Authorization: Bearer <token>' (Prometheus bearer_token)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # OMDb metadata enrichment (database/update_metadata.py)
+    OMDB_API_KEY = os.environ.get('OMDB_API_KEY')
+    OMDB_BASE_URL = os.environ.get('OMDB_BASE_URL') or 'http://www.omdbapi.com/'
+    # Average and burst request rate allowed by the API plan
+    OMDB_REQUESTS_PER_SECOND = float(os.environ.get('OMDB_REQUESTS_PER_SECOND') or 5)
+    OMDB_BURST = int(os.environ.get('OMDB_BURST') or 10)
+    OMDB_WORKERS = int(os.environ.get('OMDB_WORKERS') or 8)
+    OMDB_MAX_RETRIES = int(os.environ.get('OMDB_MAX_RETRIES') or 4)
+    # Movies written to the database per transaction
+    OMDB_WRITE_BATCH_SIZE = int(os.environ.get('OMDB_WRITE_BATCH_SIZE') or 200)
+    # Response cache (SQLite file, defaults to instance/omdb_cache.sqlite3) and days before a cached field is refetched
+    OMDB_CACHE_PATH = os.environ.get('OMDB_CACHE_PATH')
+    OMDB_VOLATILE_TTL_DAYS = float(os.environ.get('OMDB_VOLATILE_TTL_DAYS') or 30)     # rating, votes, metascore
+    OMDB_STABLE_TTL_DAYS = float(os.environ.get('OMDB_STABLE_TTL_DAYS') or 365)        # poster, runtime, rated, box office
+    OMDB_MISSING_TTL_DAYS = float(os.environ.get('OMDB_MISSING_TTL_DAYS') or 90)       # 'Movie not found!' answers
+    # Requests per day update_metadata.py may spend (the free API plan allows 1000)
+    OMDB_DAILY_REQUEST_BUDGET = int(os.environ.get('OMDB_DAILY_REQUEST_BUDGET') or 1000)
+
+    # Poster cache (see app/utility_modules/poster_cache.py), filled by database/cache_posters.py
+    # Directory of the resized posters (defaults to instance/posters; Caddy serves it at /posters/)
+    POSTER_CACHE_DIR = os.environ.get('POSTER_CACHE_DIR')
+    # Download threads and request rate allowed towards the image hosts
+    POSTER_WORKERS = int(os.environ.get('POSTER_WORKERS') or 8)
+    POSTER_REQUESTS_PER_SECOND = float(os.environ.get('POSTER_REQUESTS_PER_SECOND') or 20)
+    POSTER_MAX_RETRIES = int(os.environ.get('POSTER_MAX_RETRIES') or 3)
+    # Hours before a failed download is tried again, and failures in a row after which it is given up
+    # (until the movie gets another poster URL)
+    POSTER_RETRY_HOURS = float(os.environ.get('POSTER_RETRY_HOURS') or 24)
+    POSTER_MAX_FAILURES = int(os.environ.get('POSTER_MAX_FAILURES') or 5)
+
+    # Leaderboards (see app/utility_modules/leaderboards.py), refreshed by leaderboard_worker.py
+    # Seconds between incremental refreshes and hours between full rebuilds
+    LEADERBOARD_REFRESH_INTERVAL = float(os.environ.get('LEADERBOARD_REFRESH_INTERVAL') or 300)
+    LEADERBOARD_FULL_REFRESH_HOURS = float(os.environ.get('LEADERBOARD_FULL_REFRESH_HOURS') or 24)
+    # Days recounted by every incremental refresh (older changes mark their movie for a recount instead)
+    LEADERBOARD_LOOKBACK_DAYS = int(os.environ.get('LEADERBOARD_LOOKBACK_DAYS') or 2)
+    # Days counted by the trending leaderboard
+    LEADERBOARD_TRENDING_DAYS = int(os.environ.get('LEADERBOARD_TRENDING_DAYS') or 7)
+    # Weight (in ratings) of the global mean in the Bayesian average
+    LEADERBOARD_PRIOR_RATINGS = int(os.environ.get('LEADERBOARD_PRIOR_RATINGS') or 10)
+    # Largest page the API returns
+    LEADERBOARD_MAX_PER_PAGE = int(os.environ.get('LEADERBOARD_MAX_PER_PAGE') or 100)
+
+    # Seconds a worker reuses its catalog vectors before its background thread rebuilds them
+    RECOMMENDER_MODEL_TTL = float(os.environ.get('RECOMMENDER_MODEL_TTL') or 1800)
+    # Seconds between the checks of that thread (added movies are picked up at the next check)
+    RECOMMENDER_REFRESH_INTERVAL = float(os.environ.get('RECOMMENDER_REFRESH_INTERVAL') or 60)
+    # Intra-op threads of torch per process (Gunicorn already runs workers x threads requests in parallel)
+    RECOMMENDER_TORCH_THREADS = int(os.environ.get('RECOMMENDER_TORCH_THREADS') or 1)
+
+    # Cold-start recommendations (see app/utility_modules/cold_start.py), rebuilt by leaderboard_worker.py
+    COLD_START_REFRESH_INTERVAL = float(os.environ.get('COLD_START_REFRESH_INTERVAL') or 3600)
+    # Movies kept per list (overall and per genre)
+    COLD_START_LIST_SIZE = int(os.environ.get('COLD_START_LIST_SIZE') or 50)
+    # Votes of the prior in the quality score: movies with fewer votes are pulled towards the mean rating
+    COLD_START_PRIOR_VOTES = int(os.environ.get('COLD_START_PRIOR_VOTES') or 10000)
+    # IMDb votes one rating on this site counts as
+    COLD_START_LOCAL_RATING_WEIGHT = int(os.environ.get('COLD_START_LOCAL_RATING_WEIGHT') or 100)
@@ -10,10 +10,18 @@ movie_genre_association = database.Table('movie_genre_association', database.met
     database.Column('genre_id', database.Integer, database.ForeignKey('genre.id'), primary_key=True)
 )
 
+# Association table of the genres a user picked during onboarding (cold-start recommendations)
+user_favorite_genre = database.Table('user_favorite_genre', database.metadata,
+    database.Column('user_id', database.Integer, database.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True),
+    database.Column('genre_id', database.Integer, database.ForeignKey('genre.id', ondelete='CASCADE'), primary_key=True)
+)
+
 # The Genre model representing specific movie genres
 class Genre(database.Model):
     id = database.Column(database.Integer, primary_key=True)
     name = database.Column(database.String(50), unique=True, nullable=False)
+    # Position of the genre in Movie.genre_mask (see app/utility_modules/genre_mask.py)
+    bit = database.Column(database.SmallInteger, unique=True, nullable=True)
 
     def __repr__(self):
         return f"Genre: {self.name}"
@@ -61,7 +69,8 @@ class Movie(database.Model):
     release_year = database.Column(database.Integer, nullable=True)
     release_date = database.Column(database.Date, nullable=True)
     poster_url = database.Column(database.String(500), nullable=True)
-    imdb_rating = database.Column(database.String(10), nullable=True)
+    # Numeric since the migration in database/migrate_movie_features.py (stored as text before)
+    imdb_rating = database.Column(database.Numeric(3, 1, asdecimal=False), nullable=True)  # e.g., 8.7
     
     # New features added for machine learning purposes
     runtime_minutes = database.Column(database.Integer, nullable=True)  # e.g., 120
@@ -70,6 +79,9 @@ class Movie(database.Model):
     box_office = database.Column(database.BigInteger, nullable=True)    # e.g., 500000000
     rated = database.Column(database.String(10), nullable=True)         # e.g., "PG-13"
 
+    # Bitset of the movie's genres (one bit per Genre.bit), maintained on every genre change
+    genre_mask = database.Column(database.BigInteger, nullable=False, default=0, server_default='0')
+
     # Many-to-Many relationship to access movie genres using the association table
     genres = database.relationship(
         'Genre', 
@@ -81,10 +93,33 @@ class Movie(database.Model):
     # Relationship from Movie to Rating using back_populates
     ratings = database.relationship('Rating', back_populates='movie', lazy=True)
 
+    # Locally cached copy of the poster; the views rendering poster cards load it with selectinload
+    poster_image = database.relationship('PosterImage', uselist=False, lazy=True, viewonly=True)
+
     # String representation of the Movie model, crucial for Flask-Admin display
     def __repr__(self):
         return f"Movie: {self.title} ({self.release_year})"
 
+# Define MovieFeatures model (numeric features of a movie, cleaned and normalized for the recommender)
+# Derived from the Movie columns by app/utility_modules/movie_features.py whenever metadata changes
+class MovieFeatures(database.Model):
+    movie_id = database.Column(database.Integer, database.ForeignKey('movie.id', ondelete='CASCADE'), primary_key=True)
+    imdb = database.Column(database.Float, nullable=False)          # IMDb rating / 10 (0.5 when unknown)
+    # Min-max normalized over the catalog (missing values replaced by a default first)
+    runtime = database.Column(database.Float, nullable=False)
+    metascore = database.Column(database.Float, nullable=False)
+    box_office = database.Column(database.Float, nullable=False)
+    rated = database.Column(database.Float, nullable=False)         # G < PG < PG-13 < R
+
+# Define PosterImage model (the resized copies of a movie's poster on local disk, one row per movie with a poster)
+# Written by app/utility_modules/poster_cache.py; the files are named after content_hash
+class PosterImage(database.Model):
+    movie_id = database.Column(database.Integer, database.ForeignKey('movie.id', ondelete='CASCADE'), primary_key=True)
+    source_url = database.Column(database.String(500), nullable=False)     # Movie.poster_url the files were made from
+    content_hash = database.Column(database.String(64), nullable=True)     # None while the download keeps failing
+    checked_at = database.Column(database.DateTime, nullable=False, default=datetime.utcnow)
+    failures = database.Column(database.Integer, nullable=False, default=0)    # Failed downloads in a row
+
 # Define Rating model
 class Rating(database.Model):
     # Get rating details
@@ -102,7 +137,52 @@ class Rating(database.Model):
     timestamp = database.Column(database.DateTime, nullable=False, default=datetime.utcnow)
 
     # Make sure that an user can rate a movie only once
-    __table_args__ = (database.UniqueConstraint('user_id', 'movie_id', name='unique_user_movie_rating'),)
+    # Movie and date indexes back the admin filters (the unique constraint already covers user_id)
+    __table_args__ = (database.UniqueConstraint('user_id', 'movie_id', name='unique_user_movie_rating'),
+                      database.Index('ix_rating_movie_id', 'movie_id'),
+                      database.Index('ix_rating_timestamp', 'timestamp'))
+
+# Define RatingRollup model (ratings per movie and day, the time buckets of the leaderboards)
+# Rebuilt from Rating by app/utility_modules/leaderboards.py, never written by the request handlers
+class RatingRollup(database.Model):
+    movie_id = database.Column(database.Integer, database.ForeignKey('movie.id', ondelete='CASCADE'), primary_key=True)
+    day = database.Column(database.Date, primary_key=True)                      # UTC day of Rating.timestamp
+    ratings = database.Column(database.Integer, nullable=False)
+    score_sum = database.Column(database.Integer, nullable=False)
+
+    # The incremental refresh replaces the most recent days
+    __table_args__ = (database.Index('ix_rating_rollup_day', 'day'),)
+
+# Define MovieRatingStats model (all-time and recent rating totals of a movie, one row per rated movie)
+# Summed from RatingRollup by app/utility_modules/leaderboards.py; each leaderboard reads one index
+class MovieRatingStats(database.Model):
+    movie_id = database.Column(database.Integer, database.ForeignKey('movie.id', ondelete='CASCADE'), primary_key=True)
+    ratings = database.Column(database.Integer, nullable=False)
+    score_sum = database.Column(database.Integer, nullable=False)
+    last_rated = database.Column(database.Date, nullable=False)                 # Most recent bucket of the movie
+    recent_ratings = database.Column(database.Integer, nullable=False, default=0)       # Ratings in the trending window
+    bayesian_average = database.Column(database.Float, nullable=False, default=0)       # Average pulled towards the global mean
+
+    # Trending, highest rated and most rated (read backwards for the descending order)
+    __table_args__ = (database.Index('ix_movie_rating_stats_recent', 'recent_ratings', 'bayesian_average', 'movie_id'),
+                      database.Index('ix_movie_rating_stats_bayesian', 'bayesian_average', 'movie_id'),
+                      database.Index('ix_movie_rating_stats_ratings', 'ratings', 'movie_id'),
+                      database.Index('ix_movie_rating_stats_last_rated', 'last_rated'))
+
+# Define StaleRollupMovie model (movies whose older day buckets changed since the last refresh)
+# Marked in the transaction of a rating edit, deletion or import dated before the days an incremental
+# refresh recounts; app/utility_modules/leaderboards.py recounts their buckets and removes the row
+class StaleRollupMovie(database.Model):
+    movie_id = database.Column(database.Integer, database.ForeignKey('movie.id', ondelete='CASCADE'), primary_key=True)
+    marked_at = database.Column(database.DateTime, nullable=False)             # Latest change, so a refresh keeps newer marks
+
+# Define ColdStartPick model (precomputed recommendations for users without history)
+# One ranked list per genre plus the overall list (genre_id 0), rebuilt by app/utility_modules/cold_start.py
+class ColdStartPick(database.Model):
+    genre_id = database.Column(database.Integer, primary_key=True)     # Genre.id, or 0 for the overall list
+    position = database.Column(database.Integer, primary_key=True)     # 1 = best
+    movie_id = database.Column(database.Integer, database.ForeignKey('movie.id', ondelete='CASCADE'), nullable=False)
+    score = database.Column(database.Float, nullable=False)            # Quality x popularity (see cold_start.py)
 
 # Define SeenList model
 class SeenList(database.Model):
@@ -115,7 +195,10 @@ class SeenList(database.Model):
     date_added = database.Column(database.DateTime, nullable=False, default=datetime.utcnow)
 
     # Make sure that an user can add a movie to seen list only once
-    __table_args__ = (database.UniqueConstraint('user_id', 'movie_id', name='unique_user_seen_movie'),)
+    # Movie and date indexes back the admin filters (the unique constraint already covers user_id)
+    __table_args__ = (database.UniqueConstraint('user_id', 'movie_id', name='unique_user_seen_movie'),
+                      database.Index('ix_seen_list_movie_id', 'movie_id'),
+                      database.Index('ix_seen_list_date_added', 'date_added'))
 
 # Define ToWatchList model
 class ToWatchList(database.Model):
@@ -128,4 +211,61 @@ class ToWatchList(database.Model):
     date_added = database.Column(database.DateTime, nullable=False, default=datetime.utcnow)
 
     # Make sure that an user can add a movie to to-watch list only once
-    __table_args__ = (database.UniqueConstraint('user_id', 'movie_id', name='unique_user_to_watch_movie'),)
+    # Movie and date indexes back the admin filters (the unique constraint already covers user_id)
+    __table_args__ = (database.UniqueConstraint('user_id', 'movie_id', name='unique_user_to_watch_movie'),
+                      database.Index('ix_to_watch_list_movie_id', 'movie_id'),
+                      database.Index('ix_to_watch_list_date_added', 'date_added'))
+
+# Define OutgoingEmail model (persistent outbox drained by the mail worker)
+class OutgoingEmail(database.Model):
+    # Get email details
+    id = database.Column(database.Integer, primary_key=True)
+    recipient = database.Column(database.String(255), nullable=False)
+    subject = database.Column(database.String(255), nullable=False)
+    html = database.Column(database.Text, nullable=False)
+
+    # Delivery state: 'pending' until sent, 'sent' on success, 'failed' once retries are exhausted
+    status = database.Column(database.String(20), nullable=False, default='pending')
+    attempts = database.Column(database.Integer, nullable=False, default=0)
+    next_attempt_at = database.Column(database.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = database.Column(database.Text, nullable=True)
+
+    created_at = database.Column(database.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = database.Column(database.DateTime, nullable=True)
+
+    # The worker always looks up due pending emails
+    __table_args__ = (database.Index('ix_outgoing_email_status_next_attempt', 'status', 'next_attempt_at'),)
+
+    def __repr__(self):
+        return f"Email to {self.recipient}: {self.subject} ({self.status})"
+
+# Define ImportJob model (a CSV of external ratings/watch history processed in the background)
+class ImportJob(database.Model):
+    # Get import details
+    id = database.Column(database.Integer, primary_key=True)
+    user_id = database.Column(database.Integer, database.ForeignKey('user.id'), nullable=False)
+    filename = database.Column(database.String(255), nullable=True)
+    rating_scale = database.Column(database.Integer, nullable=True)    # 10 or 5 (None = detect)
+    csv_data = database.Column(database.Text, nullable=True)            # Cleared once the job is done
+
+    # Progress: 'queued' -> 'running' -> 'finished' or 'failed'
+    status = database.Column(database.String(20), nullable=False, default='queued')
+    total_rows = database.Column(database.Integer, nullable=False, default=0)
+    processed_rows = database.Column(database.Integer, nullable=False, default=0)
+    matched_rows = database.Column(database.Integer, nullable=False, default=0)
+    rated_rows = database.Column(database.Integer, nullable=False, default=0)
+    unmatched_titles = database.Column(database.Text, nullable=True)    # JSON list (first entries only)
+    error = database.Column(database.Text, nullable=True)
+
+    # Claims by the import worker: a running job whose heartbeat is older than the lease is claimed again
+    attempts = database.Column(database.Integer, nullable=False, default=0)
+    heartbeat_at = database.Column(database.DateTime, nullable=True)
+
+    created_at = database.Column(database.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = database.Column(database.DateTime, nullable=True)
+
+    # The worker looks up queued and running jobs
+    __table_args__ = (database.Index('ix_import_job_status', 'status', 'id'),)
+
+    def __repr__(self):
+        return f"Import {self.id} ({self.status})"
@@ -1,18 +1,53 @@
-from flask import render_template, redirect, url_for, flash, request, current_app, jsonify
+from flask import render_template, redirect, url_for, flash, request, current_app, jsonify, abort, make_response, send_from_directory
+from markupsafe import Markup
 from flask_login import login_required, login_user, logout_user, current_user
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import func, desc, asc, distinct, and_, cast, Float
+from sqlalchemy.orm import selectinload
 from app import app, database
-from app.models import User, Movie, Rating, SeenList, ToWatchList, Genre
+from app.models import User, Movie, Rating, SeenList, ToWatchList, Genre, ImportJob
+import hmac
 import random
-from app.utility_modules.data_exporter import export_movie_list_to_csv
-from app.utility_modules.qr_generator import generate_user_qr_code
+from functools import wraps
+from app.utility_modules.data_exporter import export_movie_list, export_account
+from app.utility_modules.qr_generator import generate_qr_png
 from app.utility_modules.token_manager import confirm_token
 from app.utility_modules.email_sender import send_confirmation_email
 from app.utility_modules.recommendation_engine import get_recommendations
+from app.utility_modules.page_cache import cached_fragment, fill_holes, get_page_cache
+from app.utility_modules.user_cache import invalidate_cached_user
+from app.utility_modules.db_routing import use_primary
+from app.utility_modules.genre_mask import genre_filter, card_genres
+from app.utility_modules.leaderboards import LEADERBOARDS, leaderboard_page, leaderboard_entry
+from app.utility_modules.poster_cache import poster_directory
+from app.utility_modules.cold_start import cold_start_recommendations, favorite_genre_ids, save_favorite_genres
+from app.utility_modules.metrics import RECOMMENDER_ERRORS, metrics_payload
+from app.utility_modules.warmup import is_ready
+from app.utility_modules.ratings_importer import queue_import, job_progress
+from app.utility_modules.user_actions import (parse_score, toggle_seen_entry, toggle_watchlist_entry,
+                                              save_rating, delete_rating, get_movie_state,
+                                              bulk_edit_lists, LIST_MODELS)
 from datetime import datetime
 from app.forms import UpdateProfileForm, ChangePasswordForm
 
+# Flash messages (text, category) shared by the HTML routes and the JSON API
+SEEN_MESSAGES = {
+    'added': lambda title: (f'"{title}" was added to Watch History.', 'success'),
+    'removed': lambda title: (f'"{title}" was deleted from Watch History and removed from Ratings.', 'info')
+}
+WATCHLIST_MESSAGES = {
+    'added': lambda title: (f'"{title}" was added to Watchlist.', 'success'),
+    'removed': lambda title: (f'"{title}" was removed from Watchlist.', 'info')
+}
+RATING_MESSAGES = {
+    'created': lambda title, score: (f'You rated "{title}" with a score of {score}.', 'success'),
+    'updated': lambda title, score: (f'Updated your rating for "{title}" to {score}.', 'success')
+}
+REMOVE_RATING_MESSAGES = {
+    True: ("Your rating was removed!", 'success'),
+    False: ("You do not have an active rating for this movie.", 'warning')
+}
+
 # ==========================================================================================
 # Main Routes
 # ==========================================================================================
@@ -24,44 +59,103 @@ def home():
     # Logic for home page
     
     recommendations = []
+    # Users without history (or logged out) get the precomputed cold-start list instead
+    cold_start = False
 
     # 2. IF user is logged in, try to run the AI engine
     if current_user.is_authenticated:
         try:
             # CALL THE FUNCTION HERE using the user's ID
             recommendations = get_recommendations(current_user.id, 20)
-        except Exception as e:
-            print(f"Error getting recommendations: {e}")
+        except Exception:
+            # Logged with the traceback and counted, the page falls back to random movies
+            app.logger.exception("Error getting recommendations for user %s", current_user.id)
+            RECOMMENDER_ERRORS.inc()
             recommendations = []
 
-    # 3. If ML failed or user is logged out, just show 20 random movies
+    # 3. No history: the best movies of the genres picked during onboarding (or overall)
+    if not recommendations:
+        user_id = current_user.id if current_user.is_authenticated else None
+        genre_ids = favorite_genre_ids(user_id) if user_id is not None else []
+        recommendations = cold_start_recommendations(user_id, genre_ids, 20)
+        cold_start = True
+
+    # 4. If the lists are not built yet, just show 20 random movies
     if not recommendations:
-        recommendations = Movie.query.order_by(func.random()).limit(20).all()
+        recommendations = Movie.query.options(selectinload(Movie.poster_image)).order_by(func.random()).limit(20).all()
         
     movies = recommendations
 
     # Render the home template with movies and recommendations
-    return render_template('index.html', title='Home', movies=recommendations)
+    return render_template('index.html', title='Home', movies=recommendations, cold_start=cold_start)
+
+# Onboarding: picking genres shows their cold-start list right away (no scoring, see cold_start.py)
+@app.route('/onboarding', methods=['GET', 'POST'])
+@login_required
+def onboarding():
+    if request.method == 'POST':
+        save_favorite_genres(current_user.id, request.form.getlist('genre'))
+        flash('Your favourite genres were saved. Rate a few movies to get personal recommendations!', 'success')
+        return redirect(url_for('home'))
+
+    # The picker submits itself on every change; the saved genres are the starting point
+    genres = Genre.query.order_by(Genre.name).all()
+    if 'picked' in request.args:
+        selected_names = set(request.args.getlist('genre'))
+        selected_ids = [genre.id for genre in genres if genre.name in selected_names]
+    else:
+        selected_ids = favorite_genre_ids(current_user.id)
+
+    return render_template('onboarding.html',
+                           title='Pick your genres',
+                           genres=genres,
+                           selected_ids=set(selected_ids),
+                           movies=cold_start_recommendations(current_user.id, selected_ids, 20))
+
+# Sort options accepted by the catalog (anything else falls back to title_asc)
+CATALOG_SORTS = ('title_asc', 'title_desc', 'year_asc', 'year_desc', 'date_asc', 'date_desc')
 
 # Catalog Route with Pagination, Filters, and Sorting
 @app.route("/catalog", methods=['GET'])
 def catalog():
     # Get parameters
-    page = request.args.get('page', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
     
-    # Get list of genres (from frontend buttons/checkboxes)
-    selected_genres = request.args.getlist('genre') 
+    # Get list of genres (from frontend buttons/checkboxes), deduplicated and sorted for the cache key
+    selected_genres = sorted(set(request.args.getlist('genre')))
+    # Movies with any of the selected genres (default) or with all of them
+    genre_match = 'all' if request.args.get('genre_match') == 'all' else 'any'
     
     # Get year range
     min_year = request.args.get('min_year', type=int)
     max_year = request.args.get('max_year', type=int)
     
     current_sort = request.args.get('sort_by', 'title_asc')
-    
+    if current_sort not in CATALOG_SORTS:
+        current_sort = 'title_asc'
+
+    # The rendered catalog is identical for every visitor, so it is cached per normalized parameters
+    params = {
+        'page': page,
+        'genre': selected_genres,
+        'genre_match': genre_match,
+        'min_year': min_year,
+        'max_year': max_year,
+        'sort_by': current_sort
+    }
+    catalog_content = cached_fragment(
+        'catalog', params,
+        lambda: render_catalog_content(page, selected_genres, genre_match, min_year, max_year, current_sort)
+    )
+
+    return render_template('catalog.html', catalog_content=Markup(catalog_content))
+
+def render_catalog_content(page, selected_genres, genre_match, min_year, max_year, current_sort):
+    # Runs the catalog queries and renders the cacheable part of the page
     PER_PAGE = 20
     
-    # Base query selects Movie objects
-    query = database.session.query(Movie)
+    # Base query selects Movie objects (with their cached posters, for the cards)
+    query = database.session.query(Movie).options(selectinload(Movie.poster_image))
     
     # 1. Get Available Genres (for tag buttons)
     # Query to fetch genres only from the Movie/Genre table
@@ -72,10 +166,10 @@ def catalog():
 
     # 2. Filtering
     
-    # MULTI-GENRE FILTER (OR logic): Movies must have AT LEAST one of the selected genres
+    # MULTI-GENRE FILTER: Movies must have AT LEAST one (or, with genre_match=all, EVERY one) of the selected genres
     if selected_genres:
-        # Use join to link Movie to Genre and filter by selected genres
-        query = query.join(Movie.genres).filter(Genre.name.in_(selected_genres))
+        # One bitwise predicate on Movie.genre_mask: no join, so no duplicate rows and exact page counts
+        query = query.filter(genre_filter(selected_genres, match_all=genre_match == 'all'))
         
     # YEAR RANGE FILTER
     year_filters = []
@@ -115,11 +209,15 @@ def catalog():
     # We no longer need to extract from tuples since we are not sorting by rating
     movies_to_display = movies_paginated.items
 
-    return render_template('catalog.html',
+    movie_genres = card_genres(movies_to_display)
+
+    return render_template('fragments/catalog_content.html',
                            movies=movies_to_display,
+                           movie_genres=movie_genres,
                            pagination=movies_paginated,
                            available_genres=available_genres,
                            selected_genres=selected_genres,  # List of selected genres
+                           genre_match=genre_match,          # 'any' or 'all'
                            min_year=min_year,                # Minimum year
                            max_year=max_year,                # Maximum year
                            current_sort=current_sort)
@@ -151,12 +249,14 @@ def register():
             user = User(username=username, email=email, is_confirmed=False)
             user.set_password(password)
 
-            # Add user to the database and commit
+            # Add user to the database
             database.session.add(user)
-            database.session.commit()
             
-            # Send mail
+            # Queue the confirmation mail; the mail worker sends it outside of this request
             send_confirmation_email(user.email)
+
+            # Commit the user together with the queued email
+            database.session.commit()
             
             # Inform the user of successful registration and redirect to login page
             flash('A confirmation email has been sent via email.', 'success')
@@ -176,6 +276,7 @@ def register():
     return render_template('register.html', title='Register')
 
 @app.route('/confirm/<token>')
+@use_primary
 def confirm_email(token):
     try:
         email = confirm_token(token)
@@ -192,6 +293,7 @@ def confirm_email(token):
         user.confirmed_on = datetime.now()
         database.session.add(user)
         database.session.commit()
+        invalidate_cached_user(user.id)
         flash('You have confirmed your account. Thanks!', 'success')
         
     return redirect(url_for('login'))
@@ -259,29 +361,9 @@ def logout():
 def toggle_seen(movie_id):
     movie = Movie.query.get_or_404(movie_id)
     
-    seen_entry = SeenList.query.filter_by(user_id=current_user.id, movie_id=movie_id).first()
-    
-    if seen_entry:
-        # If seen, remove it from seen list
-        database.session.delete(seen_entry)
-        
-        # CRITICAL: Delete the rating as well, since the movie is no longer considered seen
-        Rating.query.filter_by(user_id=current_user.id, movie_id=movie_id).delete()
-        
-        flash(f'"{movie.title}" was deleted from Watch History and removed from Ratings.', 'info')
-        status = 'removed'
-    else:
-        # If not seen, add it to seen list
-        new_entry = SeenList(user_id=current_user.id, movie_id=movie_id)
-        database.session.add(new_entry)
-        
-        # Optional: Remove from Watchlist (if moved to seen)
-        # ToWatchList.query.filter_by(user_id=current_user.id, movie_id=movie_id).delete()
-        
-        flash(f'"{movie.title}" was added to Watch History.', 'success')
-        status = 'added'
+    status = toggle_seen_entry(current_user.id, movie_id)
+    flash(*SEEN_MESSAGES[status](movie.title))
 
-    database.session.commit()
     return redirect(url_for('movie_details', movie_id=movie_id))
 
 # Movie details route
@@ -289,17 +371,22 @@ def toggle_seen(movie_id):
 def movie_details(movie_id):
     # Logic for displaying movie details
 
-    # Find the movie by ID
-    movie = Movie.query.get_or_404(movie_id)
+    def render_movie_content():
+        # Find the movie by ID (a 404 is raised before anything gets cached)
+        movie = Movie.query.get_or_404(movie_id)
+        return {
+            'title': movie.title,
+            'html': render_template('fragments/movie_details_content.html', movie=movie)
+        }
 
-    # 1. GET GLOBAL RATINGS
-    # Fetch ratings for the movie
-    ratings = Rating.query.filter_by(movie_id=movie.id).all()
+    # The movie metadata is the same for every visitor, so it is served from the fragment cache
+    movie_content = cached_fragment('movie', {'movie_id': movie_id}, render_movie_content)
 
-    # Calculate average rating
-    avg_rating = None
-    if ratings:
-        avg_rating = sum(rating.score for rating in ratings) / len(ratings)
+    # 1. GET GLOBAL RATINGS
+    # Calculate the average rating in the database instead of loading every rating
+    avg_rating = database.session.query(func.avg(Rating.score)).filter(Rating.movie_id == movie_id).scalar()
+    if avg_rating is not None:
+        avg_rating = float(avg_rating)
 
     # 2. GET USER STATE
     is_in_watchlist = False
@@ -309,32 +396,35 @@ def movie_details(movie_id):
 
     if current_user.is_authenticated:
         # A. User rating
-        user_rating_obj = Rating.query.filter_by(user_id=current_user.id, movie_id=movie.id).first()
+        user_rating_obj = Rating.query.filter_by(user_id=current_user.id, movie_id=movie_id).first()
         if user_rating_obj:
             user_rating_score = user_rating_obj.score
             is_seen = True # Automatically marked as seen if rating exists
         
         # B. SeenList (Check SeenList only if no rating, for flexibility)
-        elif SeenList.query.filter_by(user_id=current_user.id, movie_id=movie.id).first():
+        elif SeenList.query.filter_by(user_id=current_user.id, movie_id=movie_id).first():
              is_seen = True # Marked as seen (without rating)
         
         # C. Watchlist
-        if ToWatchList.query.filter_by(user_id=current_user.id, movie_id=movie.id).first():
+        if ToWatchList.query.filter_by(user_id=current_user.id, movie_id=movie_id).first():
             is_in_watchlist = True
 
+    # Fill the personalized sections of the cached fragment
+    movie_html = fill_holes(
+        movie_content['html'],
+        global_rating=render_template('fragments/movie_global_rating.html', avg_rating=avg_rating),
+        user_actions=render_template('fragments/movie_user_actions.html',
+                                     movie_id=movie_id,
+                                     # State variables newly sent to Frontend
+                                     is_in_watchlist=is_in_watchlist,
+                                     is_seen=is_seen,
+                                     user_rating=user_rating_score) # Send only the score
+    )
 
     # Render the movie details template
     return render_template('movie_details.html', 
-                           title=movie.title, 
-                           movie=movie, 
-                           ratings=ratings, 
-                           avg_rating=avg_rating, 
-                           
-                           # State variables newly sent to Frontend
-                           is_in_watchlist=is_in_watchlist,
-                           is_seen=is_seen,
-                           user_rating=user_rating_score # Send only the score
-                          )
+                           title=movie_content['title'], 
+                           movie_content=movie_html)
 
 # Rate movie route
 @app.route('/rate_movie/<int:movie_id>', methods=['POST'])
@@ -342,73 +432,118 @@ def movie_details(movie_id):
 def rate_movie(movie_id):
     # Logic for rating a movie
 
-    # Get the rating score from the form
-    score_string = request.form.get('score')
-
-    # Try to convert score to integer
+    # Get the rating score from the form and validate it
     try:
-        # Convert score to integer
-        score = int(score_string)
-
-    except (ValueError, TypeError):
+        score = parse_score(request.form.get('score'))
+    except ValueError as e:
         # Handle invalid score input and redirect to movie details
-        flash('The rating must be a number.', 'danger')
-        return redirect(url_for('movie_details', movie_id=movie_id))
-
-    # Check if score is valid and redirect to movie details if not
-    if not 1 <= score <= 10:
-        flash('Please provide a valid rating between 1 and 10.', 'danger')
+        flash(str(e), 'danger')
         return redirect(url_for('movie_details', movie_id=movie_id))
     
-    # Check if the rating already exists
-    rating = Rating.query.filter_by(user_id=current_user.id, movie_id=movie_id).first()
     movie = Movie.query.get_or_404(movie_id) # Fetch the movie for messages
 
-    if rating:
-        # Update existing rating
-        rating.score = score
-        flash(f'Updated your rating for "{movie.title}" to {score}.', 'success')
-    else:
-        # Create a new rating
-        new_rating = Rating(user_id=current_user.id, movie_id=movie_id, score=score)
-        database.session.add(new_rating)
-        flash(f'You rated "{movie.title}" with a score of {score}.', 'success')
-        
-    # CRITICAL LOGIC: Ensure the movie is marked as seen
-    seen_entry = SeenList.query.filter_by(user_id=current_user.id, movie_id=movie_id).first()
-    
-    if not seen_entry:
-        # Add movie to SeenList because it received a rating
-        new_seen_entry = SeenList(user_id=current_user.id, movie_id=movie_id)
-        database.session.add(new_seen_entry)
-        
-        # Optional: remove from ToWatchList if added
-        # ToWatchList.query.filter_by(user_id=current_user.id, movie_id=movie_id).delete()
-        
-    # Final commit of all changes (rating, seenlist, towatchlist)
-    database.session.commit()
+    # Create or update the rating (the movie is also marked as seen)
+    status = save_rating(current_user.id, movie_id, score)
+    flash(*RATING_MESSAGES[status](movie.title, score))
 
     # Redirect back to the movie details page
     return redirect(url_for('movie_details', movie_id=movie_id))
 
 @app.route("/remove_rating/<int:movie_id>", methods=['POST'])
-@login_required # Presupune că folosești Flask-Login
+@login_required
 def remove_rating(movie_id):
-    # Găsește rating-ul existent al utilizatorului pentru filmul respectiv
-    rating_entry = Rating.query.filter_by(
-        user_id=current_user.id, 
-        movie_id=movie_id
-    ).first()
-
-    if rating_entry:
-        database.session.delete(rating_entry)
-        database.session.commit()
-        flash(f"Your rating was removed!", 'success')
-    else:
-        flash("You do not have an active rating for this movie.", 'warning')
+    # Remove the user's existing rating for the movie (the message depends on whether one existed)
+    removed = delete_rating(current_user.id, movie_id)
+    flash(*REMOVE_RATING_MESSAGES[removed])
         
     return redirect(url_for('movie_details', movie_id=movie_id))
 
+# ==========================================================================================
+# JSON API Routes (used by main.js to update the movie page in place)
+# ==========================================================================================
+
+def api_login_required(view):
+    # Same as login_required, but answers 401 JSON instead of redirecting to the login page
+    @wraps(view)
+    def wrapped_view(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return jsonify({'error': 'Authentication required.'}), 401
+        return view(*args, **kwargs)
+    return wrapped_view
+
+def api_response(movie_id, status, message):
+    # Returns the outcome of the action with the new state and rating stats of the movie
+    text, category = message
+    return jsonify({
+        'status': status,
+        'message': text,
+        'category': category,
+        'state': get_movie_state(current_user.id, movie_id)
+    })
+
+@app.route('/api/movies/<int:movie_id>/seen', methods=['POST'])
+@api_login_required
+def api_toggle_seen(movie_id):
+    movie = Movie.query.get_or_404(movie_id)
+    status = toggle_seen_entry(current_user.id, movie_id)
+    return api_response(movie_id, status, SEEN_MESSAGES[status](movie.title))
+
+@app.route('/api/movies/<int:movie_id>/watchlist', methods=['POST'])
+@api_login_required
+def api_toggle_watchlist(movie_id):
+    movie = Movie.query.get_or_404(movie_id)
+    status = toggle_watchlist_entry(current_user.id, movie_id)
+    return api_response(movie_id, status, WATCHLIST_MESSAGES[status](movie.title))
+
+@app.route('/api/movies/<int:movie_id>/rating', methods=['POST'])
+@api_login_required
+def api_rate_movie(movie_id):
+    # Accept the score from a form post or from a JSON body
+    payload = request.get_json(silent=True) or request.form
+    try:
+        score = parse_score(payload.get('score'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    movie = Movie.query.get_or_404(movie_id)
+    status = save_rating(current_user.id, movie_id, score)
+    return api_response(movie_id, status, RATING_MESSAGES[status](movie.title, score))
+
+@app.route('/api/movies/<int:movie_id>/rating', methods=['DELETE'])
+@api_login_required
+def api_remove_rating(movie_id):
+    removed = delete_rating(current_user.id, movie_id)
+    return api_response(movie_id, 'removed' if removed else 'missing', REMOVE_RATING_MESSAGES[removed])
+
+# Maximum number of movie ids accepted by one bulk request
+BULK_EDIT_MAX_IDS = 1000
+
+@app.route('/api/lists/bulk', methods=['POST'])
+@api_login_required
+def api_bulk_edit_lists():
+    """
+    Adds, removes or moves many movies between the watchlist and the seen list in one transaction.
+    Body: {"action": "add" | "remove" | "move", "list": "watchlist" | "seen", "to": "seen", "movie_ids": [1, 2]}
+    """
+    payload = request.get_json(silent=True) or {}
+    action = payload.get('action')
+    list_name = payload.get('list')
+    target_list = payload.get('to')
+    movie_ids = payload.get('movie_ids')
+
+    if action not in ('add', 'remove', 'move'):
+        return jsonify({'error': "The action must be 'add', 'remove' or 'move'."}), 400
+    if list_name not in LIST_MODELS or (action == 'move' and (target_list not in LIST_MODELS or target_list == list_name)):
+        return jsonify({'error': "The lists must be 'watchlist' or 'seen' (and different when moving)."}), 400
+    # JSON true/false are ints in Python (bool subclasses int), so they are rejected explicitly
+    if (not isinstance(movie_ids, list) or not movie_ids
+            or not all(isinstance(movie_id, int) and not isinstance(movie_id, bool) for movie_id in movie_ids)):
+        return jsonify({'error': 'movie_ids must be a non-empty list of integers.'}), 400
+    if len(movie_ids) > BULK_EDIT_MAX_IDS:
+        return jsonify({'error': f'At most {BULK_EDIT_MAX_IDS} movies can be edited at once.'}), 400
+
+    return jsonify(bulk_edit_lists(current_user.id, action, list_name, sorted(set(movie_ids)), target_list))
+
 # ==========================================================================================
 # Utility Routes
 # ==========================================================================================
@@ -419,9 +554,6 @@ def remove_rating(movie_id):
 def user_profile(user_id):
     user = User.query.get_or_404(user_id)
     
-    # Generate QR Code (using application context)
-    qr_data_uri = generate_user_qr_code(user_id)
-    
     # Fetch movie lists (for display)
     seen_movies = SeenList.query.filter_by(user_id=user_id).all()
     to_watch_movies = ToWatchList.query.filter_by(user_id=user_id).all()
@@ -429,43 +561,91 @@ def user_profile(user_id):
     return render_template('user_profile.html', 
                            title=f'Profile {user.username}', 
                            user=user,
-                           qr_data_uri=qr_data_uri,
                            seen_movies=seen_movies,
                            to_watch_movies=to_watch_movies)
 
+# QR code of a profile URL, served as a cacheable PNG instead of an inline base64 image
+@app.route('/profile/<int:user_id>/qr.png', methods=['GET'])
+@login_required
+def user_profile_qr(user_id):
+    # Only existing profiles get a code (and a cache entry)
+    User.query.get_or_404(user_id)
+
+    # Generate the absolute URL for the user profile using the current request context
+    profile_url = url_for('user_profile', user_id=user_id, _external=True)
+    png_bytes, etag = generate_qr_png(profile_url)
+
+    response = make_response(png_bytes)
+    response.headers["Content-Type"] = "image/png"
+    # The image only depends on the URL, so the browser may keep it for a year; private, because the
+    # route requires a login and shared caches must not answer it for anonymous visitors
+    response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    response.set_etag(etag)
+
+    # Answer with 304 Not Modified when the browser already holds this ETag
+    return response.make_conditional(request)
+
+# Cached poster variants (Caddy serves /posters/ from disk in production, see Caddyfile). A new image
+# gets a new content-hashed name, so browsers may keep every file for a year without revalidating
+@app.route('/posters/<path:filename>', methods=['GET'])
+def poster_file(filename):
+    response = send_from_directory(poster_directory(), filename)
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+def get_export_options():
+    # Export format ('csv' or 'jsonl') and gzip flag from the query string
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'jsonl'):
+        export_format = 'csv'
+    compress = request.args.get('gzip') == '1'
+    return export_format, compress
+
 # Route for exporting the "To Watch" list as CSV
 @app.route("/export_to_watch_list", methods=['GET'])
 @login_required
 def export_to_watch_list():
-    """Export the current user's Watchlist to CSV."""
+    """Export the current user's Watchlist to CSV (or JSON Lines)."""
     
-    # Fetch movies from the logged-in user's "To Watch" list
-    to_watch_movies = ToWatchList.query.filter_by(user_id=current_user.id).all()
+    # Check that the logged-in user's "To Watch" list has at least one entry
+    has_entries = database.session.query(ToWatchList.id).filter_by(user_id=current_user.id).first()
     
-    if not to_watch_movies:
+    if not has_entries:
         flash('Watch History is empty. No data to export.', 'warning')
         # Redirect back to the profile page
         return redirect(url_for('user_profile', user_id=current_user.id))
 
-    # Call the export module
-    return export_movie_list_to_csv(to_watch_movies, filename="parallax_to_watch_list.csv")
+    # Call the export module (rows are streamed while the response is sent)
+    export_format, compress = get_export_options()
+    return export_movie_list(ToWatchList, current_user.id, filename="parallax_to_watch_list",
+                             export_format=export_format, compress=compress)
 
 # New Route: Export CSV Data
 
 @app.route("/export_seen_list", methods=['GET'])
 @login_required
 def export_seen_list():
-    """Export the current user's Watchlist to CSV."""
+    """Export the current user's Watchlist to CSV (or JSON Lines)."""
     
-    # Fetch seen movies (Requires SeenList.movie relationship in models.py)
-    seen_movies = SeenList.query.filter_by(user_id=current_user.id).all()
+    # Check that the seen list has at least one entry
+    has_entries = database.session.query(SeenList.id).filter_by(user_id=current_user.id).first()
     
-    if not seen_movies:
+    if not has_entries:
         flash('Watchlist is empty. No data to export.', 'warning')
         return redirect(url_for('user_profile', user_id=current_user.id))
 
-    # Call the export module
-    return export_movie_list_to_csv(seen_movies, filename="parallax_seen_list.csv")
+    # Call the export module (rows are streamed while the response is sent)
+    export_format, compress = get_export_options()
+    return export_movie_list(SeenList, current_user.id, filename="parallax_seen_list",
+                             export_format=export_format, compress=compress)
+
+# Route for exporting ratings, watch history and watchlist together
+@app.route("/export_account", methods=['GET'])
+@login_required
+def export_account_data():
+    """Export every rating, seen entry and watchlist entry of the current user in one file."""
+    export_format, compress = get_export_options()
+    return export_account(current_user.id, export_format=export_format, compress=compress)
 
 
 # New Route: Movie Search
@@ -486,7 +666,7 @@ def search():
         search_term = f"%{query}%"
         
         # SQLAlchemy Query: Search by title OR description (case-insensitive)
-        results = Movie.query.filter(
+        results = Movie.query.options(selectinload(Movie.poster_image)).filter(
             (Movie.title.ilike(search_term)) | 
             (Movie.description.ilike(search_term))
         ).all()
@@ -496,12 +676,67 @@ def search():
     else:
         count = 0
 
+    movie_genres = card_genres(results)
+
     return render_template('search_results.html', 
                            title=f"Search Results: {query}",
                            query=query,
                            results=results,
+                           movie_genres=movie_genres,
                            count=count)
 
+# Leaderboards (read from the rollup tables refreshed by leaderboard_worker.py)
+LEADERBOARD_PER_PAGE = 20
+
+@app.route("/leaderboards")
+@app.route("/leaderboards/<board>")
+def leaderboards(board='trending'):
+    if board not in LEADERBOARDS:
+        abort(404)
+    # Paged by the last movie shown ("after"); "rank" only numbers the entries
+    after = request.args.get('after', type=int)
+    rank = max(request.args.get('rank', 1, type=int), 1) if after is not None else 1
+
+    page = leaderboard_page(board, after, LEADERBOARD_PER_PAGE)
+    if page is None:
+        # The movie left the leaderboard since the previous page was shown
+        return redirect(url_for('leaderboards', board=board))
+    entries, has_next = page
+
+    movie_genres = card_genres(movie for movie, _ in entries)
+
+    return render_template('leaderboards.html',
+                           title=LEADERBOARDS[board][0],
+                           board=board,
+                           boards={name: board_title for name, (board_title, _, _) in LEADERBOARDS.items()},
+                           entries=entries,
+                           movie_genres=movie_genres,
+                           after=after,
+                           rank=rank,
+                           trending_days=app.config['LEADERBOARD_TRENDING_DAYS'],
+                           has_next=has_next)
+
+@app.route("/api/leaderboards/<board>")
+def api_leaderboard(board):
+    # One page of a leaderboard as JSON (?after=<next_after of the previous page>&per_page=20)
+    if board not in LEADERBOARDS:
+        return jsonify({'error': f"Unknown leaderboard. Use one of: {', '.join(LEADERBOARDS)}."}), 404
+    after = request.args.get('after', type=int)
+    per_page = min(max(request.args.get('per_page', LEADERBOARD_PER_PAGE, type=int), 1), app.config['LEADERBOARD_MAX_PER_PAGE'])
+
+    page = leaderboard_page(board, after, per_page)
+    if page is None:
+        return jsonify({'error': 'That movie is no longer on this leaderboard. Start again without "after".'}), 404
+    entries, has_next = page
+    return jsonify({
+        'leaderboard': board,
+        'after': after,
+        'per_page': per_page,
+        'has_next': has_next,
+        'next_after': entries[-1][0].id if has_next else None,
+        'movies': [leaderboard_entry(movie, stats) for movie, stats in entries]
+    })
+
 @app.route("/search_autocomplete")
 def search_autocomplete():
     # Autocomplete search route for movie titles and descriptions
@@ -540,23 +775,27 @@ def search_autocomplete():
 @app.route("/settings", methods=['GET', 'POST'])
 @login_required
 def settings():
+    # Load the full user row (current_user only carries the cached authentication fields)
+    user = database.session.get(User, current_user.id)
+
     # Initialize forms
     profile_form = UpdateProfileForm()
     password_form = ChangePasswordForm()
 
     # For unique profile validation, set the original user ID
-    profile_form.original_user_id = current_user.id
+    profile_form.original_user_id = user.id
     
     # PROFILE UPDATE FORM HANDLING
     if profile_form.validate_on_submit() and profile_form.submit.data:
         # 1. Check if entered data is different from current
-        if (current_user.username != profile_form.username.data or 
-            current_user.email != profile_form.email.data):
+        if (user.username != profile_form.username.data or 
+            user.email != profile_form.email.data):
             
             # 2. Update user and save to database
-            current_user.username = profile_form.username.data
-            current_user.email = profile_form.email.data
+            user.username = profile_form.username.data
+            user.email = profile_form.email.data
             database.session.commit()
+            invalidate_cached_user(user.id)
             
             flash('Profile updated successfully!', 'success')
             return redirect(url_for('settings'))
@@ -564,10 +803,11 @@ def settings():
     # PASSWORD CHANGE FORM HANDLING
     if password_form.validate_on_submit() and password_form.submit.data:
         # 1. Verify old password
-        if current_user.check_password(password_form.old_password.data):
+        if user.check_password(password_form.old_password.data):
             # 2. Change password
-            current_user.set_password(password_form.new_password.data)
+            user.set_password(password_form.new_password.data)
             database.session.commit()
+            invalidate_cached_user(user.id)
             flash('Password changed successfully!', 'success')
             return redirect(url_for('settings'))
         else:
@@ -575,8 +815,8 @@ def settings():
             
     # Populate profile form with current data if request is GET
     elif request.method == 'GET':
-        profile_form.username.data = current_user.username
-        profile_form.email.data = current_user.email
+        profile_form.username.data = user.username
+        profile_form.email.data = user.email
 
     return render_template('settings.html', 
                            title='Account Settings',
@@ -588,7 +828,9 @@ def settings():
 @login_required
 def my_ratings():
     # Fetch only ratings, ordered by date
-    user_ratings = Rating.query.filter_by(user_id=current_user.id).order_by(Rating.timestamp.desc()).all()
+    # Movies and their cached posters in two extra queries (not one per row)
+    user_ratings = Rating.query.options(selectinload(Rating.movie).selectinload(Movie.poster_image)).filter_by(
+        user_id=current_user.id).order_by(Rating.timestamp.desc()).all()
     
     return render_template('my_ratings.html', 
                            title='My Ratings', 
@@ -599,7 +841,8 @@ def my_ratings():
 @login_required
 def watchlist():
     # Send ToWatchList objects to access the added date
-    watchlist_items = ToWatchList.query.filter_by(user_id=current_user.id).order_by(ToWatchList.date_added.desc()).all()
+    watchlist_items = ToWatchList.query.options(selectinload(ToWatchList.movie).selectinload(Movie.poster_image)).filter_by(
+        user_id=current_user.id).order_by(ToWatchList.date_added.desc()).all()
     
     return render_template('watchlist.html', 
                            title='My Watchlist', 
@@ -610,7 +853,8 @@ def watchlist():
 @login_required
 def seen_list():
     # Fetch entries from SeenList, ordered chronologically
-    seen_entries = SeenList.query.filter_by(user_id=current_user.id).order_by(SeenList.date_added.desc()).all()
+    seen_entries = SeenList.query.options(selectinload(SeenList.movie).selectinload(Movie.poster_image)).filter_by(
+        user_id=current_user.id).order_by(SeenList.date_added.desc()).all()
     
     return render_template('seen_list.html', 
                            title='Seen Movies', 
@@ -622,17 +866,95 @@ def seen_list():
 def toggle_watchlist(movie_id):
     movie = Movie.query.get_or_404(movie_id)
     
-    entry = ToWatchList.query.filter_by(user_id=current_user.id, movie_id=movie.id).first()
-    
-    if entry:
-        # Remove
-        database.session.delete(entry)
-        flash(f'"{movie.title}" was removed from Watchlist.', 'info')
-    else:
-        # Add
-        new_entry = ToWatchList(user_id=current_user.id, movie_id=movie.id)
-        database.session.add(new_entry)
-        flash(f'"{movie.title}" was added to Watchlist.', 'success')
+    status = toggle_watchlist_entry(current_user.id, movie_id)
+    flash(*WATCHLIST_MESSAGES[status](movie.title))
 
-    database.session.commit()
     return redirect(url_for('movie_details', movie_id=movie_id))
+
+# 5. IMPORT RATINGS (CSV exports from IMDb, Letterboxd, ...)
+@app.route("/import_ratings", methods=['GET', 'POST'])
+@login_required
+def import_ratings():
+    if request.method == 'POST':
+        upload = request.files.get('file')
+
+        if not upload or not upload.filename:
+            flash('Please choose a CSV file to import.', 'danger')
+            return redirect(url_for('import_ratings'))
+
+        # Read one byte more than allowed to detect oversized files
+        max_bytes = app.config['IMPORT_MAX_BYTES']
+        data = upload.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            flash(f'The file is too large (maximum {max_bytes // (1024 * 1024)} MB).', 'danger')
+            return redirect(url_for('import_ratings'))
+
+        try:
+            csv_text = data.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            flash('The file must be a UTF-8 encoded CSV.', 'danger')
+            return redirect(url_for('import_ratings'))
+
+        rating_scale = request.form.get('rating_scale', type=int)
+        if rating_scale not in (5, 10):
+            rating_scale = None
+
+        # The import runs in the background; the user is sent to the progress page
+        job = queue_import(current_user.id, upload.filename, csv_text, rating_scale)
+        flash('Your file was uploaded. The import is running in the background.', 'info')
+        return redirect(url_for('import_ratings', job_id=job.id))
+
+    # Show the progress of the requested (or latest) import of the user
+    job_id = request.args.get('job_id', type=int)
+    jobs = ImportJob.query.filter_by(user_id=current_user.id)
+    job = jobs.filter_by(id=job_id).first() if job_id else jobs.order_by(ImportJob.id.desc()).first()
+
+    return render_template('import_ratings.html',
+                           title='Import Ratings',
+                           job=job_progress(job) if job else None)
+
+@app.route("/api/imports/<int:job_id>")
+@api_login_required
+def api_import_status(job_id):
+    # Progress of an import, polled by the import page
+    job = ImportJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    return jsonify(job_progress(job))
+
+# Fragment cache statistics (admins only)
+@app.route("/cache_stats")
+@login_required
+def cache_stats():
+    if not current_user.is_admin:
+        abort(403)
+
+    # Hit rates per key and memory usage of the current worker's fragment cache
+    return jsonify(get_page_cache().stats())
+
+
+@app.route("/metrics")
+def metrics():
+    # Scraped by Prometheus inside the Docker network: Caddy answers 404 for it and the web port is only
+    # published on the host's loopback. METRICS_TOKEN adds a bearer token on top, for other deployments
+    if not app.config['METRICS_ENABLED']:
+        abort(404)
+    token = app.config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        abort(404)
+
+    body, content_type = metrics_payload()
+    return body, 200, {'Content-Type': content_type}
+
+
+# Health probes (Docker healthcheck, load balancers)
+@app.route("/healthz")
+def healthz():
+    # Liveness: the process answers requests
+    return jsonify({'status': 'ok'})
+
+
+@app.route("/readyz")
+def readyz():
+    # Readiness: only once this worker has warmed up (database connections, recommender model)
+    if not is_ready():
+        return jsonify({'status': 'warming up'}), 503
+    return jsonify({'status': 'ready'})
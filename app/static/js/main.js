@@ -93,4 +93,146 @@ document.addEventListener('DOMContentLoaded', function() {
     } else {
         console.error("ERROR: searchBox element not found in HTML");
     }
+
+    // Movie page actions (watchlist, seen, rating) sent to the JSON API and applied in place
+    // Forms keep their normal action, so everything still works if the request fails
+    const watchlistForm = document.getElementById('watchlistForm');
+    const seenForm = document.getElementById('seenForm');
+    const ratingForm = document.getElementById('ratingForm');
+    const removeRatingForm = document.getElementById('removeRatingForm');
+
+    function showMessage(message, category) {
+        let container = document.querySelector('.flash-messages');
+        if (!container) {
+            container = document.createElement('div');
+            container.className = 'flash-messages';
+            const main = document.querySelector('main.container');
+            main.insertBefore(container, main.firstChild);
+        }
+        container.innerHTML = '';
+        const alert = document.createElement('div');
+        alert.className = `alert alert-${category}`;
+        alert.textContent = message;
+        container.appendChild(alert);
+    }
+
+    function applyMovieState(state) {
+        // Watchlist button
+        if (watchlistForm) {
+            const button = watchlistForm.querySelector('button');
+            button.classList.toggle('btn-action-checked', state.is_in_watchlist);
+            button.classList.toggle('btn-action-primary', !state.is_in_watchlist);
+            button.querySelector('span').innerHTML = state.is_in_watchlist
+                ? '<i class="fas fa-check"></i> In Watchlist'
+                : '<i class="fas fa-plus"></i> Add to Watchlist';
+        }
+
+        // Seen button
+        if (seenForm) {
+            const button = seenForm.querySelector('button');
+            button.classList.toggle('btn-action-seen', state.is_seen);
+            button.classList.toggle('btn-action-default', !state.is_seen);
+            button.innerHTML = `<i class="fas fa-eye"></i> ${state.is_seen ? 'Watched' : 'Mark as watched'}`;
+        }
+
+        // Rating widget
+        const score = state.user_rating || 0;
+        const scoreInput = document.getElementById('scoreInput');
+        const starRating = document.querySelector('.star-rating');
+        const scoreDisplay = document.getElementById('dynamicScoreDisplay');
+        const submitButton = document.getElementById('ratingSubmitButton');
+
+        if (scoreInput) scoreInput.value = score;
+        if (starRating) {
+            starRating.dataset.currentScore = score;
+            starRating.querySelectorAll('.star').forEach(star => {
+                star.classList.remove('hovered');
+                star.classList.toggle('selected', parseInt(star.dataset.score) <= score);
+            });
+        }
+        if (scoreDisplay) scoreDisplay.innerHTML = `<strong>${score} / 10</strong>`;
+        if (submitButton) submitButton.textContent = state.user_rating ? 'Update Rating' : 'Submit Rating';
+        if (removeRatingForm) removeRatingForm.style.display = state.user_rating ? '' : 'none';
+
+        // Global rating badge
+        const globalRating = document.getElementById('globalRating');
+        if (globalRating) {
+            globalRating.innerHTML = state.avg_rating === null ? '' :
+                `<div class="avg-rating-global-badge">Global Rating: <strong>${state.avg_rating.toFixed(1)} / 10</strong></div>`;
+        }
+    }
+
+    function submitToApi(form, method) {
+        if (!form || !form.dataset.apiUrl) return;
+
+        form.addEventListener('submit', function(event) {
+            event.preventDefault();
+            const options = { method: method, headers: { 'Accept': 'application/json' } };
+            if (method === 'POST') options.body = new FormData(form);
+
+            fetch(form.dataset.apiUrl, options)
+                .then(response => response.json().then(data => ({ ok: response.ok, data: data })))
+                .then(({ ok, data }) => {
+                    if (!ok) {
+                        showMessage(data.error || 'Something went wrong.', 'danger');
+                        return;
+                    }
+                    applyMovieState(data.state);
+                    showMessage(data.message, data.category);
+                })
+                .catch(err => {
+                    // Fall back to the classic form post (full page reload)
+                    console.error("Movie action error:", err);
+                    form.submit();
+                });
+        });
+    }
+
+    submitToApi(watchlistForm, 'POST');
+    submitToApi(seenForm, 'POST');
+    submitToApi(ratingForm, 'POST');
+    submitToApi(removeRatingForm, 'DELETE');
+
+    // Bulk list editing (watchlist and watch history pages)
+    const bulkToolbar = document.querySelector('.bulk-list-toolbar');
+
+    if (bulkToolbar) {
+        const checkboxes = document.querySelectorAll('.bulk-select');
+
+        bulkToolbar.querySelector('[data-select-all]').addEventListener('click', function() {
+            const selectAll = Array.from(checkboxes).some(box => !box.checked);
+            checkboxes.forEach(box => { box.checked = selectAll; });
+        });
+
+        bulkToolbar.querySelectorAll('[data-action]').forEach(button => {
+            button.addEventListener('click', function() {
+                const movieIds = Array.from(checkboxes).filter(box => box.checked).map(box => parseInt(box.value));
+                if (!movieIds.length) {
+                    showMessage('Select at least one movie first.', 'warning');
+                    return;
+                }
+
+                fetch(bulkToolbar.dataset.apiUrl, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+                    body: JSON.stringify({
+                        action: this.dataset.action,
+                        list: bulkToolbar.dataset.list,
+                        to: this.dataset.to,
+                        movie_ids: movieIds
+                    })
+                })
+                    .then(response => response.json().then(data => ({ ok: response.ok, data: data })))
+                    .then(({ ok, data }) => {
+                        if (!ok) {
+                            showMessage(data.error || 'Something went wrong.', 'danger');
+                            return;
+                        }
+                        // Reload once to show the updated list
+                        window.location.reload();
+                    })
+                    .catch(err => console.error("Bulk edit error:", err));
+            });
+        });
+    }
 });
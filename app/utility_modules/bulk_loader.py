@@ -0,0 +1,38 @@
+import io
+import csv
+
+# Bulk row loading for the database scripts (dataset generator, catalog loader)
+# Both loaders work on a DBAPI connection and leave the transaction to the caller
+
+
+class CopyLoader:
+    """PostgreSQL: streams each batch through COPY ... FROM STDIN in CSV format."""
+
+    def __init__(self, connection):
+        self.cursor = connection.cursor()
+
+    def load(self, table, columns, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        column_list = ', '.join(f'"{column}"' for column in columns)
+        self.cursor.copy_expert(f'COPY "{table}" ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+class ExecutemanyLoader:
+    """SQLite (and other backends): one prepared INSERT executed for the whole batch."""
+
+    def __init__(self, connection):
+        self.cursor = connection.cursor()
+
+    def load(self, table, columns, rows):
+        column_list = ', '.join(f'"{column}"' for column in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        self.cursor.executemany(f'INSERT INTO "{table}" ({column_list}) VALUES ({placeholders})', rows)
+
+
+def get_bulk_loader(connection, dialect_name):
+    # COPY where available, executemany everywhere else
+    if dialect_name == 'postgresql':
+        return CopyLoader(connection)
+    return ExecutemanyLoader(connection)
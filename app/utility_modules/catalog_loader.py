@@ -0,0 +1,184 @@
+from sqlalchemy import (MetaData, Table, Column, Integer, String, Text, Date, select, update, delete,
+                        insert, exists, func, or_, and_, bindparam)
+from app import database
+from app.models import Movie, Genre, movie_genre_association
+from app.utility_modules.bulk_loader import get_bulk_loader
+from app.utility_modules.movie_features import refresh_movie_features
+from app.utility_modules.genre_mask import assign_genre_bits, refresh_genre_masks
+from app.utility_modules.sql_helpers import UPSERT_DIALECTS
+from app.utility_modules.title_normalizer import title_key
+
+# Incremental catalog load: the source rows are staged in temporary tables and merged into
+# movie, genre and movie_genre_association with a handful of set-based statements.
+# Movies are matched on their natural key (normalized title + release year), so reloading
+# never deletes movies (nor the ratings and lists that reference them).
+
+staging_metadata = MetaData()
+
+movie_staging = Table(
+    'movie_staging', staging_metadata,
+    Column('row_id', Integer, primary_key=True),
+    Column('movie_id', Integer),            # Matched existing movie, filled in for new ones after the insert
+    Column('title', String(255)),
+    Column('description', Text),
+    Column('release_year', Integer),
+    Column('release_date', Date),
+    prefixes=['TEMPORARY']
+)
+
+genre_staging = Table(
+    'movie_genre_staging', staging_metadata,
+    Column('row_id', Integer, index=True),
+    Column('genre_name', String(50)),
+    prefixes=['TEMPORARY']
+)
+
+
+def stage_rows(connection, movies):
+    """
+    Deduplicates the source rows on the natural key (last row wins), matches them against
+    the catalog with one query and bulk loads them into the staging tables.
+    Returns the number of duplicate rows that were dropped.
+    """
+    existing = {}
+    for movie_id, title, release_year in connection.execute(select(Movie.id, Movie.title, Movie.release_year)):
+        existing.setdefault((title_key(title), release_year), movie_id)
+
+    unique_rows = {}
+    total = 0
+    for movie in movies:
+        total += 1
+        unique_rows[(title_key(movie['title']), movie.get('release_year'))] = movie
+
+    movie_rows = []
+    genre_rows = []
+    for row_id, (key, movie) in enumerate(unique_rows.items(), start=1):
+        release_date = movie.get('release_date')
+        movie_rows.append((row_id, existing.get(key), movie['title'], movie.get('description') or None,
+                           movie.get('release_year'), release_date.isoformat() if release_date else None))
+        genre_rows.extend((row_id, name) for name in movie.get('genres', []))
+
+    # COPY on PostgreSQL, executemany elsewhere (same transaction as the merge statements)
+    loader = get_bulk_loader(connection.connection, connection.dialect.name)
+    loader.load(movie_staging.name, [column.name for column in movie_staging.columns], movie_rows)
+    loader.load(genre_staging.name, [column.name for column in genre_staging.columns], genre_rows)
+
+    return total - len(movie_rows)
+
+
+def update_matched_movies(connection):
+    # Applies CSV changes to matched movies; empty CSV fields keep the stored value. Returns the changed ids.
+    movie = Movie.__table__
+    statement = update(movie).where(
+        movie.c.id == movie_staging.c.movie_id,
+        or_(
+            movie.c.title != movie_staging.c.title,
+            and_(movie_staging.c.description.isnot(None), movie.c.description.is_distinct_from(movie_staging.c.description)),
+            and_(movie_staging.c.release_date.isnot(None), movie.c.release_date.is_distinct_from(movie_staging.c.release_date))
+        )
+    ).values(
+        title=movie_staging.c.title,
+        description=func.coalesce(movie_staging.c.description, movie.c.description),
+        release_date=func.coalesce(movie_staging.c.release_date, movie.c.release_date)
+    ).returning(movie.c.id)
+
+    return {row[0] for row in connection.execute(statement)}
+
+
+def insert_new_movies(connection):
+    # One INSERT ... SELECT for the unmatched rows, then the new ids are written back to the staging table
+    movie = Movie.__table__
+    new_rows = select(movie_staging.c.title, movie_staging.c.description, movie_staging.c.release_year,
+                      movie_staging.c.release_date).where(movie_staging.c.movie_id.is_(None)).order_by(movie_staging.c.row_id)
+
+    inserted = connection.execute(
+        insert(movie).from_select(['title', 'description', 'release_year', 'release_date'], new_rows)
+        .returning(movie.c.id, movie.c.title, movie.c.release_year)
+    ).all()
+    if not inserted:
+        return set()
+
+    row_ids = {(title_key(title), release_year): row_id for row_id, title, release_year in connection.execute(
+        select(movie_staging.c.row_id, movie_staging.c.title, movie_staging.c.release_year).where(movie_staging.c.movie_id.is_(None))
+    )}
+    connection.execute(
+        update(movie_staging).where(movie_staging.c.row_id == bindparam('staged_row')).values(movie_id=bindparam('new_id')),
+        [{'staged_row': row_ids[(title_key(title), release_year)], 'new_id': movie_id}
+         for movie_id, title, release_year in inserted]
+    )
+    return {row[0] for row in inserted}
+
+
+def merge_genres(connection):
+    """
+    Creates the missing genres and makes each staged movie's genre set match the source
+    (rows without genres keep their current ones). Returns (created genres, ids of movies whose genres changed).
+    """
+    upsert = UPSERT_DIALECTS[connection.dialect.name]
+    association = movie_genre_association
+
+    created = connection.execute(
+        upsert(Genre.__table__).from_select(
+            ['name'], select(genre_staging.c.genre_name).distinct().where(genre_staging.c.genre_name.isnot(None))
+        ).on_conflict_do_nothing().returning(Genre.id)
+    ).all()
+
+    staged_pairs = genre_staging.join(movie_staging, movie_staging.c.row_id == genre_staging.c.row_id) \
+                                .join(Genre.__table__, Genre.name == genre_staging.c.genre_name)
+
+    added = connection.execute(
+        upsert(association).from_select(
+            ['movie_id', 'genre_id'],
+            select(movie_staging.c.movie_id, Genre.id).select_from(staged_pairs).where(movie_staging.c.movie_id.isnot(None))
+        ).on_conflict_do_nothing().returning(association.c.movie_id)
+    ).all()
+
+    removed = connection.execute(
+        delete(association).where(
+            association.c.movie_id.in_(select(movie_staging.c.movie_id).select_from(
+                movie_staging.join(genre_staging, genre_staging.c.row_id == movie_staging.c.row_id))),
+            ~exists(select(1).select_from(staged_pairs).where(
+                movie_staging.c.movie_id == association.c.movie_id, Genre.id == association.c.genre_id))
+        ).returning(association.c.movie_id)
+    ).all()
+
+    return len(created), {row[0] for row in added} | {row[0] for row in removed}
+
+
+def load_catalog(movies):
+    """
+    Inserts new movies and updates changed ones from an iterable of dicts with
+    title, description, release_year, release_date (date or None) and genres (list of names),
+    in a single transaction. Returns the inserted/updated/unchanged counts.
+    """
+    with database.engine.begin() as connection:
+        staging_metadata.create_all(connection)
+
+        duplicates = stage_rows(connection, movies)
+        matched = connection.execute(
+            select(func.count()).select_from(movie_staging).where(movie_staging.c.movie_id.isnot(None))
+        ).scalar()
+
+        changed_ids = update_matched_movies(connection)
+        new_ids = insert_new_movies(connection)
+        genres_created, genre_changed_ids = merge_genres(connection)
+
+        # Bits for the new genres, then the genre masks of the staged movies
+        if genres_created:
+            assign_genre_bits(connection)
+        refresh_genre_masks(connection, select(movie_staging.c.movie_id).where(movie_staging.c.movie_id.isnot(None)))
+
+        # New movies need their recommender features (and the catalog-wide normalization may shift)
+        if new_ids:
+            refresh_movie_features(connection)
+
+        staging_metadata.drop_all(connection)
+
+    updated = len((changed_ids | genre_changed_ids) - new_ids)
+    return {
+        'inserted': len(new_ids),
+        'updated': updated,
+        'unchanged': matched - updated,
+        'duplicates': duplicates,
+        'genres_created': genres_created
+    }
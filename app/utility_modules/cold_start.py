@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, delete, insert
+from sqlalchemy.orm import selectinload
+from app import app, database
+from app.models import (Movie, Genre, Rating, SeenList, MovieRatingStats, ColdStartPick,
+                        movie_genre_association, user_favorite_genre)
+from app.utility_modules.page_cache import cached_fragment, bump_catalog_version
+
+# Recommendations for users without ratings or seen movies (the engine has nothing to start from).
+# The best movies overall and per genre are ranked in the background (leaderboard_worker.py) and stored
+# in cold_start_pick, so serving them is one small cached query and no scoring at request time.
+#
+# score = quality x popularity
+#   quality     Bayesian average of the IMDb rating and the ratings on this site (each local rating
+#               counts as COLD_START_LOCAL_RATING_WEIGHT votes), pulled towards the mean rating by
+#               COLD_START_PRIOR_VOTES votes, so a few enthusiastic votes do not make a top movie
+#   popularity  log10(10 + votes), between 1 and ~7, so very popular movies lead without drowning the rest
+
+# genre_id of the overall list
+OVERALL = 0
+
+
+def score_movies(connection):
+    # DataFrame (id, score) of every movie, from the IMDb metadata and the local rating stats
+    rows = connection.execute(
+        select(Movie.id, Movie.imdb_votes, Movie.imdb_rating, MovieRatingStats.ratings, MovieRatingStats.score_sum)
+        .outerjoin(MovieRatingStats, MovieRatingStats.movie_id == Movie.id)
+    ).all()
+    df = pd.DataFrame(rows, columns=['id', 'imdb_votes', 'imdb_rating', 'ratings', 'score_sum'], dtype=float)
+    if df.empty:
+        return df.assign(score=[])
+
+    # A rating without votes (or votes without a rating) carries no information
+    has_imdb = df['imdb_votes'].notna() & df['imdb_rating'].notna()
+    imdb_votes = df['imdb_votes'].where(has_imdb, 0.0).to_numpy()
+    imdb_sum = (df['imdb_rating'] * df['imdb_votes']).where(has_imdb, 0.0).to_numpy()
+
+    local_weight = app.config['COLD_START_LOCAL_RATING_WEIGHT']
+    votes = imdb_votes + local_weight * df['ratings'].fillna(0.0).to_numpy()
+    rating_sum = imdb_sum + local_weight * df['score_sum'].fillna(0.0).to_numpy()
+
+    prior_votes = app.config['COLD_START_PRIOR_VOTES']
+    mean_rating = rating_sum.sum() / votes.sum() if votes.sum() else 5.0
+    quality = (rating_sum + prior_votes * mean_rating) / (votes + prior_votes)
+
+    df['id'] = df['id'].astype(int)
+    df['score'] = quality * np.log10(10.0 + votes)
+    return df[['id', 'score']]
+
+
+def refresh_cold_start_lists():
+    """
+    Rebuilds the overall and per-genre lists in one transaction (readers keep the previous lists until
+    it commits). The cached picks (cold_start_ids) are dropped by bumping the catalog version, only
+    when a list changed. Returns the number of lists written.
+    """
+    size = app.config['COLD_START_LIST_SIZE']
+
+    with database.engine.begin() as connection:
+        scores = score_movies(connection)
+        pairs = pd.DataFrame(connection.execute(
+            select(movie_genre_association.c.movie_id, movie_genre_association.c.genre_id)
+        ).all(), columns=['id', 'genre_id'])
+
+        # Best first; ties keep the lower id first so the lists are stable between refreshes
+        ranked = scores.sort_values(['score', 'id'], ascending=[False, True])
+        per_genre = ranked.merge(pairs, on='id')
+        lists = [ranked.head(size).assign(genre_id=OVERALL),
+                 per_genre.sort_values(['score', 'id'], ascending=[False, True]).groupby('genre_id').head(size)]
+        picks = pd.concat(lists, ignore_index=True)
+        picks['position'] = picks.groupby('genre_id').cumcount() + 1
+        rows = [
+            {'genre_id': int(genre_id), 'position': int(position), 'movie_id': int(movie_id), 'score': float(score)}
+            for genre_id, position, movie_id, score in picks[['genre_id', 'position', 'id', 'score']].itertuples(index=False)
+        ]
+
+        # The cache only stores ids, so score drifts alone do not invalidate it
+        previous = set(connection.execute(
+            select(ColdStartPick.genre_id, ColdStartPick.position, ColdStartPick.movie_id)
+        ).tuples())
+        changed = previous != {(row['genre_id'], row['position'], row['movie_id']) for row in rows}
+
+        connection.execute(delete(ColdStartPick))
+        if rows:
+            connection.execute(insert(ColdStartPick), rows)
+
+    # After the commit, so a page rendered in between cannot cache the old picks under the new version
+    if changed:
+        bump_catalog_version()
+    return picks['genre_id'].nunique()
+
+
+def cold_start_ids(genre_ids):
+    """
+    Movie ids for the given genres (or the overall list when empty), best first: the genre lists
+    are merged by score. Served from the page cache, so repeated picks cost no query at all.
+    """
+    list_ids = sorted(set(genre_ids)) or [OVERALL]
+
+    def load():
+        rows = database.session.execute(
+            select(ColdStartPick.movie_id).where(ColdStartPick.genre_id.in_(list_ids))
+            .order_by(ColdStartPick.score.desc(), ColdStartPick.movie_id)
+        ).scalars().all()
+        # A movie of several picked genres appears once; None (a cache miss) until the lists are built,
+        # so an empty result is not served from the cache after the first refresh
+        return list(dict.fromkeys(rows)) or None
+
+    return cached_fragment('cold_start', {'genre': list_ids}, load) or []
+
+
+def cold_start_recommendations(user_id, genre_ids, num_recommendations=20):
+    # Movies of the precomputed lists the user has not seen or rated yet, in ranking order
+    candidate_ids = cold_start_ids(genre_ids)
+    if user_id is not None:
+        excluded_ids = set(database.session.execute(
+            select(SeenList.movie_id).where(SeenList.user_id == user_id)
+            .union(select(Rating.movie_id).where(Rating.user_id == user_id))
+        ).scalars())
+        candidate_ids = [movie_id for movie_id in candidate_ids if movie_id not in excluded_ids]
+
+    selected_ids = candidate_ids[:num_recommendations]
+    movies_by_id = {movie.id: movie for movie in Movie.query.options(
+        selectinload(Movie.genres), selectinload(Movie.poster_image)).filter(Movie.id.in_(selected_ids))}
+    return [movies_by_id[movie_id] for movie_id in selected_ids if movie_id in movies_by_id]
+
+
+def favorite_genre_ids(user_id):
+    # Genres picked by the user during onboarding
+    return database.session.execute(
+        select(user_favorite_genre.c.genre_id).where(user_favorite_genre.c.user_id == user_id)
+    ).scalars().all()
+
+
+def save_favorite_genres(user_id, genre_names):
+    # Replaces the user's picked genres (unknown names are ignored); returns the saved genre ids
+    genre_ids = database.session.execute(select(Genre.id).where(Genre.name.in_(genre_names))).scalars().all()
+
+    database.session.execute(delete(user_favorite_genre).where(user_favorite_genre.c.user_id == user_id))
+    if genre_ids:
+        database.session.execute(insert(user_favorite_genre), [{'user_id': user_id, 'genre_id': genre_id} for genre_id in genre_ids])
+    database.session.commit()
+    return genre_ids
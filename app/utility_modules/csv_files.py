@@ -0,0 +1,106 @@
+import os
+import csv
+import json
+import tempfile
+from datetime import datetime
+from contextlib import contextmanager
+from app.utility_modules.title_normalizer import title_key
+
+# Streaming helpers for the movie CSV files (database/csv/*.csv): rows are read one at a time
+# and files are only ever replaced whole, through a temporary file renamed over the original,
+# so an interrupted script leaves either the old or the new version, never half a file.
+
+DELIMITER = ';'
+MOVIE_FIELDNAMES = ['title', 'description', 'release_year', 'release_date', 'genres']
+
+
+def movie_key(row):
+    # Natural key of a movie, the same one load_catalog matches on (normalized title + release year)
+    year = str(row.get('release_year') or '').strip()
+    return title_key(row['title']), int(year) if year.isdigit() else None
+
+
+def movie_from_row(row):
+    # Converts a CSV row to the dict expected by load_catalog
+    return {
+        'title': row['title'],
+        'description': row.get('description'),
+        # Parse the release year and date from the CSV row, handling missing values
+        'release_year': int(row['release_year']) if row.get('release_year') else None,
+        'release_date': datetime.strptime(row['release_date'], '%Y-%m-%d').date() if row.get('release_date') else None,
+        'genres': [g.strip() for g in (row.get('genres') or '').split(',') if g.strip()]
+    }
+
+
+def read_fieldnames(path):
+    # Header of a CSV file, or None if the file is missing or empty
+    if not os.path.exists(path):
+        return None
+    with open(path, mode='r', encoding='utf-8', newline='') as csv_file:
+        return csv.DictReader(csv_file, delimiter=DELIMITER).fieldnames
+
+
+def read_csv_rows(path, missing_ok=False):
+    # Yields the rows of a CSV file as dicts
+    if missing_ok and not os.path.exists(path):
+        return
+    with open(path, mode='r', encoding='utf-8', newline='') as csv_file:
+        yield from csv.DictReader(csv_file, delimiter=DELIMITER)
+
+
+def read_keys(path):
+    # Set of movie keys of a CSV file (only the keys are kept in memory)
+    return {movie_key(row) for row in read_csv_rows(path, missing_ok=True)}
+
+
+@contextmanager
+def atomic_write(path, mode='w'):
+    """
+    Opens a temporary file next to `path` and, if the block succeeds, flushes it to disk
+    and renames it over `path` (atomic on POSIX and Windows). On error the original is left untouched.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, mode, encoding='utf-8', newline='') as temp_file:
+            yield temp_file
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def write_csv_rows(path, fieldnames, rows):
+    # Atomically replaces `path` with the given rows (any iterable, streamed); returns the number written
+    count = 0
+    with atomic_write(path) as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=fieldnames, delimiter=DELIMITER, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_json(path, data):
+    with atomic_write(path) as json_file:
+        json.dump(data, json_file, indent=2)
+
+
+def dedupe(rows, seen=None, counter=None):
+    """
+    Drops rows whose movie key was already seen (first row wins). `seen` can be pre-filled
+    with keys to exclude and is updated in place; `counter` (a dict) counts the dropped rows under 'duplicates'.
+    """
+    seen = set() if seen is None else seen
+    for row in rows:
+        key = movie_key(row)
+        if key in seen:
+            if counter is not None:
+                counter['duplicates'] = counter.get('duplicates', 0) + 1
+            continue
+        seen.add(key)
+        yield row
@@ -1,41 +1,154 @@
-import pandas as pd
+import csv
+import json
+import zlib
 from io import StringIO
-from flask import make_response
+from flask import Response, stream_with_context
+from sqlalchemy import literal, null, union_all
+from app import database
+from app.models import Movie, Rating, SeenList, ToWatchList
 
-def export_movie_list_to_csv(data_list, filename="movie_export.csv"):
+# Number of rows fetched from the database (and written to the response) per chunk
+EXPORT_CHUNK_SIZE = 1000
+
+# CSV headers of the list exports (kept identical to the previous pandas-based export)
+LIST_CSV_HEADER = ['ID Film', 'Titlu', 'An Lansare', 'Data Adaugarii']
+ACCOUNT_CSV_HEADER = ['Lista', 'ID Film', 'Titlu', 'An Lansare', 'Nota', 'Data Adaugarii']
+
+# Field names used by the JSON Lines exports
+LIST_JSON_FIELDS = ['movie_id', 'title', 'release_year', 'date_added']
+ACCOUNT_JSON_FIELDS = ['list', 'movie_id', 'title', 'release_year', 'score', 'date_added']
+
+
+def movie_list_query(list_model, user_id):
+    # One joined query instead of loading every list entry and then each movie lazily
+    return database.session.query(
+        list_model.movie_id, Movie.title, Movie.release_year, list_model.date_added
+    ).join(Movie, Movie.id == list_model.movie_id).filter(
+        list_model.user_id == user_id
+    ).order_by(list_model.date_added)
+
+
+def account_query(user_id):
+    # Ratings, seen list and watchlist combined into a single UNION ALL statement
+    ratings = database.session.query(
+        literal('rating').label('list'), Rating.movie_id, Movie.title, Movie.release_year,
+        Rating.score.label('score'), Rating.timestamp.label('date_added')
+    ).join(Movie, Movie.id == Rating.movie_id).filter(Rating.user_id == user_id)
+
+    seen = database.session.query(
+        literal('seen').label('list'), SeenList.movie_id, Movie.title, Movie.release_year,
+        null().label('score'), SeenList.date_added
+    ).join(Movie, Movie.id == SeenList.movie_id).filter(SeenList.user_id == user_id)
+
+    to_watch = database.session.query(
+        literal('watchlist').label('list'), ToWatchList.movie_id, Movie.title, Movie.release_year,
+        null().label('score'), ToWatchList.date_added
+    ).join(Movie, Movie.id == ToWatchList.movie_id).filter(ToWatchList.user_id == user_id)
+
+    return database.session.execute(
+        union_all(ratings.statement, seen.statement, to_watch.statement),
+        execution_options={'yield_per': EXPORT_CHUNK_SIZE}
+    )
+
+
+def format_row(row):
+    # Convert dates to the export format and leave every other value untouched
+    return [value.strftime('%Y-%m-%d %H:%M:%S') if hasattr(value, 'strftime') else value for value in row]
+
+
+def csv_chunks(header, rows):
+    """Yields the header at once (the download starts before the query runs), then the rows in chunks of EXPORT_CHUNK_SIZE."""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for index, row in enumerate(rows, start=1):
+        writer.writerow(format_row(row))
+        if index % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def jsonl_chunks(fields, rows):
     """
-    Converts a list of ORM objects (e.g., SeenList, ToWatchList) into a CSV response.
-    The data is formatted into a downloadable file.
-    
-    :param data_list: List of objects (usually SeenList or ToWatchList)
-    :param filename: The name of the file to download
-    :return: Flask Response object with CSV data
+    Yields one JSON object per line: the first line on its own (there is no header to start the download
+    with), then the others grouped in chunks of EXPORT_CHUNK_SIZE rows.
     """
-    if not data_list:
-        data = [{"Message": "Nu au fost găsite date pentru export."}]
-    else:
-        data = []
-        for item in data_list:
-            # Ensure the 'movie' relationship is available (define 'backref' in models.py)
-            movie = item.movie # Assume a defined relationship or try accessing item.movie
-            
-            movie_data = {
-                'ID Film': item.movie_id,
-                'Titlu': movie.title,
-                'An Lansare': movie.release_year,
-                'Data Adaugarii': item.date_added.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            data.append(movie_data)
-
-    # Create a Pandas DataFrame
-    df = pd.DataFrame(data)
-
-    # Save to CSV in an in-memory buffer (StringIO)
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
-    
-    # Create the Flask response for download
-    response = make_response(csv_buffer.getvalue())
+    lines = []
+    for index, row in enumerate(rows):
+        lines.append(json.dumps(dict(zip(fields, format_row(row))), ensure_ascii=False))
+        if index == 0 or len(lines) == EXPORT_CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(chunks):
+    # Compress the text stream incrementally (wbits=31 produces a gzip container)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for index, chunk in enumerate(chunks):
+        data = compressor.compress(chunk.encode('utf-8'))
+        # zlib holds small inputs back: flush the first chunk so it is sent at once too
+        if index == 0:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def streaming_export_response(chunks, filename, export_format='csv', compress=False):
+    """
+    Wraps a chunk generator into a downloadable streaming response.
+    Rows are produced while the response is being sent, so memory stays constant in the list size.
+    """
+    mimetype = 'application/x-ndjson' if export_format == 'jsonl' else 'text/csv'
+
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename = f"{filename}.gz"
+        mimetype = 'application/gzip'
+
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
     response.headers["Content-Disposition"] = f"attachment; filename={filename}"
-    response.headers["Content-type"] = "text/csv"
     return response
+
+
+def export_movie_list(list_model, user_id, filename="movie_export", export_format='csv', compress=False):
+    """
+    Streams a user's SeenList or ToWatchList as CSV or JSON Lines (optionally gzipped).
+
+    :param list_model: SeenList or ToWatchList
+    :param user_id: Owner of the list
+    :param filename: The name of the file to download, without extension
+    :param export_format: 'csv' or 'jsonl'
+    :param compress: Gzip the response body
+    :return: Flask streaming Response
+    """
+    rows = movie_list_query(list_model, user_id).yield_per(EXPORT_CHUNK_SIZE)
+
+    if export_format == 'jsonl':
+        chunks = jsonl_chunks(LIST_JSON_FIELDS, rows)
+    else:
+        chunks = csv_chunks(LIST_CSV_HEADER, rows)
+
+    return streaming_export_response(chunks, f"{filename}.{export_format}", export_format, compress)
+
+
+def export_account(user_id, filename="parallax_account", export_format='csv', compress=False):
+    """Streams every rating, seen entry and watchlist entry of a user in a single pass."""
+    rows = account_query(user_id)
+
+    if export_format == 'jsonl':
+        chunks = jsonl_chunks(ACCOUNT_JSON_FIELDS, rows)
+    else:
+        chunks = csv_chunks(ACCOUNT_CSV_HEADER, rows)
+
+    return streaming_export_response(chunks, f"{filename}.{export_format}", export_format, compress)
@@ -0,0 +1,88 @@
+import time
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import request, session
+from flask_sqlalchemy.session import Session
+
+# Bind keys of the read replicas start with this prefix (see Config.SQLALCHEMY_BINDS)
+REPLICA_BIND_PREFIX = 'replica'
+
+# 'replica' lets plain SELECTs use a replica; anything else keeps every statement on the primary
+_database_route = ContextVar('database_route', default='primary')
+
+
+def is_plain_select(clause):
+    # SELECT (or UNION of SELECTs) without FOR UPDATE; everything else must run on the primary
+    return (clause is not None
+            and getattr(clause, 'is_select', False)
+            and getattr(clause, '_for_update_arg', None) is None)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends read-only statements to a replica while the current route allows it.
+    Writes, flushes, locking reads and every read after a write in the same session go to the primary.
+    The replica is picked once per session (one request), so all its reads (a page and its COUNT,
+    a list and its details) see the same replication position.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                # Remember the write so later reads of this session see it
+                self.info['wrote'] = True
+            elif _database_route.get() == 'replica' and not self.info.get('wrote') and is_plain_select(clause):
+                if 'replica' not in self.info:
+                    replicas = [engine for key, engine in self._db.engines.items()
+                                if key and key.startswith(REPLICA_BIND_PREFIX)]
+                    self.info['replica'] = random.choice(replicas) if replicas else None
+                if self.info['replica'] is not None:
+                    return self.info['replica']
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def read_from_replica():
+    """Allows replica reads inside the block (for batch loads that tolerate replication lag)."""
+    token = _database_route.set('replica')
+    try:
+        yield
+    finally:
+        _database_route.reset(token)
+
+
+def use_primary(view):
+    # Marks a GET view whose reads must not be served by a replica
+    view.use_primary_database = True
+    return view
+
+
+def init_db_routing(app, database):
+    """
+    Routes read-only requests (GET/HEAD/OPTIONS) to the replicas, except for views marked
+    with @use_primary and for users who wrote something in the last few seconds.
+    """
+
+    @app.before_request
+    def choose_database_route():
+        view = app.view_functions.get(request.endpoint)
+        read_only = (request.method in ('GET', 'HEAD', 'OPTIONS')
+                     and not getattr(view, 'use_primary_database', False)
+                     and session.get('db_primary_until', 0) < time.time())
+
+        request.database_route_token = _database_route.set('replica' if read_only else 'primary')
+
+    @app.after_request
+    def remember_recent_write(response):
+        # Read-your-writes: keep this user on the primary until the replicas have caught up
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') or database.session.info.get('wrote'):
+            session['db_primary_until'] = time.time() + app.config['REPLICA_READ_YOUR_WRITES_SECONDS']
+        return response
+
+    @app.teardown_request
+    def reset_database_route(exception=None):
+        token = getattr(request, 'database_route_token', None)
+        if token is not None:
+            _database_route.reset(token)
@@ -1,15 +1,24 @@
-from flask_mail import Message
-from flask import url_for, render_template_string
-from app import mail
+from flask import url_for
+from app import database
+from app.models import OutgoingEmail
+
+def queue_email(recipient, subject, html):
+    """
+    Stores an email in the outbox table; the mail worker delivers it in the background.
+    The caller commits the session, so the email is saved together with the data that triggered it.
+    """
+    email = OutgoingEmail(recipient=recipient, subject=subject, html=html)
+    database.session.add(email)
+    return email
 
 def send_confirmation_email(user_email):
     from app.utility_modules.token_manager import generate_confirmation_token
-    
+
     token = generate_confirmation_token(user_email)
-    
+
     # Create the verification link pointing to the confirm_email route
     confirm_url = url_for('confirm_email', token=token, _external=True)
-    
+
     html = f"""
     <p>Welcome! Thanks for signing up for parallax.</p>
     <p>Please follow this link to activate your account:</p>
@@ -17,11 +26,6 @@ def send_confirmation_email(user_email):
     <br>
     <p>If you did not sign up, please ignore this email.</p>
     """
-    
-    msg = Message(
-        subject='Confirm your email (PARALLAX)',
-        recipients=[user_email],
-        html=html
-    )
-    
-    mail.send(msg)
+
+    # Queue the message instead of talking to the SMTP server inside the request
+    return queue_email(user_email, 'Confirm your email (PARALLAX)', html)
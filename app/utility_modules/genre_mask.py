@@ -0,0 +1,136 @@
+from sqlalchemy import event, select, update, func, literal, BigInteger, and_, or_
+from sqlalchemy import inspect as inspect_state
+from app.models import Movie, Genre, movie_genre_association
+
+# Every genre owns one bit (Genre.bit) and Movie.genre_mask is the OR of the bits of the movie's
+# genres, so genre filters are a single predicate on the movie row: no join through
+# movie_genre_association, no duplicate rows for multi-genre movies (and correct pagination counts).
+#   any of the genres:  genre_mask & wanted != 0
+#   all of the genres:  genre_mask & wanted = wanted
+# The mask is kept up to date on writes: set-based loads call refresh_genre_masks() and ORM
+# changes to Movie.genres are picked up after each flush (init_genre_masks).
+
+# Bits 0..62 (the sign bit of the BIGINT is left alone); genres beyond that get no bit and
+# are filtered through the association table instead
+MAX_GENRE_BITS = 63
+
+
+def bit_value(bit_column):
+    # 2^bit as a BIGINT expression
+    return literal(1, BigInteger).op('<<')(bit_column)
+
+
+def clear_genre_bit(connection, bit):
+    # Removes a bit from every mask (left behind by a deleted genre); returns the number of changed movies
+    movie = Movie.__table__
+    return connection.execute(
+        update(movie).where(movie.c.genre_mask.op('&')(1 << bit) != 0).values(genre_mask=movie.c.genre_mask.op('&')(~(1 << bit)))
+    ).rowcount
+
+
+def assign_genre_bits(connection):
+    # Gives the next free bit to every genre without one (in id order); returns the number assigned
+    next_bit = connection.execute(select(func.coalesce(func.max(Genre.bit) + 1, 0))).scalar()
+    unassigned = connection.execute(select(Genre.id).where(Genre.bit.is_(None)).order_by(Genre.id)).scalars().all()
+
+    assigned = 0
+    for genre_id in unassigned:
+        if next_bit >= MAX_GENRE_BITS:
+            break
+        # The bit may have belonged to a deleted genre (the highest one): its movies must not
+        # match the new genre, whichever way the old one was deleted
+        clear_genre_bit(connection, next_bit)
+        connection.execute(update(Genre).where(Genre.id == genre_id).values(bit=next_bit))
+        next_bit += 1
+        assigned += 1
+    return assigned
+
+
+def refresh_genre_masks(connection, movie_ids=None):
+    """
+    Recomputes Movie.genre_mask from the association table with one UPDATE, for the given
+    movie ids (a list or a subquery) or for the whole catalog; returns the number of changed movies.
+    The association primary key guarantees each bit is summed once, so the SUM is the bitwise OR.
+    """
+    movie = Movie.__table__
+    mask = select(func.coalesce(func.sum(bit_value(Genre.bit)), 0)).select_from(
+        movie_genre_association.join(Genre, Genre.id == movie_genre_association.c.genre_id)
+    ).where(movie_genre_association.c.movie_id == movie.c.id, Genre.bit.isnot(None)).scalar_subquery()
+
+    # Rows whose mask is already right are not rewritten
+    statement = update(movie).where(movie.c.genre_mask != mask).values(genre_mask=mask)
+    if movie_ids is not None:
+        statement = statement.where(movie.c.id.in_(movie_ids))
+    return connection.execute(statement).rowcount
+
+
+def genre_filter(names, match_all=False):
+    """
+    SQL condition for movies having any (or all, with match_all) of the named genres.
+    Genres without a bit fall back to an EXISTS on the association table.
+    """
+    genres = Genre.query.with_entities(Genre.id, Genre.bit).filter(Genre.name.in_(names)).all()
+    if match_all and len(genres) < len(set(names)):
+        # An unknown genre can never be matched by every movie
+        return literal(False)
+
+    wanted = sum(1 << bit for _, bit in genres if bit is not None)
+    unindexed = [genre_id for genre_id, bit in genres if bit is None]
+    conditions = []
+
+    if wanted:
+        masked = Movie.genre_mask.op('&')(wanted)
+        conditions.append(masked == wanted if match_all else masked != 0)
+    for genre_id in unindexed:
+        conditions.append(Movie.genres.any(Genre.id == genre_id))
+
+    if not conditions:
+        return literal(False)
+    return and_(*conditions) if match_all else or_(*conditions)
+
+
+def genre_names_by_bit():
+    # {bit: name} for rendering masks (one small query)
+    return dict(Genre.query.with_entities(Genre.bit, Genre.name).filter(Genre.bit.isnot(None)).all())
+
+
+def mask_genre_names(mask, names_by_bit):
+    # Genre names of a mask, in bit order (the order genres were created in)
+    return [name for bit, name in sorted(names_by_bit.items()) if mask and mask >> bit & 1]
+
+
+def card_genres(movies):
+    # {movie id: genre names} for movie cards, from the masks (one small query instead of one per movie)
+    names_by_bit = genre_names_by_bit()
+    return {movie.id: mask_genre_names(movie.genre_mask, names_by_bit) for movie in movies}
+
+
+def _after_flush(session, flush_context):
+    # New genres get their bit, then the masks of movies whose genre list changed are recomputed
+    # (inside the same transaction, through the flush's own connection)
+    new_genres = [instance for instance in session.new if isinstance(instance, Genre)]
+    changed_movies = [
+        instance for instance in list(session.new) + list(session.dirty)
+        if isinstance(instance, Movie) and inspect_state(instance).attrs.genres.history.has_changes()
+    ]
+    if not new_genres and not changed_movies:
+        return
+
+    connection = session.connection()
+    if new_genres:
+        assign_genre_bits(connection)
+    if changed_movies:
+        refresh_genre_masks(connection, [movie.id for movie in changed_movies])
+    # The in-memory values are reloaded once the flush is over
+    session.info.setdefault('genre_mask_stale', []).extend(new_genres + changed_movies)
+
+
+def _after_flush_postexec(session, flush_context):
+    for instance in session.info.pop('genre_mask_stale', []):
+        session.expire(instance, ['bit' if isinstance(instance, Genre) else 'genre_mask'])
+
+
+def init_genre_masks(session_class):
+    """Keeps the masks in sync with ORM writes (admin edits, scripts using the models)."""
+    event.listen(session_class, 'after_flush', _after_flush)
+    event.listen(session_class, 'after_flush_postexec', _after_flush_postexec)
@@ -0,0 +1,283 @@
+import time
+import threading
+from datetime import date, datetime, time as day_start, timedelta
+from sqlalchemy import select, delete, update, union, exists, func, cast, or_, text, tuple_, bindparam, Float
+from sqlalchemy.orm import selectinload
+from app import app, database
+from app.models import Movie, Rating, RatingRollup, MovieRatingStats, StaleRollupMovie
+from app.utility_modules.sql_helpers import UPSERT_DIALECTS, dialect_insert
+from app.utility_modules.cold_start import refresh_cold_start_lists
+from app.utility_modules.poster_cache import poster_sources
+
+# Leaderboards ("trending this week", "highest rated", "most rated") are read from two rollup tables
+# instead of aggregating the Rating table per request:
+#   rating_rollup        ratings and score sum per movie and UTC day (the time buckets)
+#   movie_rating_stats   per movie totals, recent (trending window) count and Bayesian average
+# A refresh recounts only the days from the newest bucket (minus LEADERBOARD_LOOKBACK_DAYS) on, through
+# the Rating.timestamp index, and re-sums the movies whose buckets changed. Edits and deletions of older
+# ratings, and imported ratings with old dates, mark their movie in stale_rollup_movie (mark_stale_movies);
+# the next refresh recounts all the buckets of those movies only.
+# Reads walk one index of movie_rating_stats from the last movie of the previous page (keyset pagination),
+# so any page costs O(page size) at any rating volume.
+
+# Advisory lock key that keeps two refreshes from running at once on PostgreSQL
+REFRESH_LOCK_KEY = 4702
+
+# Stale movies recounted per refresh (a large import leaves the rest to the following refreshes)
+STALE_MOVIES_PER_REFRESH = 1000
+
+# Leaderboard name -> (title, filter, ranking columns); movies are listed by the columns in descending
+# order, which matches an index of movie_rating_stats (the unique movie_id last breaks the ties)
+LEADERBOARDS = {
+    'trending': ('Trending this week', MovieRatingStats.recent_ratings > 0,
+                 (MovieRatingStats.recent_ratings, MovieRatingStats.bayesian_average, MovieRatingStats.movie_id)),
+    'top_rated': ('Highest rated', None,
+                  (MovieRatingStats.bayesian_average, MovieRatingStats.movie_id)),
+    'most_rated': ('Most rated', None,
+                   (MovieRatingStats.ratings, MovieRatingStats.movie_id))
+}
+
+
+def mark_stale_movies(changes):
+    """
+    Marks the movies of the changed ratings, given as (movie_id, rating timestamp) pairs, whose day lies
+    before the days the next incremental refresh recounts. Runs in the caller's transaction, so the mark
+    commits together with the change. Returns the number of movies marked.
+    """
+    now = datetime.utcnow()
+    # The refresh recounts from its newest bucket minus LEADERBOARD_LOOKBACK_DAYS; one day of margin
+    # covers a refresh running after midnight
+    recounted_from = datetime.combine(now.date() - timedelta(days=max(0, app.config['LEADERBOARD_LOOKBACK_DAYS'] - 1)), day_start.min)
+    movie_ids = sorted({movie_id for movie_id, timestamp in changes if timestamp is not None and timestamp < recounted_from})
+    if not movie_ids:
+        return 0
+
+    # Sorted, so two imports marking the same movies lock them in the same order
+    statement = dialect_insert(StaleRollupMovie)
+    statement = statement.on_conflict_do_update(
+        index_elements=[StaleRollupMovie.movie_id],
+        set_={'marked_at': statement.excluded.marked_at}
+    )
+    database.session.execute(statement, [{'movie_id': movie_id, 'marked_at': now} for movie_id in movie_ids])
+    return len(movie_ids)
+
+
+def refresh_rollup(connection, since):
+    # Replaces the day buckets from `since` on with fresh counts; returns the number of buckets written
+    rollup = RatingRollup.__table__
+    rating = Rating.__table__
+    day = func.date(rating.c.timestamp)
+
+    connection.execute(delete(rollup).where(rollup.c.day >= since))
+    result = connection.execute(rollup.insert().from_select(
+        ['movie_id', 'day', 'ratings', 'score_sum'],
+        select(rating.c.movie_id, day, func.count(), func.sum(rating.c.score))
+        .where(rating.c.timestamp >= datetime.combine(since, day_start.min))
+        # Day first: grouping by movie_id first lets the planner prefer a full scan of the movie_id index
+        .group_by(day, rating.c.movie_id)
+    ))
+    return result.rowcount
+
+
+def refresh_stale_movies(connection, since):
+    """
+    Recounts the buckets before `since` of the movies marked stale (refresh_rollup recounts the later ones)
+    and removes their marks. Returns the ids of the recounted movies.
+    """
+    rollup = RatingRollup.__table__
+    rating = Rating.__table__
+    stale = StaleRollupMovie.__table__
+    day = func.date(rating.c.timestamp)
+
+    marks = connection.execute(
+        select(stale.c.movie_id, stale.c.marked_at).order_by(stale.c.marked_at).limit(STALE_MOVIES_PER_REFRESH)
+    ).all()
+    if not marks:
+        return []
+    movie_ids = [movie_id for movie_id, _ in marks]
+
+    if since > date.min:
+        connection.execute(delete(rollup).where(rollup.c.movie_id.in_(movie_ids), rollup.c.day < since))
+        connection.execute(rollup.insert().from_select(
+            ['movie_id', 'day', 'ratings', 'score_sum'],
+            select(rating.c.movie_id, day, func.count(), func.sum(rating.c.score))
+            .where(rating.c.movie_id.in_(movie_ids), rating.c.timestamp < datetime.combine(since, day_start.min))
+            .group_by(rating.c.movie_id, day)
+        ))
+
+    # A movie marked again after the marks were read keeps its (newer) mark for the next refresh
+    connection.execute(
+        delete(stale).where(stale.c.movie_id == bindparam('mark_movie_id'), stale.c.marked_at == bindparam('mark_marked_at')),
+        [{'mark_movie_id': movie_id, 'mark_marked_at': marked_at} for movie_id, marked_at in marks]
+    )
+    return movie_ids
+
+
+def refresh_totals(connection, since, stale_ids=()):
+    """
+    Re-sums the buckets of every movie that has (or had) a bucket from `since` on, or whose older buckets
+    were recounted (stale_ids), and removes the movies left without ratings. Returns the number of movies updated.
+    """
+    rollup = RatingRollup.__table__
+    stats = MovieRatingStats.__table__
+
+    changed_buckets = rollup.c.day >= since
+    changed_stats = stats.c.last_rated >= since
+    if stale_ids:
+        changed_buckets = or_(changed_buckets, rollup.c.movie_id.in_(stale_ids))
+        changed_stats = or_(changed_stats, stats.c.movie_id.in_(stale_ids))
+
+    touched = union(
+        select(rollup.c.movie_id).where(changed_buckets),
+        select(stats.c.movie_id).where(changed_stats)
+    )
+    totals = select(
+        rollup.c.movie_id, func.sum(rollup.c.ratings), func.sum(rollup.c.score_sum), func.max(rollup.c.day)
+    ).where(rollup.c.movie_id.in_(touched)).group_by(rollup.c.movie_id)
+
+    statement = UPSERT_DIALECTS[connection.dialect.name](stats).from_select(
+        ['movie_id', 'ratings', 'score_sum', 'last_rated'], totals
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[stats.c.movie_id],
+        set_={'ratings': statement.excluded.ratings, 'score_sum': statement.excluded.score_sum,
+              'last_rated': statement.excluded.last_rated}
+    )
+    updated = connection.execute(statement).rowcount
+
+    connection.execute(delete(stats).where(
+        changed_stats, ~exists().where(rollup.c.movie_id == stats.c.movie_id)
+    ))
+    return updated
+
+
+def refresh_scores(connection, today):
+    # Trending counts (only movies rated inside the window or still counted from before) and Bayesian averages
+    rollup = RatingRollup.__table__
+    stats = MovieRatingStats.__table__
+    window_start = today - timedelta(days=app.config['LEADERBOARD_TRENDING_DAYS'] - 1)
+
+    recent = select(func.coalesce(func.sum(rollup.c.ratings), 0)).where(
+        rollup.c.movie_id == stats.c.movie_id, rollup.c.day >= window_start
+    ).scalar_subquery()
+    connection.execute(update(stats).where(
+        or_(stats.c.recent_ratings > 0, stats.c.last_rated >= window_start), stats.c.recent_ratings != recent
+    ).values(recent_ratings=recent))
+
+    # Bayesian average: (m * global mean + score sum) / (m + ratings), so a movie with a handful of
+    # 10s does not outrank one with thousands of 9s; rows whose score did not change are not rewritten
+    total_ratings, total_score = connection.execute(select(func.sum(stats.c.ratings), func.sum(stats.c.score_sum))).one()
+    if not total_ratings:
+        return
+    prior_weight = app.config['LEADERBOARD_PRIOR_RATINGS']
+    prior_mean = float(total_score) / float(total_ratings)
+    bayesian = (prior_weight * prior_mean + cast(stats.c.score_sum, Float)) / (prior_weight + stats.c.ratings)
+    connection.execute(update(stats).where(stats.c.bayesian_average != bayesian).values(bayesian_average=bayesian))
+
+
+def refresh_leaderboards(full=False, today=None):
+    """
+    Brings the rollup tables up to date in one transaction (readers keep the previous leaderboards
+    until it commits). Incremental by default; full=True rebuilds them from the whole Rating table.
+    Returns a summary dict, or None when another refresh is running.
+    """
+    today = today or datetime.utcnow().date()
+
+    with database.engine.begin() as connection:
+        if connection.dialect.name == 'postgresql':
+            if not connection.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {'key': REFRESH_LOCK_KEY}).scalar():
+                return None
+
+        latest = None if full else connection.execute(select(func.max(RatingRollup.day))).scalar()
+        # An empty rollup is rebuilt from the first rating on
+        since = latest - timedelta(days=app.config['LEADERBOARD_LOOKBACK_DAYS']) if latest else date.min
+
+        # A full rebuild recounts every bucket, so it only clears the marks
+        stale_ids = refresh_stale_movies(connection, since)
+        buckets = refresh_rollup(connection, since)
+        movies = refresh_totals(connection, since, stale_ids)
+        refresh_scores(connection, today)
+
+    return {'since': since, 'buckets': buckets, 'movies': movies, 'stale': len(stale_ids)}
+
+
+def leaderboard_page(name, after=None, per_page=20):
+    """
+    Returns ([(movie, stats), ...], has_next) for the page following the movie `after` (the first page
+    when None), or None when that movie is no longer ranked. Reads per_page + 1 rows along the
+    leaderboard's index from the position of `after` (no OFFSET, no COUNT over the whole table).
+    """
+    _, condition, columns = LEADERBOARDS[name]
+    # Both the page and the JSON entries show the cached posters
+    query = (database.session.query(Movie, MovieRatingStats).join(MovieRatingStats, MovieRatingStats.movie_id == Movie.id)
+             .options(selectinload(Movie.poster_image)))
+    if condition is not None:
+        query = query.filter(condition)
+
+    if after is not None:
+        # WHERE (ranking columns) < (those of the last movie shown), one primary key lookup first
+        position = database.session.execute(select(*columns).where(MovieRatingStats.movie_id == after)).first()
+        if position is None:
+            return None
+        query = query.filter(tuple_(*columns) < tuple_(*position))
+
+    rows = query.order_by(*(column.desc() for column in columns)).limit(per_page + 1).all()
+    return rows[:per_page], len(rows) > per_page
+
+
+def leaderboard_entry(movie, stats):
+    # JSON form of a leaderboard row (the thumbnail is the external poster until a local copy exists)
+    thumbnail = poster_sources(movie, 'thumb', external=True)
+    return {
+        'id': movie.id,
+        'title': movie.title,
+        'release_year': movie.release_year,
+        'poster_url': movie.poster_url,
+        'poster_thumbnail_url': thumbnail['jpg'] if thumbnail else movie.poster_url,
+        'ratings': stats.ratings,
+        'average': round(stats.score_sum / stats.ratings, 2),
+        'bayesian_average': round(stats.bayesian_average, 2),
+        'recent_ratings': stats.recent_ratings
+    }
+
+
+def run_leaderboard_worker(stop_event=None):
+    """
+    Refreshes the leaderboards every LEADERBOARD_REFRESH_INTERVAL seconds (or until stop_event is set),
+    with a full rebuild every LEADERBOARD_FULL_REFRESH_HOURS hours. The cold-start lists, which use the
+    same rating stats, are rebuilt at start and every COLD_START_REFRESH_INTERVAL seconds.
+    """
+    interval = app.config['LEADERBOARD_REFRESH_INTERVAL']
+    full_interval = app.config['LEADERBOARD_FULL_REFRESH_HOURS'] * 3600
+    cold_start_interval = app.config['COLD_START_REFRESH_INTERVAL']
+    stop_event = stop_event or threading.Event()
+    last_full = time.monotonic()
+    last_cold_start = None
+
+    print(f"Leaderboard worker started (refresh every {interval:g}s, full rebuild every {full_interval / 3600:g}h).")
+
+    while not stop_event.is_set():
+        full = time.monotonic() - last_full >= full_interval
+        started = time.monotonic()
+        with app.app_context():
+            try:
+                summary = refresh_leaderboards(full=full)
+                if full:
+                    last_full = started
+                if summary:
+                    print(f"Leaderboards refreshed{' (full)' if full else ''} from {summary['since']}: "
+                          f"{summary['buckets']} buckets, {summary['stale']} stale movies recounted, "
+                          f"{summary['movies']} movies in {time.monotonic() - started:.2f}s.")
+            except Exception as e:
+                print(f"Leaderboard worker error: {e}")
+
+            if last_cold_start is None or time.monotonic() - last_cold_start >= cold_start_interval:
+                started = time.monotonic()
+                try:
+                    lists = refresh_cold_start_lists()
+                    last_cold_start = started
+                    print(f"Cold-start lists rebuilt: {lists} lists in {time.monotonic() - started:.2f}s.")
+                except Exception as e:
+                    print(f"Cold-start refresh error: {e}")
+
+        stop_event.wait(interval)
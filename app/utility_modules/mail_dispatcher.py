@@ -0,0 +1,111 @@
+import random
+import threading
+from datetime import datetime, timedelta
+from flask_mail import Message
+from app import app, database, mail
+from app.models import OutgoingEmail
+
+# Retry delays grow exponentially from BACKOFF_BASE_SECONDS up to BACKOFF_MAX_SECONDS
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+
+
+def claim_due_emails(batch_size):
+    """
+    Selects the pending emails whose next attempt is due.
+    On PostgreSQL the rows are locked with SKIP LOCKED so several workers never send the same email.
+    """
+    query = OutgoingEmail.query.filter(
+        OutgoingEmail.status == 'pending',
+        OutgoingEmail.next_attempt_at <= datetime.utcnow()
+    ).order_by(OutgoingEmail.next_attempt_at).limit(batch_size)
+
+    if database.engine.dialect.name == 'postgresql':
+        query = query.with_for_update(skip_locked=True)
+
+    return query.all()
+
+
+def schedule_retry(email, error):
+    # Record the failure and push the next attempt back (with jitter), or give up after the last attempt
+    email.attempts += 1
+    email.last_error = str(error)[:1000]
+
+    if email.attempts >= app.config['MAIL_WORKER_MAX_ATTEMPTS']:
+        email.status = 'failed'
+        return
+
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (email.attempts - 1), BACKOFF_MAX_SECONDS)
+    email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def dispatch_pending_emails(batch_size=None):
+    """
+    Sends one batch of due emails over a single SMTP connection and returns how many were sent.
+    Must be called inside an application context.
+    """
+    batch_size = batch_size or app.config['MAIL_WORKER_BATCH_SIZE']
+    emails = claim_due_emails(batch_size)
+
+    if not emails:
+        # Close the (possibly locking) transaction
+        database.session.commit()
+        return 0
+
+    sent_count = 0
+    pending = list(emails)
+
+    try:
+        # Reuse one connection for the whole batch instead of reconnecting per email
+        with mail.connect() as connection:
+            while pending:
+                email = pending[0]
+                try:
+                    connection.send(Message(subject=email.subject, recipients=[email.recipient], html=email.html))
+                    email.status = 'sent'
+                    email.sent_at = datetime.utcnow()
+                    email.attempts += 1
+                    sent_count += 1
+                except Exception as e:
+                    schedule_retry(email, e)
+                pending.pop(0)
+    except Exception as e:
+        # The SMTP connection itself failed: retry every email that was not handled yet
+        for email in pending:
+            schedule_retry(email, e)
+
+    database.session.commit()
+    return sent_count
+
+
+def run_mail_worker(poll_interval=None, stop_event=None):
+    """
+    Drains the outbox forever (or until stop_event is set).
+    It keeps sending batches while there is work and sleeps for poll_interval seconds when idle.
+    """
+    poll_interval = poll_interval or app.config['MAIL_WORKER_POLL_INTERVAL']
+    stop_event = stop_event or threading.Event()
+
+    print(f"Mail worker started (batch size {app.config['MAIL_WORKER_BATCH_SIZE']}, poll interval {poll_interval}s).")
+
+    while not stop_event.is_set():
+        with app.app_context():
+            try:
+                sent_count = dispatch_pending_emails()
+            except Exception as e:
+                database.session.rollback()
+                print(f"Mail worker error: {e}")
+                sent_count = 0
+
+        if sent_count:
+            print(f"Mail worker sent {sent_count} emails.")
+        else:
+            stop_event.wait(poll_interval)
+
+
+def start_mail_worker_thread():
+    """Starts the mail worker as a daemon thread of the current process (useful for the development server)."""
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run_mail_worker, kwargs={'stop_event': stop_event}, name='mail-worker', daemon=True)
+    thread.start()
+    return thread, stop_event
@@ -0,0 +1,116 @@
+import os
+from time import perf_counter
+from flask import g, request, has_request_context, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from prometheus_client import (Counter, Histogram, CollectorRegistry, REGISTRY,
+                               generate_latest, multiprocess, CONTENT_TYPE_LATEST)
+
+# When PROMETHEUS_MULTIPROC_DIR is set (see gunicorn.conf.py) every worker writes its values to
+# memory-mapped files in that directory and /metrics merges them, so any worker can answer a scrape
+
+# Endpoints that are not measured (static files, the scrape itself and the health probes)
+SKIPPED_ENDPOINTS = {'static', 'poster_file', 'metrics', 'healthz', 'readyz'}
+
+REQUEST_LATENCY = Histogram(
+    'parallax_request_duration_seconds', 'Request latency per route',
+    ['endpoint', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUEST_SQL_QUERIES = Histogram(
+    'parallax_request_sql_queries', 'SQL statements executed per request',
+    ['endpoint'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+)
+REQUEST_SQL_SECONDS = Histogram(
+    'parallax_request_sql_seconds', 'Time spent in SQL statements per request',
+    ['endpoint'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+TEMPLATE_RENDER_SECONDS = Histogram(
+    'parallax_template_render_seconds', 'Jinja render time per template',
+    ['template'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+RECOMMENDER_PHASE_SECONDS = Histogram(
+    'parallax_recommender_phase_seconds', 'Time spent in each phase of get_recommendations',
+    ['phase'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+RECOMMENDER_ERRORS = Counter('parallax_recommender_errors', 'Recommendation runs that raised an exception')
+
+
+class PhaseTimer:
+    """
+    Records consecutive phases of a long function without re-indenting it:
+    every lap() observes the time elapsed since the previous lap under the given phase name.
+    """
+
+    def __init__(self, histogram=RECOMMENDER_PHASE_SECONDS):
+        self.histogram = histogram
+        self.last = perf_counter()
+
+    def lap(self, phase):
+        now = perf_counter()
+        self.histogram.labels(phase).observe(now - self.last)
+        self.last = now
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Only statements of a request are counted (background threads and scripts are skipped)
+    started = getattr(context, '_metrics_started', None)
+    if started is None or not has_request_context():
+        return
+    g.sql_queries = g.get('sql_queries', 0) + 1
+    g.sql_seconds = g.get('sql_seconds', 0.0) + perf_counter() - started
+
+
+def _before_render_template(sender, template, context, **extra):
+    # A stack, since fragments are rendered while their page is being rendered
+    g.setdefault('template_starts', []).append(perf_counter())
+
+
+def _template_rendered(sender, template, context, **extra):
+    starts = g.get('template_starts')
+    if starts:
+        TEMPLATE_RENDER_SECONDS.labels(template.name or 'string').observe(perf_counter() - starts.pop())
+
+
+def init_metrics(app):
+    """Registers the request hooks, the engine events (all engines, replicas included) and the template signals."""
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render_template, app)
+    template_rendered.connect(_template_rendered, app)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.get('request_started')
+        endpoint = request.endpoint or 'unmatched'
+        if started is not None and endpoint not in SKIPPED_ENDPOINTS:
+            REQUEST_LATENCY.labels(endpoint, request.method, response.status_code).observe(perf_counter() - started)
+            REQUEST_SQL_QUERIES.labels(endpoint).observe(g.get('sql_queries', 0))
+            REQUEST_SQL_SECONDS.labels(endpoint).observe(g.get('sql_seconds', 0.0))
+        return response
+
+
+def metrics_payload():
+    # Returns (body, content type) in the Prometheus text format
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
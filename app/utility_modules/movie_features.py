@@ -0,0 +1,55 @@
+from sqlalchemy import select, insert, delete, func, case, cast, Float
+from app.models import Movie, MovieFeatures
+
+# The movie_features table holds the numeric recommender features of every movie, cleaned
+# (defaults for missing metadata, MPAA rating as a number) and min-max normalized over the
+# catalog. It is rebuilt with one INSERT ... SELECT (window functions for the catalog
+# minimum and maximum) whenever movies or their metadata change, so readers get the whole
+# matrix with a single query instead of parsing every Movie object.
+
+# Defaults for missing metadata
+DEFAULT_IMDB_RATING = 5.0
+DEFAULT_RUNTIME = 90
+DEFAULT_METASCORE = 50
+DEFAULT_BOX_OFFICE = 0
+
+# MPAA ratings as numbers (unknown ratings count as PG)
+RATED_VALUES = {'G': 0, 'PG': 1, 'PG-13': 2, 'R': 3}
+DEFAULT_RATED = 1
+
+STAT_FEATURES = ('runtime', 'metascore', 'box_office', 'rated')
+
+
+def cleaned_features():
+    # One row per movie with the defaults applied (floats, so no integer division later)
+    movie = Movie.__table__
+    return select(
+        movie.c.id.label('movie_id'),
+        (cast(func.coalesce(movie.c.imdb_rating, DEFAULT_IMDB_RATING), Float) / 10.0).label('imdb'),
+        cast(func.coalesce(movie.c.runtime_minutes, DEFAULT_RUNTIME), Float).label('runtime'),
+        cast(func.coalesce(movie.c.meta_score, DEFAULT_METASCORE), Float).label('metascore'),
+        cast(func.coalesce(movie.c.box_office, DEFAULT_BOX_OFFICE), Float).label('box_office'),
+        cast(case(RATED_VALUES, value=movie.c.rated, else_=DEFAULT_RATED), Float).label('rated')
+    ).subquery()
+
+
+def min_max(column):
+    # Scales a column to 0-1 over all rows; a constant column keeps its values (as the recommender always did)
+    low, high = func.min(column).over(), func.max(column).over()
+    return case((high > low, (column - low) / (high - low)), else_=column)
+
+
+def refresh_movie_features(connection):
+    """
+    Rebuilds movie_features from the movie table inside the caller's transaction
+    (readers keep seeing the previous rows until it commits). Returns the number of movies.
+    """
+    cleaned = cleaned_features()
+    table = MovieFeatures.__table__
+
+    connection.execute(delete(table))
+    result = connection.execute(insert(table).from_select(
+        ['movie_id', 'imdb'] + list(STAT_FEATURES),
+        select(cleaned.c.movie_id, cleaned.c.imdb, *(min_max(cleaned.c[name]).label(name) for name in STAT_FEATURES))
+    ))
+    return result.rowcount
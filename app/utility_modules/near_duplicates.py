@@ -0,0 +1,217 @@
+import re
+import zlib
+import numpy as np
+from app.utility_modules.title_normalizer import normalize_title, title_key
+
+# Near-duplicate detection for movie titles ("Star Wars: Episode IV" vs "Star Wars Episode 4").
+#
+# 1. Titles are canonicalized (normalize_title, roman numerals and number words as digits,
+#    leading article and filler words dropped) and cut into character 3-gram shingles.
+# 2. Each title gets a MinHash signature: for NUM_PERMUTATIONS random hash functions, the minimum
+#    hash of its shingles. Two signatures agree on a position with probability = Jaccard similarity.
+# 3. LSH: signatures are cut into BANDS bands; titles sharing one whole band (same release year
+#    window) become candidates. Grouping is done by sorting the band hashes, so the cost grows
+#    with N log N instead of the N^2 of comparing every pair.
+# 4. Candidates are verified (same sequel numbers, exact Jaccard similarity of their shingles)
+#    and grouped into clusters (union-find) for the report.
+#
+# With 32 permutations in 8 bands of 4, pairs above ~0.6 similarity are found with high probability.
+
+NUM_PERMUTATIONS = 32
+BANDS = 8
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+
+# Mersenne prime for the universal hash functions (a * x + b) mod p
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Year window of the titles without release year
+NO_YEAR = -(1 << 40)
+
+# Candidates compared per member of an LSH bucket (bounds the work on very common titles)
+BUCKET_WINDOW = 20
+
+ROMAN_NUMERALS = {'ii': '2', 'iii': '3', 'iv': '4', 'v': '5', 'vi': '6', 'vii': '7', 'viii': '8', 'ix': '9',
+                  'x': '10', 'xi': '11', 'xii': '12'}
+NUMBER_WORDS = {'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5', 'six': '6', 'seven': '7',
+                'eight': '8', 'nine': '9', 'ten': '10', 'first': '1', 'second': '2', 'third': '3'}
+# Words that distinguish nothing ("Episode IV", "Part 2", "Chapter Two", "Vol. 1")
+FILLER_WORDS = {'episode', 'part', 'chapter', 'vol', 'volume'}
+LEADING_ARTICLES = {'the', 'a', 'an'}
+
+TOKEN = re.compile(r'\S+')
+
+
+def canonical_title(title):
+    """
+    Comparable form of a title for near-duplicate detection (more aggressive than normalize_title,
+    which is the exact matching key): "The Star Wars: Episode IV" -> "star wars 4".
+    Never empty for a non-blank title, so unrelated titles cannot all share the empty form.
+    """
+    tokens = TOKEN.findall(normalize_title(title))
+    if len(tokens) > 1 and tokens[0] in LEADING_ARTICLES:
+        tokens = tokens[1:]
+
+    canonical = []
+    for index, token in enumerate(tokens):
+        # A single 'v' or 'x' is only a numeral after the first word ("Rocky V", not "V for Vendetta")
+        if token in ROMAN_NUMERALS and (index > 0 or len(token) > 1):
+            token = ROMAN_NUMERALS[token]
+        token = NUMBER_WORDS.get(token, token)
+        if token not in FILLER_WORDS or len(tokens) == 1:
+            canonical.append(token)
+    # Titles without letters or digits ("!!!"), or made of filler words only, are compared as written
+    return ' '.join(canonical) or title_key(title)
+
+
+def shingles(canonical):
+    # Set of character shingles, padded so that short titles still have a few
+    padded = f" {canonical} "
+    if len(padded) <= SHINGLE_SIZE:
+        return {padded}
+    return {padded[index:index + SHINGLE_SIZE] for index in range(len(padded) - SHINGLE_SIZE + 1)}
+
+
+def sequel_numbers(canonical):
+    # Numbers in a canonical title ("rocky 4" -> {'4'}): titles with different numbers are different movies
+    return {token for token in canonical.split() if token.isdigit()}
+
+
+def jaccard(first, second):
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+class MinHasher:
+    """NUM_PERMUTATIONS universal hash functions (a * x + b) mod p; the same seed gives the same signatures."""
+
+    def __init__(self, seed=1):
+        generator = np.random.default_rng(seed)
+        # a, b < 2^32 and x < 2^32, so a * x + b never overflows 64 bits
+        self.a = generator.integers(1, 1 << 32, NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+        self.b = generator.integers(0, 1 << 32, NUM_PERMUTATIONS, dtype=np.uint64)[:, None]
+
+    def signature(self, shingle_set):
+        # crc32 is stable across processes (unlike hash()), so reports are reproducible
+        hashes = np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingle_set), dtype=np.uint64, count=len(shingle_set))
+        return ((self.a * hashes + self.b) % np.uint64(MERSENNE_PRIME)).min(axis=1).astype(np.uint32)
+
+
+class UnionFind:
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Path compression
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first, second):
+        first_root, second_root = self.find(first), self.find(second)
+        if first_root != second_root:
+            self.parent[max(first_root, second_root)] = min(first_root, second_root)
+
+    def groups(self):
+        clusters = {}
+        for item in self.parent:
+            clusters.setdefault(self.find(item), []).append(item)
+        return [sorted(members) for members in clusters.values() if len(members) > 1]
+
+
+class NearDuplicateIndex:
+    """
+    Collects titles (with their release year) and finds the near-duplicate clusters.
+    Per title only its canonical form and signature are kept (NUM_PERMUTATIONS x 4 bytes),
+    so a million titles fit in a few hundred MB.
+    """
+
+    def __init__(self, threshold=0.7, year_tolerance=1, seed=1):
+        self.threshold = threshold
+        self.year_tolerance = year_tolerance
+        self.hasher = MinHasher(seed)
+        self.canonicals = []
+        self.years = []
+        self.signatures = []
+
+    def add(self, title, year):
+        # Returns the index of the title (the row number used in the results)
+        canonical = canonical_title(title)
+        self.canonicals.append(canonical)
+        self.years.append(int(year) if year else -1)
+        self.signatures.append(self.hasher.signature(shingles(canonical)))
+        return len(self.canonicals) - 1
+
+    def candidate_pairs(self):
+        """
+        Pairs of indexes sharing a band in the same year window. Each title is placed in the windows
+        starting at year - tolerance .. year, so two titles at most `tolerance` years apart meet in one.
+        Titles without year only meet each other.
+        """
+        if not self.signatures:
+            return set()
+        signatures = np.vstack(self.signatures)
+        years = np.asarray(self.years, dtype=np.int64)
+        has_year = years >= 0
+        indexes = np.arange(len(years))
+
+        pairs = set()
+        for band in range(BANDS):
+            band_values = signatures[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+            # One 64 bit key per title and band (row hashes combined)
+            band_keys = np.zeros(len(years), dtype=np.uint64)
+            for column in range(ROWS_PER_BAND):
+                band_keys = band_keys * np.uint64(1000003) + band_values[:, column].astype(np.uint64)
+
+            # Every title in all its windows (titles without year only once, in a window of their own)
+            members = np.concatenate([indexes] + [indexes[has_year]] * self.year_tolerance)
+            windows = np.concatenate([np.where(has_year, years, NO_YEAR)] +
+                                     [years[has_year] - shift for shift in range(1, self.year_tolerance + 1)])
+            keys = band_keys[members]
+
+            # Sort by (window, band key): equal keys become runs of candidates
+            order = np.lexsort((keys, windows))
+            keys, windows, members = keys[order], windows[order], members[order]
+            boundaries = np.flatnonzero((keys[1:] != keys[:-1]) | (windows[1:] != windows[:-1])) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(members)]))
+            shared = ends - starts > 1
+
+            for start, end in zip(starts[shared], ends[shared]):
+                run = members[start:end].tolist()
+                for position, first in enumerate(run):
+                    for second in run[position + 1:position + 1 + BUCKET_WINDOW]:
+                        pairs.add((min(first, second), max(first, second)))
+        return pairs
+
+    def find(self):
+        """
+        Returns (clusters, pair_scores): clusters are sorted lists of indexes, pair_scores maps
+        verified (first, second) index pairs to their Jaccard similarity.
+        """
+        union_find = UnionFind()
+        scores = {}
+        shingle_cache = {}
+
+        def shingle_set(index):
+            if index not in shingle_cache:
+                shingle_cache[index] = shingles(self.canonicals[index])
+            return shingle_cache[index]
+
+        for first, second in sorted(self.candidate_pairs()):
+            if self.years[first] >= 0 and self.years[second] >= 0 and abs(self.years[first] - self.years[second]) > self.year_tolerance:
+                continue
+            if sequel_numbers(self.canonicals[first]) != sequel_numbers(self.canonicals[second]):
+                continue
+            score = jaccard(shingle_set(first), shingle_set(second))
+            if score >= self.threshold:
+                scores[(first, second)] = score
+                union_find.union(first, second)
+
+        return sorted(union_find.groups()), scores
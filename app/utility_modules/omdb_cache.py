@@ -0,0 +1,203 @@
+import os
+import json
+import math
+import time
+import heapq
+import sqlite3
+import datetime
+import threading
+from app.utility_modules.title_normalizer import title_key
+
+# On-disk cache of OMDb answers, keyed by (title_key, year), so reruns of
+# update_metadata.py only spend API quota on movies whose data is due for a refresh.
+# Every field keeps its own freshness: volatile fields (rating, votes, metascore) expire
+# quickly, stable ones (poster, runtime, rating certificate, box office) rarely, and
+# 'Movie not found!' answers are remembered too so unknown titles are not retried every run.
+
+VOLATILE_FIELDS = ('rating', 'imdb_votes', 'metascore')
+STABLE_FIELDS = ('poster', 'rated', 'runtime', 'box_office')
+
+DAY = 24 * 60 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lookup (
+    title_key TEXT NOT NULL,
+    year INTEGER NOT NULL,              -- 0 when the release year is unknown
+    found INTEGER NOT NULL,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (title_key, year)
+);
+CREATE TABLE IF NOT EXISTS field (
+    title_key TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT,                         -- JSON encoded
+    checked_at REAL NOT NULL,           -- last time OMDb was asked
+    changed_at REAL NOT NULL,           -- last time the answer was different
+    PRIMARY KEY (title_key, year, name)
+);
+CREATE TABLE IF NOT EXISTS request_budget (
+    day TEXT PRIMARY KEY,
+    used INTEGER NOT NULL
+);
+"""
+
+
+def cache_key(title, year):
+    # The same natural key as the catalog loader, never empty (non-Latin titles keep their letters)
+    return title_key(title), int(year or 0)
+
+
+class CachedLookup:
+    """What the cache knows about one movie: whether OMDb found it, the field values and when each was checked."""
+
+    def __init__(self, found, checked_at, fields=None, field_checked_at=None):
+        self.found = found
+        self.checked_at = checked_at
+        self.fields = fields or {}
+        self.field_checked_at = field_checked_at or {}
+
+    def as_metadata(self):
+        # Same shape as OMDbClient.fetch(): None for unknown movies
+        if not self.found:
+            return None
+        return {name: self.fields.get(name) for name in VOLATILE_FIELDS + STABLE_FIELDS}
+
+
+class OMDbResponseCache:
+    """
+    SQLite file shared by the fetch threads (one connection per thread).
+    TTLs are in seconds: `volatile_ttl` for VOLATILE_FIELDS, `stable_ttl` for STABLE_FIELDS
+    and `missing_ttl` for titles OMDb does not know.
+    """
+
+    def __init__(self, path, volatile_ttl=30 * DAY, stable_ttl=365 * DAY, missing_ttl=90 * DAY):
+        self.path = path
+        self.ttls = {name: volatile_ttl for name in VOLATILE_FIELDS}
+        self.ttls.update({name: stable_ttl for name in STABLE_FIELDS})
+        self.missing_ttl = missing_ttl
+        self.local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.connection() as connection:
+            connection.executescript(SCHEMA)
+            # Caches written when every title without Latin letters mapped to the empty key hold one
+            # movie's answer for all of them: forget those entries, they are fetched again
+            connection.execute("DELETE FROM field WHERE title_key = ''")
+            connection.execute("DELETE FROM lookup WHERE title_key = ''")
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self.local.connection = connection
+        return connection
+
+    def get(self, title, year):
+        # Returns a CachedLookup, or None if the movie was never looked up
+        title_key, year = cache_key(title, year)
+        connection = self.connection()
+        row = connection.execute(
+            'SELECT found, checked_at FROM lookup WHERE title_key = ? AND year = ?', (title_key, year)
+        ).fetchone()
+        if row is None:
+            return None
+
+        lookup = CachedLookup(bool(row[0]), row[1])
+        for name, value, checked_at in connection.execute(
+            'SELECT name, value, checked_at FROM field WHERE title_key = ? AND year = ?', (title_key, year)
+        ):
+            lookup.fields[name] = json.loads(value)
+            lookup.field_checked_at[name] = checked_at
+        return lookup
+
+    def store(self, title, year, data, now=None):
+        """
+        Records an OMDb answer (data as returned by OMDbClient.fetch, None when not found).
+        Fields keep their changed_at when the value is the same as before.
+        """
+        now = now or time.time()
+        title_key, year = cache_key(title, year)
+        with self.connection() as connection:
+            connection.execute(
+                'INSERT INTO lookup (title_key, year, found, checked_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (title_key, year) DO UPDATE SET found = excluded.found, checked_at = excluded.checked_at',
+                (title_key, year, data is not None, now)
+            )
+            if data is None:
+                return
+            connection.executemany(
+                'INSERT INTO field (title_key, year, name, value, checked_at, changed_at) VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (title_key, year, name) DO UPDATE SET '
+                'changed_at = CASE WHEN field.value IS excluded.value THEN field.changed_at ELSE excluded.changed_at END, '
+                'value = excluded.value, checked_at = excluded.checked_at',
+                [(title_key, year, name, json.dumps(data.get(name)), now, now) for name in self.ttls]
+            )
+
+    def staleness(self, lookup, now=None):
+        """
+        How overdue a cached lookup is, as a multiple of its TTL: below 1 it is fresh,
+        1 means it just expired. The most overdue field decides. Never looked up is infinitely stale.
+        """
+        if lookup is None:
+            return math.inf
+        now = now or time.time()
+        if not lookup.found:
+            return (now - lookup.checked_at) / self.missing_ttl
+        return max((now - lookup.field_checked_at.get(name, 0)) / ttl for name, ttl in self.ttls.items())
+
+    def is_fresh(self, lookup, now=None):
+        return self.staleness(lookup, now) < 1
+
+    def requests_used_today(self):
+        row = self.connection().execute(
+            'SELECT used FROM request_budget WHERE day = ?', (datetime.date.today().isoformat(),)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def record_requests(self, count):
+        # Requests are counted per calendar day, across runs (the budget is a daily API quota)
+        with self.connection() as connection:
+            connection.execute(
+                'INSERT INTO request_budget (day, used) VALUES (?, ?) '
+                'ON CONFLICT (day) DO UPDATE SET used = request_budget.used + excluded.used',
+                (datetime.date.today().isoformat(), count)
+            )
+
+
+def refresh_priority(staleness, imdb_votes, local_ratings, has_poster):
+    """
+    Order in which due movies are refreshed: movies without poster first (they are hidden
+    from the catalog until enriched), then by how overdue they are weighted by popularity,
+    on IMDb (votes) and on this site (ratings count twice as much).
+    """
+    if not has_poster:
+        return math.inf
+    return staleness * (1 + math.log1p(imdb_votes or 0) + 2 * math.log1p(local_ratings or 0))
+
+
+def plan_refresh(cache, movies, budget, now=None):
+    """
+    Splits catalog movies into the ones to fetch from OMDb now and the ones the cache can answer.
+
+    `movies` are (movie_id, title, year, imdb_votes, local_ratings, has_poster) tuples.
+    Returns (to_fetch, cached): to_fetch lists at most `budget` (movie_id, title, year) tuples,
+    most urgent first; cached maps movie_id -> CachedLookup for fresh entries.
+    Movies that are due but over budget are simply left for the next run.
+    """
+    now = now or time.time()
+    due = []
+    cached = {}
+    for movie_id, title, year, imdb_votes, local_ratings, has_poster in movies:
+        lookup = cache.get(title, year)
+        staleness = cache.staleness(lookup, now)
+        if staleness < 1:
+            cached[movie_id] = lookup
+        else:
+            due.append((refresh_priority(staleness, imdb_votes, local_ratings, has_poster), movie_id, title, year))
+
+    selected = heapq.nlargest(max(budget, 0), due)
+    return [(movie_id, title, year) for _, movie_id, title, year in selected], cached
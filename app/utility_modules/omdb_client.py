@@ -0,0 +1,183 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import requests
+from requests.adapters import HTTPAdapter
+
+# HTTP statuses worth retrying (throttling and transient server errors)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class OMDbQuotaExceeded(Exception):
+    """OMDb answered 'Request limit reached!': every further request of the day would fail too."""
+
+
+class OMDbUnavailable(Exception):
+    """The request still failed after all retries (network errors, 5xx); the movie is left untouched."""
+
+
+def parse_int(value):
+    # Helper function that extracts integers from strings by removing non-numeric characters
+    if not value or value == 'N/A':
+        return None
+    clean_val = ''.join(filter(str.isdigit, value))
+    return int(clean_val) if clean_val else None
+
+
+def parse_float(value):
+    # Helper function for decimal values such as '7.8' ('N/A' and malformed values become None)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_omdb_response(data):
+    # Maps an OMDb JSON answer to the Movie metadata fields ('N/A' becomes None)
+    def clean(key):
+        value = data.get(key)
+        return value if value and value != 'N/A' else None
+
+    return {
+        'poster': clean('Poster'),
+        'rating': parse_float(data.get('imdbRating')),
+        'rated': clean('Rated'),
+        'runtime': parse_int(data.get('Runtime')),
+        'metascore': parse_int(data.get('Metascore')),
+        'imdb_votes': parse_int(data.get('imdbVotes')),
+        'box_office': parse_int(data.get('BoxOffice'))
+    }
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` requests per second on average, with bursts of up to
+    `capacity` requests. acquire() blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+class OMDbClient:
+    """
+    OMDb title lookups over one pooled HTTP session, shared by all fetch threads and limited by a token bucket.
+    Failed requests are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(self, api_key, base_url='http://www.omdbapi.com/', requests_per_second=5, burst=None,
+                 max_retries=4, timeout=10, pool_size=16):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.bucket = TokenBucket(requests_per_second, burst)
+
+        # Keep-alive connections reused by every thread (one TCP/TLS handshake per pooled connection)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.stats = {'requests': 0, 'retries': 0}
+        self.stats_lock = threading.Lock()
+
+    def backoff(self, attempt):
+        # Full jitter: random wait between 0 and 0.5s * 2^attempt (capped), so retries of many threads spread out
+        time.sleep(random.uniform(0, min(30, 0.5 * 2 ** attempt)))
+
+    def fetch(self, title, year=None):
+        """
+        Returns the parsed metadata, or None when OMDb does not know the movie.
+        Raises OMDbQuotaExceeded or OMDbUnavailable.
+        """
+        params = {'apikey': self.api_key, 't': title}
+        if year:
+            params['y'] = year
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self.stats_lock:
+                self.stats['requests'] += 1
+                if attempt:
+                    self.stats['retries'] += 1
+
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    try:
+                        data = response.json()
+                    except ValueError:
+                        data = {}
+                    # OMDb answers 401 once the daily limit is reached
+                    if 'limit' in (data.get('Error') or '').lower():
+                        raise OMDbQuotaExceeded(data.get('Error'))
+                    if response.status_code != 200:
+                        raise OMDbUnavailable(f"HTTP {response.status_code}: {data.get('Error')}")
+
+                    if data.get('Response') == 'True':
+                        return parse_omdb_response(data)
+                    # 'Movie not found!' and similar answers are final
+                    return None
+                error = f"HTTP {response.status_code}"
+
+            if attempt < self.max_retries:
+                self.backoff(attempt)
+
+        raise OMDbUnavailable(error)
+
+
+def fetch_all(client, movies, workers=8):
+    """
+    Looks up (key, title, year) tuples on `workers` threads and yields (key, metadata, error)
+    as results arrive; metadata is None for unknown movies, error is set when the lookup failed.
+    At most 2 x workers lookups are in flight, so arbitrarily long iterables stream through.
+    Stops (raising OMDbQuotaExceeded) as soon as the daily quota is reached.
+    """
+    movies = iter(movies)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='omdb') as executor:
+        pending = {}
+
+        def submit_next():
+            for key, title, year in movies:
+                pending[executor.submit(client.fetch, title, year)] = key
+                return True
+            return False
+
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                try:
+                    yield key, future.result(), None
+                except OMDbQuotaExceeded:
+                    for other in pending:
+                        other.cancel()
+                    raise
+                except OMDbUnavailable as e:
+                    yield key, None, str(e)
+                submit_next()
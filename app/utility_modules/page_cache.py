@@ -0,0 +1,323 @@
+import os
+import time
+import pickle
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+from markupsafe import Markup
+from app import app
+from app.utility_modules.shared_version import VersionFile
+
+# Prefix used to mark the personalized "holes" inside a cached fragment
+HOLE_MARKER = '<!--page-hole:{}-->'
+
+# Maximum number of distinct keys tracked by the hit/miss statistics
+MAX_TRACKED_KEYS = 1000
+
+
+class MemoryLRUBackend:
+    """
+    In-process LRU store bounded by the total size (in bytes) of the cached values.
+    Every gunicorn worker owns a private copy of the entries, but the catalog version is read
+    from a shared file, so a bump by any process (an admin edit, a database script) invalidates all workers.
+    """
+
+    def __init__(self, max_bytes, version_path):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()    # key -> (expires_at, size, value)
+        self.current_bytes = 0
+        self.version = VersionFile(version_path)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, size, value = entry
+            if expires_at < time.time():
+                # Drop the expired entry and report a miss
+                del self.entries[key]
+                self.current_bytes -= size
+                return None
+
+            # Mark the entry as most recently used
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            old_entry = self.entries.pop(key, None)
+            if old_entry:
+                self.current_bytes -= old_entry[1]
+
+            # Evict the least recently used entries until the new value fits
+            while self.entries and self.current_bytes + size > self.max_bytes:
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+            self.entries[key] = (time.time() + ttl, size, value)
+            self.current_bytes += size
+
+    def get_version(self):
+        return self.version.get()
+
+    def bump_version(self):
+        # A new version makes every previously stored key unreachable; LRU eviction cleans them up
+        self.version.bump()
+
+    def memory_usage(self):
+        return {'entries': len(self.entries), 'bytes': self.current_bytes, 'max_bytes': self.max_bytes}
+
+
+class FileSystemBackend:
+    """
+    Local directory store shared by all gunicorn workers (and by the database scripts
+    when the directory lives on the mounted project volume).
+    """
+
+    VERSION_FILE = 'catalog.version'
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.writes_since_prune = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.version = VersionFile(os.path.join(directory, self.VERSION_FILE))
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.cache")
+
+    def _atomic_write(self, path, payload):
+        # Write to a temporary file first so readers never observe a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires_at, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        if expires_at < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        # Refresh the modification time so pruning keeps recently used entries
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value, ttl):
+        payload = pickle.dumps((time.time() + ttl, value), protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+
+        try:
+            self._atomic_write(self._path(key), payload)
+        except OSError:
+            return
+
+        # Pruning scans the directory, so only do it every few writes
+        self.writes_since_prune += 1
+        if self.writes_since_prune >= 50:
+            self.writes_since_prune = 0
+            self.prune()
+
+    def prune(self):
+        """Removes the least recently used files until the directory fits in max_bytes."""
+        files = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def get_version(self):
+        return self.version.get()
+
+    def bump_version(self):
+        self.version.bump()
+
+    def memory_usage(self):
+        entries = 0
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.cache'):
+                entries += 1
+                total += entry.stat().st_size
+        return {'entries': entries, 'bytes': total, 'max_bytes': self.max_bytes}
+
+
+class PageCache:
+    """
+    Caches rendered fragments keyed by a namespace, the normalized request parameters
+    and the current catalog version, while keeping per-key hit/miss statistics.
+    """
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.key_stats = OrderedDict()  # key -> [hits, misses, size]
+        self.lock = threading.Lock()
+
+    def make_key(self, namespace, params):
+        # Sort the parameters (and list values) so equivalent requests share a key
+        normalized = []
+        for name in sorted(params):
+            value = params[name]
+            if isinstance(value, (list, tuple, set)):
+                value = ','.join(sorted(str(v) for v in value))
+            normalized.append((name, '' if value is None else str(value)))
+        return f"{namespace}:{self.backend.get_version()}:{urlencode(normalized)}"
+
+    def _record(self, key, hit, size=None):
+        # Statistics are tracked without the version so they survive catalog updates
+        stats_key = key.split(':', 2)
+        stats_key = f"{stats_key[0]}:{stats_key[2]}"
+
+        with self.lock:
+            stats = self.key_stats.pop(stats_key, [0, 0, 0])
+            stats[0 if hit else 1] += 1
+            if size is not None:
+                stats[2] = size
+            self.key_stats[stats_key] = stats
+
+            while len(self.key_stats) > MAX_TRACKED_KEYS:
+                self.key_stats.popitem(last=False)
+
+    def get_or_render(self, namespace, params, render):
+        key = self.make_key(namespace, params)
+
+        value = self.backend.get(key)
+        if value is not None:
+            self._record(key, hit=True)
+            return value
+
+        value = render()
+        self.backend.set(key, value, self.ttl)
+        self._record(key, hit=False, size=len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)))
+        return value
+
+    def stats(self):
+        with self.lock:
+            keys = {}
+            total_hits = 0
+            total_misses = 0
+            for key, (hits, misses, size) in self.key_stats.items():
+                total_hits += hits
+                total_misses += misses
+                keys[key] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': round(hits / (hits + misses), 4),
+                    'bytes': size
+                }
+
+        requests_total = total_hits + total_misses
+        return {
+            'backend': type(self.backend).__name__,
+            'catalog_version': self.backend.get_version(),
+            'hits': total_hits,
+            'misses': total_misses,
+            'hit_rate': round(total_hits / requests_total, 4) if requests_total else None,
+            'memory': self.backend.memory_usage(),
+            'keys': keys
+        }
+
+
+class NullPageCache:
+    # Used when PAGE_CACHE_BACKEND is 'none': always renders, never stores
+    def get_or_render(self, namespace, params, render):
+        return render()
+
+    def stats(self):
+        return {'backend': None}
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """Builds the configured cache on first use (once per process)."""
+    global _page_cache
+
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                backend_name = app.config['PAGE_CACHE_BACKEND']
+                max_bytes = app.config['PAGE_CACHE_MAX_BYTES']
+                # Also holds the catalog version of the memory backend (instance/ is on the shared volume)
+                directory = app.config['PAGE_CACHE_DIR'] or os.path.join(app.instance_path, 'page_cache')
+
+                if backend_name == 'memory':
+                    version_path = os.path.join(directory, FileSystemBackend.VERSION_FILE)
+                    _page_cache = PageCache(MemoryLRUBackend(max_bytes, version_path), app.config['PAGE_CACHE_TTL'])
+                elif backend_name == 'filesystem':
+                    _page_cache = PageCache(FileSystemBackend(directory, max_bytes), app.config['PAGE_CACHE_TTL'])
+                else:
+                    _page_cache = NullPageCache()
+
+    return _page_cache
+
+
+def cached_fragment(namespace, params, render):
+    """
+    Returns the cached value for (namespace, params) at the current catalog version,
+    calling render() and storing its result on a miss.
+    """
+    return get_page_cache().get_or_render(namespace, params, render)
+
+
+def bump_catalog_version():
+    """Invalidates every cached fragment; call it whenever movies or genres change."""
+    cache = get_page_cache()
+    if isinstance(cache, PageCache):
+        cache.backend.bump_version()
+
+
+@app.template_global()
+def page_hole(name):
+    # Placeholder rendered inside cached fragments and replaced per request by fill_holes()
+    return Markup(HOLE_MARKER.format(name))
+
+
+def fill_holes(fragment, **sections):
+    """Replaces each named hole of a cached fragment with its personalized HTML."""
+    for name, html in sections.items():
+        fragment = fragment.replace(HOLE_MARKER.format(name), str(html))
+    return Markup(fragment)
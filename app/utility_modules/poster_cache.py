@@ -0,0 +1,294 @@
+import io
+import os
+import time
+import random
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image, ImageOps
+from flask import url_for
+from sqlalchemy import select, and_, or_
+from app import app, database
+from app.models import Movie, PosterImage
+from app.utility_modules.omdb_client import TokenBucket, RETRY_STATUSES
+from app.utility_modules.sql_helpers import dialect_insert
+from app.utility_modules.page_cache import bump_catalog_version
+
+# Posters are downloaded once from their external URL (Movie.poster_url, full size images on the
+# OMDb/Amazon hosts) and stored under POSTER_CACHE_DIR as resized WebP and JPEG variants named
+# <content hash>-<variant>.<extension>. A new image gets a new name, so the files are served with
+# immutable cache headers (by Caddy in production, by the /posters/ route otherwise) and never revalidated.
+# poster_image records the URL the files were made from: a movie whose poster_url changes is downloaded
+# again, and until a local copy of its current poster exists the templates keep the external URL.
+
+# Variant -> width in pixels (the height follows the poster; smaller images are not enlarged)
+#   thumb   lists and API thumbnails
+#   card    catalog, home and list cards (350px high, sharp on high density screens)
+#   detail  movie page
+POSTER_VARIANTS = {'thumb': 160, 'card': 400, 'detail': 800}
+
+# Extension -> (Pillow format, encoder options); WebP for the browsers that accept it, JPEG for the rest
+POSTER_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})
+}
+
+# Hex digits of the SHA-256 of the downloaded image kept in the file names
+HASH_LENGTH = 20
+
+# Larger downloads and images are refused (a poster is well below both)
+MAX_DOWNLOAD_BYTES = 15 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+
+
+class PosterUnavailable(Exception):
+    """The poster could not be downloaded or decoded; the movie keeps its external URL."""
+
+
+def poster_directory():
+    return app.config['POSTER_CACHE_DIR'] or os.path.join(app.instance_path, 'posters')
+
+
+def poster_filename(content_hash, variant, extension):
+    return f"{content_hash}-{variant}.{extension}"
+
+
+def write_atomically(path, payload):
+    # Readers (Caddy, the route) never see a half-written file
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary_path, 'wb') as file:
+        file.write(payload)
+    os.replace(temporary_path, path)
+
+
+def render_variants(data, directory):
+    """
+    Stores every variant of the downloaded image `data` in `directory` and returns its content hash.
+    An image whose files already exist (a poster shared by several movies, a rerun) is not decoded again.
+    """
+    content_hash = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    targets = [(variant, width, extension, os.path.join(directory, poster_filename(content_hash, variant, extension)))
+               for variant, width in POSTER_VARIANTS.items() for extension in POSTER_FORMATS]
+    if all(os.path.exists(path) for *_, path in targets):
+        return content_hash
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > MAX_IMAGE_PIXELS:
+            raise PosterUnavailable(f"Image too large ({image.width}x{image.height})")
+        # JPEGs are decoded straight at the smallest DCT scale (1/2, 1/4, 1/8) still covering the
+        # largest variant, which is several times faster than decoding the full image
+        largest = max(POSTER_VARIANTS.values())
+        image.draft('RGB', (largest, largest * image.height // image.width))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise PosterUnavailable(f"Unreadable image: {e}")
+
+    # Largest variant first, each smaller one resized from the previous (cheaper than from the
+    # full image, with no visible difference)
+    resized = {}
+    for variant, width, extension, path in sorted(targets, key=lambda target: -target[1]):
+        if variant not in resized:
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            resized[variant] = image
+
+        pillow_format, options = POSTER_FORMATS[extension]
+        buffer = io.BytesIO()
+        resized[variant].save(buffer, pillow_format, **options)
+        write_atomically(path, buffer.getvalue())
+
+    return content_hash
+
+
+class PosterFetcher:
+    """
+    Poster downloads over one pooled HTTP session shared by all threads, limited by a token bucket.
+    Failed requests are retried with exponential backoff and full jitter (as OMDbClient).
+    """
+
+    def __init__(self, requests_per_second=20, max_retries=3, timeout=15, pool_size=8):
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.bucket = TokenBucket(requests_per_second, pool_size)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.stats = {'requests': 0, 'retries': 0, 'bytes': 0}
+        self.stats_lock = threading.Lock()
+
+    def backoff(self, attempt):
+        time.sleep(random.uniform(0, min(30, 0.5 * 2 ** attempt)))
+
+    def read_body(self, response):
+        # The body in chunks, refusing oversized downloads without reading them whole
+        if int(response.headers.get('Content-Length') or 0) > MAX_DOWNLOAD_BYTES:
+            raise PosterUnavailable(f"Download larger than {MAX_DOWNLOAD_BYTES} bytes")
+        body = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            body.extend(chunk)
+            if len(body) > MAX_DOWNLOAD_BYTES:
+                raise PosterUnavailable(f"Download larger than {MAX_DOWNLOAD_BYTES} bytes")
+        with self.stats_lock:
+            self.stats['bytes'] += len(body)
+        return bytes(body)
+
+    def fetch(self, url):
+        """Returns the image bytes. Raises PosterUnavailable (missing image, or still failing after all retries)."""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self.stats_lock:
+                self.stats['requests'] += 1
+                if attempt:
+                    self.stats['retries'] += 1
+
+            try:
+                with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                    if response.status_code == 200:
+                        return self.read_body(response)
+                    # 404 and similar answers are final
+                    if response.status_code not in RETRY_STATUSES:
+                        raise PosterUnavailable(f"HTTP {response.status_code}")
+                    error = f"HTTP {response.status_code}"
+            except requests.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+
+            if attempt < self.max_retries:
+                self.backoff(attempt)
+
+        raise PosterUnavailable(error)
+
+
+def cache_poster(fetcher, url, directory):
+    # Runs on the download threads: Pillow releases the GIL while decoding, resizing and encoding
+    return render_variants(fetcher.fetch(url), directory)
+
+
+def posters_due(now, limit=None):
+    """
+    (movie_id, poster_url, previous source_url, previous failures) of the movies whose poster has to be
+    downloaded: never cached, poster URL changed since, or failed and due for another try.
+    Movies never tried come first.
+    """
+    retry_before = now - timedelta(hours=app.config['POSTER_RETRY_HOURS'])
+    query = (
+        select(Movie.id, Movie.poster_url, PosterImage.source_url, PosterImage.failures)
+        .outerjoin(PosterImage, PosterImage.movie_id == Movie.id)
+        .where(Movie.poster_url.isnot(None), Movie.poster_url != '',
+               or_(PosterImage.movie_id.is_(None),
+                   PosterImage.source_url != Movie.poster_url,
+                   and_(PosterImage.content_hash.is_(None),
+                        PosterImage.failures < app.config['POSTER_MAX_FAILURES'],
+                        PosterImage.checked_at < retry_before)))
+        .order_by(PosterImage.movie_id.isnot(None), Movie.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    return database.session.execute(query).all()
+
+
+def write_results(rows):
+    # Upserts the poster_image rows of one batch
+    if not rows:
+        return
+    statement = dialect_insert(PosterImage)
+    statement = statement.on_conflict_do_update(
+        index_elements=[PosterImage.movie_id],
+        set_={name: statement.excluded[name] for name in ('source_url', 'content_hash', 'checked_at', 'failures')}
+    )
+    database.session.execute(statement, rows)
+    database.session.commit()
+
+
+def cache_posters(limit=None, workers=None, batch_size=200):
+    """
+    Downloads and resizes the posters of the movies that have no local copy of their current poster,
+    on `workers` threads (POSTER_WORKERS by default). Results are written every `batch_size` movies,
+    so an interrupted run keeps its progress. Returns a summary dict.
+    """
+    directory = poster_directory()
+    os.makedirs(directory, exist_ok=True)
+    workers = workers or app.config['POSTER_WORKERS']
+    due = posters_due(datetime.utcnow(), limit)
+
+    # Movies sharing a poster URL download it once; failures only keep counting for the same URL
+    movies_by_url = {}
+    for movie_id, url, previous_url, failures in due:
+        movies_by_url.setdefault(url, []).append((movie_id, failures if previous_url == url else 0))
+
+    fetcher = PosterFetcher(app.config['POSTER_REQUESTS_PER_SECOND'], app.config['POSTER_MAX_RETRIES'], pool_size=workers)
+    summary = {'movies': len(due), 'downloads': len(movies_by_url), 'cached': 0, 'failed': 0, 'errors': []}
+    results = []
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='poster') as executor:
+        futures = {executor.submit(cache_poster, fetcher, url, directory): url for url in movies_by_url}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                content_hash = future.result()
+            except PosterUnavailable as e:
+                content_hash = None
+                if len(summary['errors']) < 10:
+                    summary['errors'].append(f"{url}: {e}")
+
+            checked_at = datetime.utcnow()
+            for movie_id, failures in movies_by_url[url]:
+                results.append({'movie_id': movie_id, 'source_url': url, 'content_hash': content_hash,
+                                'checked_at': checked_at, 'failures': 0 if content_hash else failures + 1})
+            summary['cached' if content_hash else 'failed'] += len(movies_by_url[url])
+
+            if len(results) >= batch_size:
+                write_results(results)
+                results.clear()
+
+    write_results(results)
+    summary.update(requests=fetcher.stats['requests'], retries=fetcher.stats['retries'], bytes=fetcher.stats['bytes'])
+
+    # Cached pages still point at the external URLs
+    if summary['cached']:
+        bump_catalog_version()
+    return summary
+
+
+def prune_unused_posters(min_age=3600):
+    """
+    Deletes the files of images no movie uses anymore (replaced posters) and leftover temporary files.
+    Files younger than `min_age` seconds are kept, as a concurrent run may not have recorded them yet.
+    Returns the number of files deleted.
+    """
+    directory = poster_directory()
+    if not os.path.isdir(directory):
+        return 0
+
+    used = set(database.session.execute(
+        select(PosterImage.content_hash).where(PosterImage.content_hash.isnot(None)).distinct()
+    ).scalars())
+    cutoff = time.time() - min_age
+
+    deleted = 0
+    for entry in os.scandir(directory):
+        unused = entry.name.endswith('.tmp') or entry.name.split('-', 1)[0] not in used
+        if unused and entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            deleted += 1
+    return deleted
+
+
+@app.template_global()
+def poster_sources(movie, variant='card', external=False):
+    """
+    {extension: URL} of the cached variant of the movie's poster, or None while there is no local copy
+    of its current poster_url (the templates then fall back to the external URL).
+    """
+    poster = movie.poster_image
+    if poster is None or poster.content_hash is None or poster.source_url != movie.poster_url:
+        return None
+    return {extension: url_for('poster_file', filename=poster_filename(poster.content_hash, variant, extension), _external=external)
+            for extension in POSTER_FORMATS}
@@ -1,18 +1,19 @@
-# From app/utility_modules/qr_generator.py (Function generate_user_qr_code)
+# From app/utility_modules/qr_generator.py (Function generate_qr_png)
 import qrcode
+import hashlib
 from io import BytesIO
-import base64
-from flask import url_for # Import remains
+from functools import lru_cache
 
-# The function no longer requires app_context as an argument
-def generate_user_qr_code(user_id):
+# Number of distinct profile URLs whose PNG bytes are kept in memory
+QR_CACHE_SIZE = 512
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def generate_qr_png(profile_url):
     """
-    Generates a QR code that encodes the URL of the user's profile.
-    This function must be executed within an active Flask request context.
+    Generates a QR code that encodes the given profile URL and returns it as PNG bytes
+    together with an ETag derived from the image content.
+    Results are cached per URL since the same URL always produces the same image.
     """
-    
-    # Generate the absolute URL for the user profile using the current request context
-    profile_url = url_for('user_profile', user_id=user_id, _external=True)
 
     # Initialize the QR code object with specific sizing parameters
     qr = qrcode.QRCode(
@@ -25,10 +26,10 @@ def generate_user_qr_code(user_id):
     qr.make(fit=True)
 
     img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Save the image to an in-memory buffer and convert it to a Base64 string
+
+    # Save the image to an in-memory buffer
     buffer = BytesIO()
     img.save(buffer)
-    img_b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    
-    return f"data:image/png;base64,{img_b64}"
+    png_bytes = buffer.getvalue()
+
+    return png_bytes, hashlib.sha1(png_bytes).hexdigest()
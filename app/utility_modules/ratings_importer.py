@@ -0,0 +1,326 @@
+import csv
+import json
+import threading
+from io import StringIO
+from datetime import datetime, timedelta
+from sqlalchemy import select, or_, and_
+from app import app, database
+from app.models import Movie, Rating, SeenList, ImportJob
+from app.utility_modules.sql_helpers import dialect_insert
+from app.utility_modules.title_normalizer import title_key
+from app.utility_modules.leaderboards import mark_stale_movies
+
+# Column names used by common exports (IMDb, Letterboxd, generic spreadsheets)
+TITLE_COLUMNS = ('Title', 'Name', 'title', 'name', 'Movie', 'movie')
+YEAR_COLUMNS = ('Year', 'year', 'Release Year', 'release_year')
+RATING_COLUMNS = ('Your Rating', 'Rating', 'rating', 'score', 'Score')
+DATE_COLUMNS = ('Date Rated', 'Watched Date', 'Date', 'date', 'date_added')
+DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y')
+
+# Only the first unmatched titles are kept for the report
+MAX_REPORTED_UNMATCHED = 200
+
+# Uploads are stored as ImportJob rows and processed by import_worker.py (the `importer` container),
+# never inside a web worker. A worker claims one job at a time and writes a heartbeat with every batch;
+# a job whose worker died (crash, deploy) is claimed again once its heartbeat is older than
+# IMPORT_JOB_LEASE_SECONDS. Rows are upserted, so processing a job again from the start is safe.
+
+
+class ImportJobLost(Exception):
+    """Another worker claimed the job after its lease expired; this worker stops working on it."""
+
+
+def find_column(fieldnames, candidates):
+    for name in candidates:
+        if name in fieldnames:
+            return name
+    return None
+
+
+def parse_year(value):
+    try:
+        return int(str(value).strip()[:4])
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_date(value):
+    if value:
+        for date_format in DATE_FORMATS:
+            try:
+                return datetime.strptime(value.strip(), date_format)
+            except ValueError:
+                continue
+    return None
+
+
+def parse_rating(value, scale):
+    # Converts the external rating to the local 1-10 scale (None when the row has no rating)
+    try:
+        rating = float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+    if rating <= 0:
+        return None
+    if scale == 5:
+        rating *= 2
+    return min(max(int(round(rating)), 1), 10)
+
+
+def build_title_index():
+    """
+    Loads (id, title, year) of the whole catalog with one query and indexes it by
+    normalized title, so every CSV row is matched with dictionary lookups.
+    """
+    exact_index = {}
+    title_index = {}
+
+    rows = database.session.execute(select(Movie.id, Movie.title, Movie.release_year))
+    for movie_id, title, release_year in rows:
+        key = title_key(title)
+        exact_index.setdefault((key, release_year), movie_id)
+        title_index.setdefault(key, []).append((release_year, movie_id))
+
+    return exact_index, title_index
+
+
+def match_movie(exact_index, title_index, title, year):
+    key = title_key(title)
+
+    # 1. Same title and year
+    movie_id = exact_index.get((key, year))
+    if movie_id:
+        return movie_id
+
+    candidates = title_index.get(key, [])
+    if year is not None:
+        # 2. Release years often differ by one between sources (festival vs theatrical release)
+        for candidate_year, candidate_id in candidates:
+            if candidate_year is not None and abs(candidate_year - year) == 1:
+                return candidate_id
+        return None
+
+    # 3. No year in the file: accept the title only if it is unambiguous
+    return candidates[0][1] if len(candidates) == 1 else None
+
+
+def write_batch(user_id, ratings, seen):
+    """
+    Writes one batch with a multi-row upsert per table (two statements). Movies whose leaderboard
+    buckets change outside the days the next incremental refresh recounts are marked stale.
+    """
+    if ratings:
+        # The imported dates, and those of the user's current ratings (which the upsert may replace)
+        current = database.session.execute(
+            select(Rating.movie_id, Rating.timestamp).where(Rating.user_id == user_id, Rating.movie_id.in_(ratings))
+        ).all()
+        mark_stale_movies([(movie_id, rating['timestamp']) for movie_id, rating in ratings.items()] + current)
+
+        statement = dialect_insert(Rating).values(list(ratings.values()))
+        # Keep a local rating that is more recent than the imported one
+        statement = statement.on_conflict_do_update(
+            index_elements=[Rating.user_id, Rating.movie_id],
+            set_={'score': statement.excluded.score, 'timestamp': statement.excluded.timestamp},
+            where=Rating.timestamp < statement.excluded.timestamp
+        )
+        database.session.execute(statement)
+
+    if seen:
+        statement = dialect_insert(SeenList).values(list(seen.values())).on_conflict_do_nothing()
+        database.session.execute(statement)
+
+
+def run_import(job_id):
+    """
+    Processes a claimed ImportJob: matches every row to the catalog and writes ratings and seen entries
+    in batches. Raises ImportJobLost when the job was claimed by another worker in the meantime.
+    """
+    job = database.session.get(ImportJob, job_id)
+    attempt = job.attempts
+
+    # A job claimed again starts over (the writes are upserts)
+    job.processed_rows = job.matched_rows = job.rated_rows = 0
+    database.session.commit()
+
+    reader = csv.DictReader(StringIO(job.csv_data))
+    rows = list(reader)
+    fieldnames = reader.fieldnames or []
+
+    title_column = find_column(fieldnames, TITLE_COLUMNS)
+    if title_column is None:
+        raise ValueError(f"No title column found (expected one of: {', '.join(TITLE_COLUMNS)}).")
+
+    year_column = find_column(fieldnames, YEAR_COLUMNS)
+    rating_column = find_column(fieldnames, RATING_COLUMNS)
+    date_column = find_column(fieldnames, DATE_COLUMNS)
+
+    # Letterboxd exports use a 0.5-5 star scale
+    scale = job.rating_scale or (5 if 'Letterboxd URI' in fieldnames else 10)
+
+    job.total_rows = len(rows)
+    database.session.commit()
+
+    exact_index, title_index = build_title_index()
+    batch_size = app.config['IMPORT_BATCH_SIZE']
+    unmatched = []
+    now = datetime.utcnow()
+
+    for start in range(0, len(rows), batch_size):
+        # Keyed by movie_id so a movie listed twice in one batch is written once (last row wins)
+        ratings = {}
+        seen = {}
+
+        for row in rows[start:start + batch_size]:
+            title = (row.get(title_column) or '').strip()
+            year = parse_year(row.get(year_column)) if year_column else None
+            movie_id = match_movie(exact_index, title_index, title, year)
+
+            if movie_id is None:
+                if title and len(unmatched) < MAX_REPORTED_UNMATCHED:
+                    unmatched.append(f"{title} ({year})" if year else title)
+                continue
+
+            job.matched_rows += 1
+            date_added = (parse_date(row.get(date_column)) if date_column else None) or now
+            seen[movie_id] = {'user_id': job.user_id, 'movie_id': movie_id, 'date_added': date_added}
+
+            score = parse_rating(row.get(rating_column), scale) if rating_column else None
+            if score is not None:
+                job.rated_rows += 1
+                ratings[movie_id] = {'user_id': job.user_id, 'movie_id': movie_id, 'score': score, 'timestamp': date_added}
+
+        write_batch(job.user_id, ratings, seen)
+
+        # Commit the batch together with the progress (and the heartbeat) so the status page can follow it
+        job.processed_rows = min(start + batch_size, len(rows))
+        job.heartbeat_at = datetime.utcnow()
+        database.session.commit()
+
+        # The commit expired the job, so this reads the current claim count
+        if job.attempts != attempt:
+            raise ImportJobLost("claimed again by another worker")
+
+    job.unmatched_titles = json.dumps(unmatched)
+    job.status = 'finished'
+    job.finished_at = datetime.utcnow()
+    job.csv_data = None
+    database.session.commit()
+
+
+def fail_job(job, error):
+    job.status = 'failed'
+    job.error = str(error)[:1000]
+    job.finished_at = datetime.utcnow()
+    job.csv_data = None
+
+
+def claim_next_job():
+    """
+    Claims the oldest queued job, or a running one whose heartbeat is older than IMPORT_JOB_LEASE_SECONDS,
+    and returns its id (None when there is nothing to do). On PostgreSQL the row is locked with
+    SKIP LOCKED so two workers never claim the same job. Jobs claimed IMPORT_MAX_ATTEMPTS times fail.
+    """
+    now = datetime.utcnow()
+    lease_expired = now - timedelta(seconds=app.config['IMPORT_JOB_LEASE_SECONDS'])
+
+    while True:
+        query = ImportJob.query.filter(or_(
+            ImportJob.status == 'queued',
+            and_(ImportJob.status == 'running',
+                 or_(ImportJob.heartbeat_at.is_(None), ImportJob.heartbeat_at < lease_expired))
+        )).order_by(ImportJob.id).limit(1)
+        if database.engine.dialect.name == 'postgresql':
+            query = query.with_for_update(skip_locked=True)
+
+        job = query.first()
+        if job is None:
+            # Close the (possibly locking) transaction
+            database.session.commit()
+            return None
+
+        if job.attempts >= app.config['IMPORT_MAX_ATTEMPTS']:
+            fail_job(job, f"The import was interrupted {job.attempts} times and was given up.")
+            database.session.commit()
+            continue
+
+        job.status = 'running'
+        job.attempts += 1
+        job.heartbeat_at = now
+        database.session.commit()
+        return job.id
+
+
+def process_import(job_id):
+    # Runs one claimed job; failures are recorded on the job
+    try:
+        run_import(job_id)
+    except ImportJobLost as e:
+        database.session.rollback()
+        print(f"Import {job_id} lost its lease: {e}")
+    except Exception as e:
+        database.session.rollback()
+        fail_job(database.session.get(ImportJob, job_id), e)
+        database.session.commit()
+        print(f"Import {job_id} failed: {e}")
+
+
+def run_import_worker(poll_interval=None, stop_event=None):
+    """
+    Processes queued imports one at a time forever (or until stop_event is set),
+    sleeping for poll_interval seconds when there is nothing to do.
+    """
+    poll_interval = poll_interval or app.config['IMPORT_WORKER_POLL_INTERVAL']
+    stop_event = stop_event or threading.Event()
+
+    print(f"Import worker started (poll interval {poll_interval}s, lease {app.config['IMPORT_JOB_LEASE_SECONDS']}s).")
+
+    while not stop_event.is_set():
+        with app.app_context():
+            try:
+                job_id = claim_next_job()
+            except Exception as e:
+                database.session.rollback()
+                print(f"Import worker error: {e}")
+                job_id = None
+
+            if job_id is not None:
+                started = datetime.utcnow()
+                process_import(job_id)
+                print(f"Import {job_id} processed in {(datetime.utcnow() - started).total_seconds():.1f}s.")
+
+        if job_id is None:
+            stop_event.wait(poll_interval)
+
+
+def start_import_worker_thread():
+    """Starts the import worker as a daemon thread of the current process (useful for the development server)."""
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run_import_worker, kwargs={'stop_event': stop_event}, name='import-worker', daemon=True)
+    thread.start()
+    return thread, stop_event
+
+
+def queue_import(user_id, filename, csv_text, rating_scale=None):
+    """
+    Stores the uploaded CSV as a queued ImportJob for the import worker,
+    so the upload request returns immediately. Returns the job.
+    """
+    job = ImportJob(user_id=user_id, filename=filename, csv_data=csv_text, rating_scale=rating_scale)
+    database.session.add(job)
+    database.session.commit()
+    return job
+
+
+def job_progress(job):
+    # Serializable view of a job for the status endpoint
+    return {
+        'id': job.id,
+        'status': job.status,
+        'total_rows': job.total_rows,
+        'processed_rows': job.processed_rows,
+        'matched_rows': job.matched_rows,
+        'rated_rows': job.rated_rows,
+        'unmatched_titles': json.loads(job.unmatched_titles) if job.unmatched_titles else [],
+        'error': job.error
+    }
@@ -1,12 +1,55 @@
+import time
+import threading
 import pandas as pd
 import torch
 import torch.nn.functional as F
 from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
-from app.models import Movie, Rating, SeenList
-
-def get_recommendations(user_id, num_recommendations=4):
-    movies = Movie.query.all()
-    if not movies: return []
+from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload
+from app import app, database
+from app.models import Movie, MovieFeatures, Genre, Rating, SeenList, movie_genre_association
+from app.utility_modules.movie_features import STAT_FEATURES, DEFAULT_IMDB_RATING
+from app.utility_modules.db_routing import read_from_replica
+from app.utility_modules.metrics import PhaseTimer
+
+class CatalogModel:
+    """
+    Read-only snapshot of the catalog vectors: row i of `matrix` is the normalized feature vector of
+    movie ids[i]. Shared by every request of the process. Only the snapshot built before Gunicorn forks
+    is shared between workers (copy-on-write pages); a snapshot rebuilt later is private to its worker.
+    """
+
+    def __init__(self, ids, matrix, max_movie_id):
+        self.ids = ids
+        self.matrix = matrix
+        self.index_by_id = {movie_id: index for index, movie_id in enumerate(ids)}
+        self.max_movie_id = max_movie_id
+        self.built_at = time.monotonic()
+
+
+_catalog_model = None
+_catalog_model_lock = threading.Lock()
+
+
+def build_catalog_model(timer=None):
+    # Loads and vectorizes the whole catalog; returns None for an empty catalog
+    timer = timer or PhaseTimer()
+
+    # The catalog tolerates replication lag, so this batch load may use a replica even after a recent write
+    # Plain columns instead of ORM objects: the text, one row per movie/genre pair, and the precomputed
+    # numeric features (cleaned and normalized by refresh_movie_features, see app/utility_modules/movie_features.py)
+    with read_from_replica():
+        df = pd.DataFrame(database.session.execute(
+            select(Movie.id, Movie.title, Movie.description, MovieFeatures.imdb,
+                   *(getattr(MovieFeatures, name) for name in STAT_FEATURES))
+            .outerjoin(MovieFeatures, MovieFeatures.movie_id == Movie.id)
+            .order_by(Movie.id)
+        ).all(), columns=['id', 'title', 'description', 'imdb', *STAT_FEATURES])
+        genre_rows = database.session.execute(
+            select(movie_genre_association.c.movie_id, Genre.name).join(Genre, Genre.id == movie_genre_association.c.genre_id)
+        ).all()
+    timer.lap('load_catalog')
+    if df.empty: return None
 
     # Configure weights for the recommendation algorithm
     # These weights prioritize IMDb rating and Genre over description and general stats
@@ -15,38 +58,18 @@ def get_recommendations(user_id, num_recommendations=4):
     W_STATS = 0.20   # Medium priority given to budget, runtime, and metascore
     W_DESC  = 0.10   # Lower priority given to specific keywords in the description
 
-    movie_data = []
-    for m in movies:
-        # Prepare text data by combining title and description
-        desc_text = f"{m.title} {m.description}"
-        # Create a string of genres separated by spaces
-        genre_text = " ".join([g.name for g in m.genres])
-        
-        # Prepare statistical data, setting defaults if values are missing
-        runtime = m.runtime_minutes if m.runtime_minutes else 90
-        metascore = m.meta_score if m.meta_score else 50
-        budget = m.box_office if m.box_office else 0
-        
-        # Handle IMDb ratings carefully, defaulting to a neutral score if unavailable
-        try:
-            imdb_val = float(m.imdb_rating) if m.imdb_rating and m.imdb_rating != 'N/A' else 5.0
-        except:
-            imdb_val = 5.0
-
-        # Map MPAA ratings to numerical values for processing
-        rating_map = {'R': 3, 'PG-13': 2, 'PG': 1, 'G': 0}
-        rated_val = rating_map.get(m.rated, 1)
-
-        movie_data.append({
-            'id': m.id,
-            'desc': desc_text,
-            'genres': genre_text,
-            'imdb': imdb_val,
-            'stats': [runtime, metascore, budget, rated_val],
-            'obj': m
-        })
-    
-    df = pd.DataFrame(movie_data)
+    # Prepare text data by combining title and description
+    df['desc'] = df['title'] + ' ' + df['description'].fillna('None')
+    # Create a string of genres separated by spaces
+    genres_by_movie = {}
+    for movie_id, name in genre_rows:
+        genres_by_movie.setdefault(movie_id, []).append(name)
+    df['genres'] = [' '.join(genres_by_movie.get(movie_id, [])) for movie_id in df['id']]
+
+    # Movies added since the last feature refresh get neutral features
+    df['imdb'] = df['imdb'].fillna(DEFAULT_IMDB_RATING / 10.0)
+    df[list(STAT_FEATURES)] = df[list(STAT_FEATURES)].fillna(0.0)
+    timer.lap('prepare_features')
 
     # Convert movie descriptions into numerical vectors using TF-IDF
     tfidf = TfidfVectorizer(stop_words='english')
@@ -59,17 +82,9 @@ def get_recommendations(user_id, num_recommendations=4):
     genre_matrix = count_vec.fit_transform(df['genres'])
     genre_tensor = torch.tensor(genre_matrix.toarray(), dtype=torch.float32)
 
-    # Normalize statistical data columns to a 0-1 range
-    stats_tensor = torch.tensor(list(df['stats']), dtype=torch.float32)
-    for i in range(stats_tensor.shape[1]):
-        col = stats_tensor[:, i]
-        min_v, max_v = col.min(), col.max()
-        if max_v > min_v:
-            stats_tensor[:, i] = (col - min_v) / (max_v - min_v)
-
-    # Normalize IMDb ratings to a 0-1 range
-    imdb_tensor = torch.tensor(list(df['imdb']), dtype=torch.float32).unsqueeze(1)
-    imdb_tensor = imdb_tensor / 10.0
+    # Statistical data and IMDb ratings are already scaled to a 0-1 range in movie_features
+    stats_tensor = torch.tensor(df[list(STAT_FEATURES)].to_numpy(), dtype=torch.float32)
+    imdb_tensor = torch.tensor(df['imdb'].to_numpy(), dtype=torch.float32).unsqueeze(1)
 
     # Normalize the description and genre tensors before applying weights
     desc_tensor = F.normalize(desc_tensor, p=2, dim=1)
@@ -86,8 +101,88 @@ def get_recommendations(user_id, num_recommendations=4):
 
     # Normalize the final combined matrix to facilitate cosine similarity calculations
     final_movie_matrix = F.normalize(combined_tensor, p=2, dim=1)
+    timer.lap('vectorize')
+
+    ids = [int(movie_id) for movie_id in df['id']]
+    return CatalogModel(ids, final_movie_matrix, max(ids))
+
+
+def latest_movie_id():
+    # Newest movie id (one index lookup), used to notice added movies without reloading the catalog
+    with read_from_replica():
+        return database.session.execute(select(func.max(Movie.id))).scalar()
+
+
+def get_catalog_model(timer=None):
+    """
+    Returns the current catalog model without any query. The model is kept fresh outside the requests
+    (refresh_catalog_model); only a process that has none yet (a failed warm-up, a script) builds it here.
+    """
+    global _catalog_model
+
+    model = _catalog_model
+    if model is not None:
+        return model
+
+    with _catalog_model_lock:
+        # Another thread may have finished the build while this one waited
+        if _catalog_model is None:
+            _catalog_model = build_catalog_model(timer)
+        return _catalog_model
+
+
+def refresh_catalog_model():
+    """
+    Rebuilds the catalog model when there is none yet, it is older than RECOMMENDER_MODEL_TTL seconds
+    or movies were added since it was built; requests keep using the previous snapshot meanwhile.
+    Runs at worker warm-up and on the refresher thread. Returns True when it rebuilt.
+    """
+    global _catalog_model
+
+    with _catalog_model_lock:
+        model = _catalog_model
+        if model is not None:
+            fresh = time.monotonic() - model.built_at < app.config['RECOMMENDER_MODEL_TTL']
+            if fresh and latest_movie_id() == model.max_movie_id:
+                return False
+        _catalog_model = build_catalog_model()
+        return True
+
+
+def run_catalog_refresher(interval=None, stop_event=None):
+    """
+    Calls refresh_catalog_model every RECOMMENDER_REFRESH_INTERVAL seconds (or until stop_event is set),
+    so no request waits for a rebuild or pays the check for added movies.
+    """
+    interval = interval or app.config['RECOMMENDER_REFRESH_INTERVAL']
+    stop_event = stop_event or threading.Event()
+
+    while not stop_event.wait(interval):
+        with app.app_context():
+            started = time.monotonic()
+            try:
+                if refresh_catalog_model():
+                    app.logger.info("Recommender catalog model rebuilt in %.2fs", time.monotonic() - started)
+            except Exception:
+                app.logger.exception("Could not rebuild the recommender catalog model")
+            finally:
+                database.session.remove()
+
+
+def start_catalog_refresher_thread():
+    """Starts the catalog refresher as a daemon thread of the current process (one per Gunicorn worker)."""
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run_catalog_refresher, kwargs={'stop_event': stop_event}, name='catalog-refresher', daemon=True)
+    thread.start()
+    return thread, stop_event
+
+
+def get_recommendations(user_id, num_recommendations=4):
+    # Each phase is observed in parallax_recommender_phase_seconds
+    timer = PhaseTimer()
 
     # Construct the user profile based on their highly rated movies
+    # (checked first, so users without history get their cold-start list without loading the catalog)
     user_ratings = Rating.query.filter(Rating.user_id == user_id, Rating.score >= 7).all()
     liked_ids = [r.movie_id for r in user_ratings]
 
@@ -98,23 +193,27 @@ def get_recommendations(user_id, num_recommendations=4):
 
     if not liked_ids:
         return [] # Return empty if no user history exists to base recommendations on
+    timer.lap('load_user_history')
+
+    # Shared catalog vectors (rebuilt in the background, see refresh_catalog_model)
+    model = get_catalog_model(timer)
+    if model is None: return []
 
     # Create the user vector by finding the indices of movies the user liked
-    liked_indices = df.index[df['id'].isin(liked_ids)].tolist()
+    liked_indices = sorted(model.index_by_id[movie_id] for movie_id in set(liked_ids) if movie_id in model.index_by_id)
     
     if not liked_indices:
         return []
 
     # Calculate the average vector of all movies the user liked to create a dynamic preference profile
-    user_profile_vector = torch.mean(final_movie_matrix[liked_indices], dim=0, keepdim=True)
+    user_profile_vector = torch.mean(model.matrix[liked_indices], dim=0, keepdim=True)
 
     # Calculate similarity scores by comparing the user profile vector against all movie vectors
-    similarity_scores = torch.mm(final_movie_matrix, user_profile_vector.t()).flatten()
+    similarity_scores = torch.mm(model.matrix, user_profile_vector.t()).flatten()
 
     # Sort movies by similarity score in descending order
-    top_indices = torch.topk(similarity_scores, k=len(movies)).indices.tolist()
+    top_indices = torch.topk(similarity_scores, k=len(model.ids)).indices.tolist()
     
-    recommended = []
     # Fetch lists of movies the user has already seen or rated to exclude them
     seen_ids = [s.movie_id for s in SeenList.query.filter_by(user_id=user_id).all()]
     all_rated_ids = [r.movie_id for r in Rating.query.filter_by(user_id=user_id).all()]
@@ -122,11 +221,18 @@ def get_recommendations(user_id, num_recommendations=4):
     excluded_ids = set(seen_ids + all_rated_ids)
 
     # Iterate through the top matches and select recommendations that haven't been seen yet
+    recommended_ids = []
     for idx in top_indices:
-        movie_obj = df.iloc[idx]['obj']
-        if movie_obj.id not in excluded_ids:
-            recommended.append(movie_obj)
-        if len(recommended) >= num_recommendations:
+        movie_id = model.ids[idx]
+        if movie_id not in excluded_ids:
+            recommended_ids.append(movie_id)
+        if len(recommended_ids) >= num_recommendations:
             break
-            
+
+    # Only the recommended movies are loaded as objects, in ranking order (with what their cards show)
+    movies_by_id = {movie.id: movie for movie in Movie.query.options(
+        selectinload(Movie.genres), selectinload(Movie.poster_image)).filter(Movie.id.in_(recommended_ids))}
+    recommended = [movies_by_id[movie_id] for movie_id in recommended_ids if movie_id in movies_by_id]
+
+    timer.lap('rank')
     return recommended
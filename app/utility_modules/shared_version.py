@@ -0,0 +1,37 @@
+import os
+import time
+import tempfile
+
+# Version stamps kept in small files, so every process sees the same value: the Gunicorn workers,
+# the worker containers and the database scripts (which share the project volume). Caches store
+# the stamp their data was built at and treat anything built at another stamp as a miss.
+
+
+class VersionFile:
+    """A stamp that any process can read and bump; '0' until the first bump."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def get(self):
+        try:
+            with open(self.path, 'r') as f:
+                return f.read().strip() or '0'
+        except OSError:
+            return '0'
+
+    def bump(self):
+        # A timestamp is used instead of a counter so concurrent bumps never collide
+        value = str(time.time_ns())
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(value)
+            # Readers see the old or the new stamp, never a partial one
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return value
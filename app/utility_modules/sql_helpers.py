@@ -0,0 +1,47 @@
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from app import database
+
+# Dialects whose INSERT supports ON CONFLICT DO UPDATE / DO NOTHING
+UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+
+def dialect_name():
+    # Name of the database backend bound to the session ('postgresql', 'sqlite', ...)
+    return database.session.get_bind().dialect.name
+
+
+def dialect_insert(model):
+    """
+    Returns an INSERT construct for the model that exposes on_conflict_do_update()
+    and on_conflict_do_nothing() on PostgreSQL and SQLite.
+    """
+    insert = UPSERT_DIALECTS.get(dialect_name())
+    if insert is None:
+        raise NotImplementedError(f"Upserts are not supported on the '{dialect_name()}' database.")
+    return insert(model)
+
+
+def insert_ignore(model, **values):
+    # INSERT ... ON CONFLICT DO NOTHING (the unique constraints decide what a duplicate is)
+    return dialect_insert(model).values(**values).on_conflict_do_nothing()
+
+
+def estimated_row_count(model):
+    """
+    Row count of the model's table without scanning it on PostgreSQL (planner statistics
+    from pg_class, refreshed by autovacuum/ANALYZE). Other backends, and tables that were
+    never analyzed, fall back to an exact COUNT(*).
+    """
+    if dialect_name() == 'postgresql':
+        estimate = database.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+            {'table': model.__table__.name}
+        ).scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+
+    return database.session.execute(select(func.count()).select_from(model)).scalar()
@@ -0,0 +1,40 @@
+import unicodedata
+
+# Everything that is not a letter or a digit becomes a separator. Letters and digits of every script
+# count (str.isalnum()), and so do the marks that belong to them: vowel signs in Devanagari or Thai
+# are not alphanumeric by themselves, and \w does not match them either
+def is_title_character(character):
+    return character.isalnum() or unicodedata.category(character).startswith('M')
+
+
+def strip_latin_accents(title):
+    # Drops the accents of Latin letters only: in other scripts the marks tell letters apart
+    # (ゴ and コ, й and и), so they are kept and recomposed
+    characters = []
+    for character in unicodedata.normalize('NFKD', title):
+        if unicodedata.combining(character) and characters and characters[-1].isascii():
+            continue
+        characters.append(character)
+    return unicodedata.normalize('NFC', ''.join(characters))
+
+
+def normalize_title(title):
+    """
+    Reduces a movie title to a comparable key: Latin accents removed, case folded,
+    '&' spelled out and punctuation collapsed into single spaces.
+    "Amélie" and "amelie", "Fast & Furious" and "Fast and Furious" share a key;
+    titles in other scripts keep their letters ("七人の侍" stays "七人の侍").
+    """
+    if not title:
+        return ''
+
+    folded = strip_latin_accents(title).casefold().replace('&', ' and ')
+    return ' '.join(''.join(c if is_title_character(c) else ' ' for c in folded).split())
+
+
+def title_key(title):
+    """
+    Exact matching key of a title: normalize_title, or the case folded title itself when it
+    has no letter or digit at all ("!!!", "..."), so such titles never share an empty key.
+    """
+    return normalize_title(title) or (title or '').strip().casefold()
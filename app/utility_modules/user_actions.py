@@ -0,0 +1,194 @@
+from datetime import datetime
+from sqlalchemy import select, exists, func, delete, literal, literal_column, Boolean
+from app import database
+from app.models import Movie, Rating, SeenList, ToWatchList
+from app.utility_modules.sql_helpers import dialect_insert, insert_ignore, dialect_name
+from app.utility_modules.leaderboards import mark_stale_movies
+
+# Write operations shared by the HTML routes (redirect + flash) and the JSON API routes
+# Each action is one or two statements (INSERT ... ON CONFLICT / DELETE ... RETURNING) in one transaction
+
+def parse_score(score_string):
+    """
+    Converts the submitted score to an integer between 1 and 10.
+    Raises ValueError with a user-facing message when the value is invalid.
+    """
+    try:
+        score = int(score_string)
+    except (ValueError, TypeError):
+        raise ValueError('The rating must be a number.')
+
+    if not 1 <= score <= 10:
+        raise ValueError('Please provide a valid rating between 1 and 10.')
+
+    return score
+
+
+def toggle_seen_entry(user_id, movie_id):
+    # Adds the movie to the seen list, or removes it (together with the rating); returns 'added' or 'removed'
+    removed = database.session.execute(
+        delete(SeenList).where(SeenList.user_id == user_id, SeenList.movie_id == movie_id).returning(SeenList.id)
+    ).first()
+
+    if removed:
+        # CRITICAL: Delete the rating as well, since the movie is no longer considered seen
+        deleted = database.session.execute(
+            delete(Rating).where(Rating.user_id == user_id, Rating.movie_id == movie_id).returning(Rating.movie_id, Rating.timestamp)
+        ).all()
+        mark_stale_movies(deleted)
+        status = 'removed'
+    else:
+        # Nothing was deleted, so add it (a concurrent double-click hits the unique constraint and is ignored)
+        database.session.execute(insert_ignore(SeenList, user_id=user_id, movie_id=movie_id, date_added=datetime.utcnow()))
+        status = 'added'
+
+    database.session.commit()
+    return status
+
+
+def toggle_watchlist_entry(user_id, movie_id):
+    # Adds the movie to the watchlist or removes it; returns 'added' or 'removed'
+    removed = database.session.execute(
+        delete(ToWatchList).where(ToWatchList.user_id == user_id, ToWatchList.movie_id == movie_id).returning(ToWatchList.id)
+    ).first()
+
+    if removed:
+        status = 'removed'
+    else:
+        database.session.execute(insert_ignore(ToWatchList, user_id=user_id, movie_id=movie_id, date_added=datetime.utcnow()))
+        status = 'added'
+
+    database.session.commit()
+    return status
+
+
+def save_rating(user_id, movie_id, score):
+    # Creates or updates the rating and marks the movie as seen; returns 'created' or 'updated'
+    now = datetime.utcnow()
+
+    # Single upsert on the unique (user_id, movie_id) constraint; an update keeps the original timestamp
+    statement = dialect_insert(Rating).values(user_id=user_id, movie_id=movie_id, score=score, timestamp=now)
+    statement = statement.on_conflict_do_update(
+        index_elements=[Rating.user_id, Rating.movie_id],
+        set_={'score': statement.excluded.score}
+    )
+
+    if dialect_name() == 'postgresql':
+        # xmax is 0 only on a row version created by an INSERT (an ON CONFLICT update sets it)
+        created, rated_at = database.session.execute(
+            statement.returning(literal_column('(xmax = 0)', Boolean), Rating.timestamp)
+        ).one()
+    else:
+        # SQLite runs one writer at a time: look the rating up in the same transaction first
+        rated_at = database.session.execute(
+            select(Rating.timestamp).where(Rating.user_id == user_id, Rating.movie_id == movie_id)
+        ).scalar()
+        created = rated_at is None
+        database.session.execute(statement)
+
+    # A new score in an old day bucket of the leaderboards
+    if not created:
+        mark_stale_movies([(movie_id, rated_at)])
+
+    # CRITICAL LOGIC: Ensure the movie is marked as seen
+    database.session.execute(insert_ignore(SeenList, user_id=user_id, movie_id=movie_id, date_added=now))
+
+    # Final commit of all changes (rating, seenlist)
+    database.session.commit()
+
+    return 'created' if created else 'updated'
+
+
+def delete_rating(user_id, movie_id):
+    # Removes the rating of the user; returns False if there was nothing to remove
+    removed = database.session.execute(
+        delete(Rating).where(Rating.user_id == user_id, Rating.movie_id == movie_id).returning(Rating.movie_id, Rating.timestamp)
+    ).first()
+
+    if removed is not None:
+        mark_stale_movies([removed])
+    database.session.commit()
+    return removed is not None
+
+
+# Lists that can be edited in bulk
+LIST_MODELS = {
+    'watchlist': ToWatchList,
+    'seen': SeenList
+}
+
+
+def bulk_add(user_id, list_name, movie_ids):
+    """
+    Adds many movies to a list with a single INSERT ... SELECT (unknown ids are skipped,
+    existing entries ignored). Returns the number of inserted rows.
+    """
+    list_model = LIST_MODELS[list_name]
+    movies = select(literal(user_id), Movie.id, literal(datetime.utcnow())).where(Movie.id.in_(movie_ids))
+
+    result = database.session.execute(
+        dialect_insert(list_model).from_select(['user_id', 'movie_id', 'date_added'], movies).on_conflict_do_nothing()
+    )
+    return result.rowcount
+
+
+def bulk_remove(user_id, list_name, movie_ids):
+    """
+    Removes many movies from a list with one DELETE; removing from the seen list also
+    removes the ratings, like toggle_seen_entry. Returns (removed rows, removed ratings).
+    """
+    list_model = LIST_MODELS[list_name]
+    removed = database.session.execute(
+        delete(list_model).where(list_model.user_id == user_id, list_model.movie_id.in_(movie_ids))
+    ).rowcount
+
+    ratings_removed = 0
+    if list_model is SeenList:
+        deleted = database.session.execute(
+            delete(Rating).where(Rating.user_id == user_id, Rating.movie_id.in_(movie_ids)).returning(Rating.movie_id, Rating.timestamp)
+        ).all()
+        mark_stale_movies(deleted)
+        ratings_removed = len(deleted)
+
+    return removed, ratings_removed
+
+
+def bulk_edit_lists(user_id, action, list_name, movie_ids, target_list=None):
+    """
+    Applies a bulk 'add', 'remove' or 'move' (list_name -> target_list) in one transaction
+    and returns the affected row counts.
+    """
+    result = {'action': action, 'added': 0, 'removed': 0, 'ratings_removed': 0}
+
+    if action in ('add', 'move'):
+        result['added'] = bulk_add(user_id, target_list if action == 'move' else list_name, movie_ids)
+    if action in ('remove', 'move'):
+        result['removed'], result['ratings_removed'] = bulk_remove(user_id, list_name, movie_ids)
+
+    database.session.commit()
+    return result
+
+
+def get_movie_state(user_id, movie_id):
+    """
+    Returns the list/rating state of a movie for a user plus the global rating stats,
+    fetched with a single query made of scalar subqueries.
+    """
+    row = database.session.execute(select(
+        select(Rating.score).where(Rating.user_id == user_id, Rating.movie_id == movie_id).scalar_subquery(),
+        exists().where(SeenList.user_id == user_id, SeenList.movie_id == movie_id),
+        exists().where(ToWatchList.user_id == user_id, ToWatchList.movie_id == movie_id),
+        select(func.avg(Rating.score)).where(Rating.movie_id == movie_id).scalar_subquery(),
+        select(func.count(Rating.id)).where(Rating.movie_id == movie_id).scalar_subquery()
+    )).one()
+
+    user_rating, in_seen_list, in_watchlist, avg_rating, rating_count = row
+
+    return {
+        'user_rating': user_rating,
+        # Automatically marked as seen if a rating exists
+        'is_seen': bool(in_seen_list) or user_rating is not None,
+        'is_in_watchlist': bool(in_watchlist),
+        'avg_rating': round(float(avg_rating), 2) if avg_rating is not None else None,
+        'rating_count': rating_count
+    }
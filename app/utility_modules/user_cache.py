@@ -0,0 +1,97 @@
+import os
+import time
+import threading
+from flask_login import UserMixin
+from app import app, database
+from app.models import User
+from app.utility_modules.shared_version import VersionFile
+
+# Fields needed on every authenticated request (navbar, admin checks, ownership checks)
+CACHED_USER_FIELDS = ('id', 'username', 'is_admin', 'is_confirmed')
+
+# Expired entries are swept once the cache grows past this many users
+MAX_CACHED_USERS = 10000
+
+# user_id -> (expires_at, generation, fields); private to each gunicorn worker
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+# Generation of the cached users, shared by all workers through a file: any invalidation bumps it, so
+# every worker drops its entries at once instead of serving a demoted or deleted admin until the TTL
+_user_generation = None
+
+
+def user_generation():
+    global _user_generation
+    if _user_generation is None:
+        _user_generation = VersionFile(os.path.join(app.instance_path, 'user_cache.version'))
+    return _user_generation
+
+
+class CachedUser(UserMixin):
+    """
+    Lightweight stand-in for User built from the cached fields.
+    Any other attribute (email, password, relationships, methods) loads the full
+    User row on first access, so only pages that need it pay for the query.
+    """
+
+    def __init__(self, fields):
+        for name in CACHED_USER_FIELDS:
+            setattr(self, name, fields[name])
+
+    def __getattr__(self, name):
+        # Only called for attributes missing on the proxy
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        model = self.__dict__.get('_model')
+        if model is None:
+            model = database.session.get(User, self.__dict__['id'])
+            self.__dict__['_model'] = model
+        return getattr(model, name)
+
+    def __repr__(self):
+        return f"User: {self.username}"
+
+
+def load_cached_user(user_id):
+    """
+    Returns the user for Flask-Login's user_loader, querying the database only
+    when the cached fields are missing or older than USER_CACHE_TTL seconds.
+    """
+    ttl = app.config['USER_CACHE_TTL']
+    now = time.time()
+
+    if ttl > 0:
+        # Read before the query, so an invalidation that races with it is not missed
+        generation = user_generation().get()
+        entry = _user_cache.get(user_id)
+        if entry and entry[0] > now and entry[1] == generation:
+            return CachedUser(entry[2])
+
+    row = database.session.query(
+        User.id, User.username, User.is_admin, User.is_confirmed
+    ).filter(User.id == user_id).first()
+
+    if row is None:
+        return None
+
+    fields = dict(zip(CACHED_USER_FIELDS, row))
+    if ttl > 0:
+        with _user_cache_lock:
+            if len(_user_cache) >= MAX_CACHED_USERS:
+                for expired_id in [key for key, (expires_at, _, _) in _user_cache.items() if expires_at <= now]:
+                    del _user_cache[expired_id]
+            _user_cache[user_id] = (now + ttl, generation, fields)
+
+    return CachedUser(fields)
+
+
+def invalidate_cached_user(user_id):
+    """
+    Drops the cached fields of a user in every worker; call it after changing the profile, password or roles.
+    The other cached users are reloaded too (edits are rare, a reload is one small query).
+    """
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+    user_generation().bump()
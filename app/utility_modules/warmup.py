@@ -0,0 +1,74 @@
+import time
+import threading
+import torch
+from sqlalchemy import text
+from app import app, database
+from app.utility_modules.recommendation_engine import get_catalog_model, refresh_catalog_model, start_catalog_refresher_thread
+
+# Work done before a process serves traffic, so no user request pays for it:
+#   warm_up_app()     once in the Gunicorn master (preload_app): compiled templates and the recommender
+#                     catalog model, inherited by every worker as shared copy-on-write memory
+#   warm_up_worker()  in each worker before it accepts connections: its own database connections,
+#                     a catalog model if the master had none (or it is stale) and the thread that keeps
+#                     rebuilding it in the background; then the worker is ready
+# /readyz answers 503 until warm_up_worker() has finished in the process serving it.
+
+_ready = threading.Event()
+
+
+def warm_up_app():
+    """
+    Builds the read-only state shared by all workers and returns the seconds it took.
+    Failures are logged; the workers retry.
+    """
+    started = time.monotonic()
+    # A single intra-op thread while forking is safe; each worker sets its own count after the fork
+    torch.set_num_threads(1)
+
+    # Jinja compiles a template on first use, per process: compile the application templates once here
+    for name in app.jinja_loader.list_templates():
+        app.jinja_env.get_template(name)
+
+    with app.app_context():
+        try:
+            get_catalog_model()
+        except Exception:
+            app.logger.exception("Could not build the recommender catalog model before forking")
+        finally:
+            database.session.remove()
+            # The master serves no requests: close its connections instead of handing them to the workers
+            for engine in database.engines.values():
+                engine.dispose()
+
+    return time.monotonic() - started
+
+
+def warm_up_worker():
+    """
+    Prepares one worker process, marks it ready and returns the seconds it took.
+    Raises if the database cannot be reached.
+    """
+    started = time.monotonic()
+    torch.set_num_threads(app.config['RECOMMENDER_TORCH_THREADS'])
+
+    with app.app_context():
+        # Connections opened by the master must not be shared between processes: forget them
+        # (without closing the sockets the master still owns) and open this worker's own
+        for engine in database.engines.values():
+            engine.dispose(close=False)
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+
+        # Rebuilds the model when the master could not, or its snapshot is already stale
+        refresh_catalog_model()
+        database.session.remove()
+
+    # Threads do not survive the fork, so every worker starts its own
+    start_catalog_refresher_thread()
+
+    _ready.set()
+    return time.monotonic() - started
+
+
+def is_ready():
+    return _ready.is_set()
@@ -0,0 +1,91 @@
+"""
+Fires parallel rating and list-toggle requests for the same user and movie
+(the double-click case) and reports any IntegrityError raised by the write path.
+
+Point DATABASE_URL at a PostgreSQL database for a realistic run; by default
+a throwaway SQLite database is used:
+    DATABASE_URL=postgresql://... python benchmarks/concurrent_writes.py
+"""
+import os
+import sys
+import random
+import tempfile
+import threading
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+database_file = os.path.join(tempfile.mkdtemp(), 'concurrency.db')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{database_file}")
+os.environ.setdefault('APP_SECRET_KEY', 'benchmark-secret')
+
+from sqlalchemy.exc import IntegrityError
+from app import app, database
+from app.models import User, Movie
+
+THREADS = 16
+REQUESTS_PER_THREAD = 50
+MOVIE_IDS = [1, 2, 3]
+
+# Actions replayed by every thread against the same few movies
+ACTIONS = [
+    lambda client, movie_id: client.post(f"/api/movies/{movie_id}/rating", data={'score': random.randint(1, 10)}),
+    lambda client, movie_id: client.delete(f"/api/movies/{movie_id}/rating"),
+    lambda client, movie_id: client.post(f"/api/movies/{movie_id}/seen"),
+    lambda client, movie_id: client.post(f"/api/movies/{movie_id}/watchlist"),
+]
+
+
+def seed_database():
+    with app.app_context():
+        database.create_all()
+        if not User.query.filter_by(email='race@parallax.com').first():
+            user = User(username='race', email='race@parallax.com', is_confirmed=True)
+            user.set_password('race123')
+            database.session.add(user)
+            for movie_id in MOVIE_IDS:
+                database.session.add(Movie(title=f"Race Movie {movie_id}", release_year=2000))
+            database.session.commit()
+
+
+def worker(results):
+    client = app.test_client()
+    client.post('/login', data={'email': 'race@parallax.com', 'password': 'race123'})
+
+    for _ in range(REQUESTS_PER_THREAD):
+        try:
+            response = random.choice(ACTIONS)(client, random.choice(MOVIE_IDS))
+            key = 'ok' if response.status_code == 200 else f"http_{response.status_code}"
+        except IntegrityError:
+            key = 'integrity_error'
+        except Exception as e:
+            key = type(e).__name__
+
+        with results['lock']:
+            results[key] = results.get(key, 0) + 1
+
+
+if __name__ == '__main__':
+    # Let exceptions reach the test client so IntegrityErrors are counted instead of turned into 500s
+    app.config['PROPAGATE_EXCEPTIONS'] = True
+    seed_database()
+
+    results = {'lock': threading.Lock()}
+    threads = [threading.Thread(target=worker, args=(results,)) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    del results['lock']
+    with app.app_context():
+        backend_name = database.engine.url.get_backend_name()
+
+    print(f"{THREADS} threads x {REQUESTS_PER_THREAD} requests on {backend_name}:")
+    for key, count in sorted(results.items()):
+        print(f"   - {key}: {count}")
+
+    if results.get('integrity_error'):
+        sys.exit(1)
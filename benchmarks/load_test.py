@@ -0,0 +1,369 @@
+"""
+HTTP load test replaying a weighted mix of Parallax routes (scenario files in
+benchmarks/scenarios/) and reporting throughput, latency percentiles and error
+rates per route. Results are saved as JSON so two versions can be compared.
+
+    # Seed the load-test users and start Gunicorn on a throwaway SQLite database
+    python benchmarks/load_test.py run --scenario benchmarks/scenarios/default.json --start-server --output before.json
+
+    # Or drive a server that is already running (e.g. docker compose, seeded with `seed`)
+    python benchmarks/load_test.py seed
+    python benchmarks/load_test.py run --scenario benchmarks/scenarios/default.json --base-url http://localhost:5000
+
+    python benchmarks/load_test.py compare before.json after.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+import requests
+from dotenv import load_dotenv
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+# Credentials of the seeded virtual users: loadtest<n>@parallax.com / LOADTEST_PASSWORD
+LOADTEST_PASSWORD = 'loadtest123'
+PERCENTILES = (50, 90, 95, 99)
+
+
+# ==========================================================================================
+# Seeding
+# ==========================================================================================
+
+def seed_database(user_count, movie_count):
+    """
+    Creates the load-test users and, if the catalog is empty, synthetic movies.
+    Imports the application, so DATABASE_URL must point at the database the server uses.
+    Returns the number of movies in the catalog.
+    """
+    from app import app, database
+    from app.models import User, Movie, Genre
+
+    with app.app_context():
+        database.create_all()
+
+        existing = {email for (email,) in database.session.query(User.email).filter(User.email.like('loadtest%'))}
+        for index in range(user_count):
+            email = f"loadtest{index}@parallax.com"
+            if email not in existing:
+                user = User(username=f"loadtest{index}", email=email, is_confirmed=True)
+                user.set_password(LOADTEST_PASSWORD)
+                database.session.add(user)
+
+        if Movie.query.count() == 0:
+            genres = [Genre(name=name) for name in ('Drama', 'Comedy', 'Action', 'Thriller', 'Romance', 'Sci-Fi')]
+            database.session.add_all(genres)
+            for index in range(movie_count):
+                movie = Movie(title=f"Load Test Movie {index}", description=f"Synthetic movie number {index} for load tests",
+                              release_year=1960 + index % 65, imdb_rating=round(random.uniform(3, 9), 1))
+                movie.genres = random.sample(genres, random.randint(1, 3))
+                database.session.add(movie)
+
+        database.session.commit()
+        return Movie.query.count()
+
+
+def start_server(port, workers):
+    """Starts Gunicorn on the configured database and waits until it answers."""
+    process = subprocess.Popen(
+        ['gunicorn', '-w', str(workers), '-b', f"127.0.0.1:{port}", 'run:app'],
+        cwd=parent_dir, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT
+    )
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            requests.get(f"{base_url}/login", timeout=5)
+            return process, base_url
+        except requests.RequestException:
+            # Not listening yet, or still importing the application
+            time.sleep(0.5)
+
+    process.kill()
+    raise RuntimeError("Gunicorn did not start within 60 seconds.")
+
+
+# ==========================================================================================
+# Virtual users
+# ==========================================================================================
+
+class Recorder:
+    # Latencies and errors per route label, shared by all virtual users
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, label, seconds, error=None):
+        with self.lock:
+            route = self.routes.setdefault(label, {'latencies': [], 'errors': {}})
+            route['latencies'].append(seconds)
+            if error:
+                route['errors'][error] = route['errors'].get(error, 0) + 1
+
+
+class VirtualUser:
+    """One browser session replaying random actions of the scenario until the deadline."""
+
+    def __init__(self, index, scenario, base_url, recorder, logged_in):
+        self.index = index
+        self.scenario = scenario
+        self.base_url = base_url
+        self.recorder = recorder
+        self.logged_in = logged_in
+        self.state = 'user' if logged_in else 'anon'
+        self.session = requests.Session()
+        self.random = random.Random(scenario.get('seed', 0) + index)
+
+        # Actions a logged-out visitor cannot perform are left out of its mix
+        self.actions = [action for action in scenario['actions'] if logged_in or not action.get('login_required')]
+        self.weights = [action['weight'] for action in self.actions]
+
+    def request(self, label, method, path, **kwargs):
+        started = time.perf_counter()
+        error = None
+        try:
+            response = self.session.request(method, self.base_url + path, allow_redirects=False,
+                                            timeout=self.scenario.get('timeout', 30), **kwargs)
+            if response.status_code >= 400:
+                error = f"http_{response.status_code}"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        self.recorder.record(f"{label} ({self.state})", time.perf_counter() - started, error)
+
+    def login(self):
+        user_number = self.index % self.scenario.get('user_pool', 50)
+        response = self.session.post(self.base_url + '/login', allow_redirects=False, data={
+            'email': f"loadtest{user_number}@parallax.com", 'password': LOADTEST_PASSWORD
+        })
+        if response.status_code != 302 or 'session' not in self.session.cookies:
+            raise RuntimeError(f"Login of loadtest{user_number} failed (run the 'seed' command first).")
+
+    def movie_id(self):
+        low, high = self.scenario['movie_ids']
+        return self.random.randint(low, high)
+
+    def fill(self, value):
+        # Placeholders of scenario paths and form data
+        return str(value).format(movie_id=self.movie_id(), score=self.random.randint(1, 10))
+
+    def run_action(self, action):
+        kind = action.get('type', 'get')
+
+        if kind == 'catalog':
+            # Random combination of the filters, sort orders and pages of the catalog form
+            params = {'page': self.random.randint(1, action.get('max_page', 5)),
+                      'sort_by': self.random.choice(action.get('sorts', ['title_asc']))}
+            genres = action.get('genres', [])
+            if genres and self.random.random() < action.get('genre_probability', 0.5):
+                params['genre'] = self.random.sample(genres, self.random.randint(1, min(2, len(genres))))
+            if self.random.random() < action.get('year_probability', 0.3):
+                params['min_year'] = self.random.choice(action.get('min_years', [1990, 2000, 2010]))
+            self.request(action['name'], 'GET', '/catalog', params=params)
+
+        elif kind == 'autocomplete':
+            # One request per keystroke, like the search box
+            word = self.random.choice(action['words'])
+            for length in range(action.get('min_chars', 2), len(word) + 1):
+                self.request(action['name'], 'GET', '/search_autocomplete', params={'q': word[:length]})
+                time.sleep(action.get('keystroke_delay', 0.08))
+
+        else:
+            data = {key: self.fill(value) for key, value in action.get('data', {}).items()}
+            self.request(action['name'], kind.upper(), self.fill(action['path']), data=data or None)
+
+    def run(self, deadline):
+        if self.logged_in:
+            self.login()
+
+        think_min, think_max = self.scenario.get('think_time', [0, 0])
+        while time.time() < deadline:
+            action = self.random.choices(self.actions, weights=self.weights)[0]
+            self.run_action(action)
+            time.sleep(self.random.uniform(think_min, think_max))
+
+
+# ==========================================================================================
+# Reporting
+# ==========================================================================================
+
+def percentile(sorted_values, percent):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(percent / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(recorder, elapsed):
+    summary = {}
+    for label, route in sorted(recorder.routes.items()):
+        latencies = sorted(route['latencies'])
+        errors = sum(route['errors'].values())
+        summary[label] = {
+            'requests': len(latencies),
+            'throughput': round(len(latencies) / elapsed, 2),
+            'error_rate': round(errors / len(latencies), 4),
+            'errors': route['errors'],
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2),
+            **{f"p{p}_ms": round(percentile(latencies, p) * 1000, 2) for p in PERCENTILES}
+        }
+    return summary
+
+
+def print_summary(summary):
+    header = f"{'route':<32}{'req':>7}{'req/s':>8}{'err%':>7}" + ''.join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+    print(header)
+    print('-' * len(header))
+    for label, route in summary.items():
+        print(f"{label:<32}{route['requests']:>7}{route['throughput']:>8}{route['error_rate'] * 100:>7.1f}"
+              + ''.join(f"{route[f'p{p}_ms']:>10}" for p in PERCENTILES))
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=parent_dir, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(base_file, new_file):
+    # Per-route throughput and latency change between two saved runs (negative latency delta = faster)
+    with open(base_file) as f:
+        base = json.load(f)
+    with open(new_file) as f:
+        new = json.load(f)
+
+    print(f"base: {base['scenario']} @ {base.get('revision')}  |  new: {new['scenario']} @ {new.get('revision')}")
+    header = f"{'route':<32}{'req/s':>16}{'p50 ms':>20}{'p95 ms':>20}{'err%':>14}"
+    print(header)
+    print('-' * len(header))
+
+    for label in sorted(set(base['routes']) | set(new['routes'])):
+        old_route, new_route = base['routes'].get(label), new['routes'].get(label)
+        if not old_route or not new_route:
+            print(f"{label:<32}  only in {'new' if new_route else 'base'} run")
+            continue
+
+        def change(key, scale=1):
+            old_value, new_value = old_route[key] * scale, new_route[key] * scale
+            delta = f"{(new_value - old_value) / old_value * 100:+.0f}%" if old_value else 'n/a'
+            return f"{old_value:.1f}->{new_value:.1f} {delta}"
+
+        print(f"{label:<32}{change('throughput'):>16}{change('p50_ms'):>20}{change('p95_ms'):>20}"
+              f"{change('error_rate', 100):>14}")
+
+
+# ==========================================================================================
+# Command line
+# ==========================================================================================
+
+def run(args):
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+
+    users = args.users or scenario.get('users', 10)
+    duration = args.duration or scenario.get('duration', 60)
+    server = None
+
+    if args.start_server:
+        # Throwaway SQLite database unless DATABASE_URL is set
+        os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}")
+        os.environ.setdefault('APP_SECRET_KEY', 'loadtest-secret')
+        movie_count = seed_database(scenario.get('user_pool', 50), scenario.get('seed_movies', 500))
+        scenario.setdefault('movie_ids', [1, movie_count])
+        server, base_url = start_server(args.port, args.workers)
+    else:
+        base_url = args.base_url.rstrip('/')
+        scenario.setdefault('movie_ids', [1, 500])
+
+    recorder = Recorder()
+    deadline = time.time() + duration
+    ramp_up = scenario.get('ramp_up', 0)
+    logged_in_ratio = scenario.get('logged_in_ratio', 0.5)
+    threads = []
+
+    print(f"Running '{scenario['name']}' with {users} users for {duration}s against {base_url}...")
+    started = time.time()
+    try:
+        for index in range(users):
+            # The first users of the ratio are logged in, so the split is exact and reproducible
+            virtual_user = VirtualUser(index, scenario, base_url, recorder, logged_in=index < users * logged_in_ratio)
+            thread = threading.Thread(target=virtual_user.run, args=(deadline,), daemon=True)
+            thread.start()
+            threads.append(thread)
+            if ramp_up:
+                time.sleep(ramp_up / users)
+
+        for thread in threads:
+            thread.join()
+    finally:
+        if server:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+
+    summary = summarize(recorder, time.time() - started)
+    print_summary(summary)
+
+    if args.output:
+        result = {
+            'scenario': scenario['name'],
+            'revision': git_revision(),
+            'started_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'users': users,
+            'duration': duration,
+            'base_url': base_url,
+            'routes': summary
+        }
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallax HTTP load test')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='create the load-test users (and movies if the catalog is empty)')
+    seed_parser.add_argument('--users', type=int, default=50)
+    seed_parser.add_argument('--movies', type=int, default=500)
+
+    run_parser = commands.add_parser('run', help='replay a scenario')
+    run_parser.add_argument('--scenario', required=True)
+    run_parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    run_parser.add_argument('--users', type=int, help='concurrent virtual users (overrides the scenario)')
+    run_parser.add_argument('--duration', type=int, help='seconds (overrides the scenario)')
+    run_parser.add_argument('--output', help='JSON file for the results')
+    run_parser.add_argument('--start-server', action='store_true', help='seed the database and start Gunicorn locally')
+    run_parser.add_argument('--port', type=int, default=5055)
+    run_parser.add_argument('--workers', type=int, default=4)
+
+    compare_parser = commands.add_parser('compare', help='compare two saved runs')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('new')
+
+    args = parser.parse_args()
+    if args.command == 'seed':
+        # Seed the database of the running server (DATABASE_URL from .env)
+        load_dotenv()
+        print(f"Catalog has {seed_database(args.users, args.movies)} movies; load-test users are ready.")
+    elif args.command == 'run':
+        run(args)
+    else:
+        compare(args.base, args.new)
+
+
+if __name__ == '__main__':
+    main()
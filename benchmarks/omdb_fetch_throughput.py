@@ -0,0 +1,70 @@
+"""
+Measures OMDb lookup throughput against the local stub server: the old sequential
+loop (one request at a time, 0.3s sleep) versus the concurrent rate-limited fetcher.
+
+    python benchmarks/omdb_fetch_throughput.py --movies 300 --latency 0.15 --rate 50 --workers 16
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+sys.path.append(current_dir)
+
+# Importing the app package needs a database URL; none is queried here
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'omdb_benchmark.db')}")
+
+import requests
+from omdb_stub_server import make_server
+from app.utility_modules.omdb_client import OMDbClient, fetch_all
+
+
+def sequential(base_url, movies):
+    # The previous update_metadata.py loop: new connection per request, fixed pause
+    for _, title, year in movies:
+        requests.get(base_url, params={'apikey': 'stub', 't': title, 'y': year})
+        time.sleep(0.3)
+
+
+def concurrent(base_url, movies, rate, workers):
+    client = OMDbClient('stub', base_url=base_url, requests_per_second=rate, burst=workers,
+                        max_retries=4, pool_size=workers)
+    results = {'found': 0, 'missing': 0, 'failed': 0}
+    for _, data, error in fetch_all(client, movies, workers):
+        results['failed' if error else 'found' if data else 'missing'] += 1
+    return results, client.stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--movies', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.15)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--rate', type=float, default=50, help='token bucket requests per second')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--skip-sequential', action='store_true')
+    args = parser.parse_args()
+
+    server = make_server(latency=args.latency, error_rate=args.error_rate)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    movies = [(index, f"Movie {index}", 1950 + index % 75) for index in range(args.movies)]
+
+    if not args.skip_sequential:
+        # A tenth of the movies is enough to extrapolate the slow loop
+        sample = movies[:max(1, args.movies // 10)]
+        started = time.perf_counter()
+        sequential(base_url, sample)
+        per_second = len(sample) / (time.perf_counter() - started)
+        print(f"sequential: {per_second:.1f} movies/s (~{args.movies / per_second:.0f}s for {args.movies} movies)")
+
+    started = time.perf_counter()
+    results, stats = concurrent(base_url, movies, args.rate, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"concurrent: {args.movies / elapsed:.1f} movies/s ({elapsed:.1f}s, {args.workers} workers, "
+          f"limit {args.rate}/s) {results}, {stats['requests']} requests, {stats['retries']} retries")
+    server.shutdown()
@@ -0,0 +1,102 @@
+"""
+Local stand-in for the OMDb API, used to measure the metadata fetcher without
+spending quota. Answers are deterministic per title; latency, transient errors,
+unknown movies and a daily quota can be simulated.
+
+    python benchmarks/omdb_stub_server.py --port 8765 --latency 0.15 --error-rate 0.05
+    OMDB_BASE_URL=http://127.0.0.1:8765/ OMDB_API_KEY=stub python database/update_metadata.py
+"""
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class StubOMDbHandler(BaseHTTPRequestHandler):
+    # Settings are class attributes, configured by make_server()
+    latency = 0.1
+    error_rate = 0.0
+    missing_rate = 0.05
+    quota = None
+    served = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        title = params.get('t', [''])[0]
+        year = params.get('y', [''])[0]
+
+        with StubOMDbHandler.lock:
+            StubOMDbHandler.served += 1
+            served = StubOMDbHandler.served
+
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+
+        if self.quota is not None and served > self.quota:
+            return self.send_json(401, {'Response': 'False', 'Error': 'Request limit reached!'})
+        if random.random() < self.error_rate:
+            return self.send_json(503, {'Response': 'False', 'Error': 'Service unavailable'})
+
+        # Deterministic answer per title: the same movie always gets the same metadata
+        digest = int(hashlib.sha1(f"{title}|{year}".encode()).hexdigest(), 16)
+        if (digest % 1000) / 1000 < self.missing_rate:
+            return self.send_json(200, {'Response': 'False', 'Error': 'Movie not found!'})
+
+        self.send_json(200, {
+            'Response': 'True',
+            'Title': title,
+            'Year': year or str(1950 + digest % 75),
+            'Rated': ('G', 'PG', 'PG-13', 'R')[digest % 4],
+            'Runtime': f"{80 + digest % 100} min",
+            'Poster': f"https://posters.example.com/{digest % 10 ** 8}.jpg",
+            'imdbRating': f"{3 + (digest % 65) / 10:.1f}",
+            'imdbVotes': f"{digest % 2_000_000:,}",
+            'Metascore': str(20 + digest % 80),
+            'BoxOffice': f"${digest % 500_000_000:,}"
+        })
+
+
+def make_server(port=0, latency=0.1, error_rate=0.0, missing_rate=0.05, quota=None):
+    # Returns a started server running on a daemon thread (port 0 picks a free port)
+    StubOMDbHandler.latency = latency
+    StubOMDbHandler.error_rate = error_rate
+    StubOMDbHandler.missing_rate = missing_rate
+    StubOMDbHandler.quota = quota
+    StubOMDbHandler.served = 0
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubOMDbHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub OMDb API server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.1, help='average response time in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of 503 answers')
+    parser.add_argument('--missing-rate', type=float, default=0.05, help="share of 'Movie not found!' answers")
+    parser.add_argument('--quota', type=int, help="requests served before 'Request limit reached!'")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.error_rate, args.missing_rate, args.quota)
+    print(f"Stub OMDb listening on http://127.0.0.1:{server.server_address[1]}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,86 @@
+"""
+Caches the posters of a throwaway catalog served by the local stub image server and reports
+the download throughput and the bytes a page saves: full-size originals versus the card variants.
+A second run checks that nothing is downloaded again.
+
+    python benchmarks/poster_cache_benchmark.py --movies 300 --workers 8 --width 1000 --error-rate 0.05
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+sys.path.append(current_dir)
+
+# A throwaway database and poster directory, set before the app reads its configuration
+work_dir = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'poster_benchmark.db')}"
+os.environ['POSTER_CACHE_DIR'] = os.path.join(work_dir, 'posters')
+
+from poster_stub_server import make_server, make_poster
+from app import app, database
+from app.models import Movie
+from app.utility_modules.poster_cache import cache_posters, POSTER_VARIANTS, POSTER_FORMATS
+
+
+def average_sizes(directory):
+    # {(variant, extension): average file size in bytes}
+    sizes = {}
+    for name in os.listdir(directory):
+        variant, extension = name.split('-', 1)[1].split('.')
+        sizes.setdefault((variant, extension), []).append(os.path.getsize(os.path.join(directory, name)))
+    return {key: sum(values) / len(values) for key, values in sizes.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--movies', type=int, default=300)
+    parser.add_argument('--shared', type=float, default=0.05, help='share of movies reusing another poster URL')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--width', type=int, default=1000, help='width of the stub posters')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = make_server(width=args.width, latency=args.latency, error_rate=args.error_rate)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    app.config.update(POSTER_REQUESTS_PER_SECOND=1000, POSTER_MAX_RETRIES=4)
+
+    with app.app_context():
+        database.create_all()
+        shared_every = int(1 / args.shared) if args.shared else 0
+        database.session.add_all(
+            Movie(title=f"Movie {index}",
+                  poster_url=f"{base_url}{index - 1 if shared_every and index % shared_every == 0 else index}.jpg")
+            for index in range(1, args.movies + 1)
+        )
+        database.session.commit()
+
+        # The stub renders its images up front, so their generation is not measured
+        for number in range(args.movies + 1):
+            make_poster(number, args.width, args.width * 3 // 2)
+
+        started = time.perf_counter()
+        summary = cache_posters(workers=args.workers)
+        elapsed = time.perf_counter() - started
+        print(f"first run: {summary['movies'] / elapsed:.1f} movies/s ({elapsed:.1f}s, {args.workers} workers): "
+              f"{summary['cached']} cached, {summary['failed']} failed, {summary['downloads']} distinct posters, "
+              f"{summary['requests']} requests, {summary['retries']} retries")
+
+        original = summary['bytes'] / max(1, summary['downloads'] - summary['failed'])
+        print(f"original posters: {original / 1024:.0f} KB on average ({args.width}px wide)")
+        sizes = average_sizes(app.config['POSTER_CACHE_DIR'])
+        for variant, width in POSTER_VARIANTS.items():
+            print(f"  {variant:6} ({width}px): " + ', '.join(
+                f"{extension} {sizes[variant, extension] / 1024:.0f} KB ({original / sizes[variant, extension]:.0f}x smaller)"
+                for extension in POSTER_FORMATS if (variant, extension) in sizes))
+
+        summary = cache_posters(workers=args.workers)
+        print(f"second run: {summary['movies']} movies due, {summary['requests']} requests")
+
+    server.shutdown()
@@ -0,0 +1,108 @@
+"""
+Local stand-in for the poster image hosts, used to measure and try the poster cache without
+downloading real posters. Every /<number>.jpg is a deterministic full-size JPEG; latency,
+transient errors and missing images can be simulated.
+
+    python benchmarks/poster_stub_server.py --port 8766 --width 1000 --latency 0.1 --error-rate 0.05
+    # then point Movie.poster_url at http://127.0.0.1:8766/<number>.jpg and run database/cache_posters.py
+"""
+import io
+import time
+import random
+import argparse
+import threading
+from functools import lru_cache
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from PIL import Image, ImageDraw, ImageFilter
+
+
+@lru_cache(maxsize=1024)
+def make_poster(number, width, height):
+    # A gradient, blurred noise (so it compresses like a photo, not like a flat image) and a few shapes
+    rng = random.Random(number)
+    gradient = Image.linear_gradient('L').rotate(rng.randrange(360)).resize((width, height))
+    noise = Image.effect_noise((width, height), 60).filter(ImageFilter.GaussianBlur(1.5))
+    tint = Image.new('L', (width, height), rng.randrange(256))
+    image = Image.merge('RGB', (gradient, noise, tint))
+
+    draw = ImageDraw.Draw(image)
+    for _ in range(6):
+        x, y = rng.randrange(width), rng.randrange(height)
+        radius = rng.randrange(width // 10, width // 3)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius),
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+class StubPosterHandler(BaseHTTPRequestHandler):
+    # Settings are class attributes, configured by make_server()
+    width = 1000
+    latency = 0.05
+    error_rate = 0.0
+    missing_rate = 0.0
+    served = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with StubPosterHandler.lock:
+            StubPosterHandler.served += 1
+
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+
+        name = self.path.strip('/').split('?')[0]
+        if not name.endswith('.jpg') or not name[:-4].isdigit():
+            return self.send_body(404, 'text/plain', b'Not found')
+        number = int(name[:-4])
+
+        # Missing images are the same on every request, errors are transient
+        if random.Random(number).random() < self.missing_rate:
+            return self.send_body(404, 'text/plain', b'Not found')
+        if random.random() < self.error_rate:
+            return self.send_body(503, 'text/plain', b'Service unavailable')
+
+        # Posters are 2:3
+        self.send_body(200, 'image/jpeg', make_poster(number, self.width, self.width * 3 // 2))
+
+
+def make_server(port=0, width=1000, latency=0.05, error_rate=0.0, missing_rate=0.0):
+    # Returns a started server running on a daemon thread (port 0 picks a free port)
+    StubPosterHandler.width = width
+    StubPosterHandler.latency = latency
+    StubPosterHandler.error_rate = error_rate
+    StubPosterHandler.missing_rate = missing_rate
+    StubPosterHandler.served = 0
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubPosterHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub poster image server')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--width', type=int, default=1000, help='width of the served posters in pixels')
+    parser.add_argument('--latency', type=float, default=0.05, help='average response time in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of 503 answers')
+    parser.add_argument('--missing-rate', type=float, default=0.0, help='share of images answering 404')
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.width, args.latency, args.error_rate, args.missing_rate)
+    print(f"Stub poster server listening on http://127.0.0.1:{server.server_address[1]}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
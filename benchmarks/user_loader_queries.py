@@ -0,0 +1,80 @@
+"""
+Counts the SQL queries issued per authenticated request with the user cache
+disabled (USER_CACHE_TTL=0, the old User.query.get behaviour) and enabled.
+
+Runs against a throwaway SQLite database by default:
+    python benchmarks/user_loader_queries.py
+"""
+import os
+import sys
+import tempfile
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+# Use a temporary SQLite database unless one is given explicitly
+database_file = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{database_file}")
+os.environ.setdefault('APP_SECRET_KEY', 'benchmark-secret')
+
+from sqlalchemy import event
+from app import app, database
+from app.models import User, Movie
+
+# Pages requested by a logged-in user on every run
+BENCHMARK_PATHS = ['/search_autocomplete?q=movie', '/watchlist', '/my_ratings', '/catalog', '/movie/1']
+REQUESTS_PER_PATH = 20
+
+
+def seed_database():
+    # Create one confirmed user and a handful of movies
+    with app.app_context():
+        database.create_all()
+        if not User.query.filter_by(email='bench@parallax.com').first():
+            user = User(username='bench', email='bench@parallax.com', is_confirmed=True)
+            user.set_password('bench123')
+            database.session.add(user)
+            for i in range(20):
+                database.session.add(Movie(title=f"Benchmark Movie {i}", description='Benchmark', release_year=2000 + i))
+            database.session.commit()
+
+
+def count_queries(ttl):
+    app.config['USER_CACHE_TTL'] = ttl
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'bench@parallax.com', 'password': 'bench123'})
+
+    queries = []
+    with app.app_context():
+        engine = database.engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    results = {}
+    try:
+        for path in BENCHMARK_PATHS:
+            queries.clear()
+            for _ in range(REQUESTS_PER_PATH):
+                client.get(path)
+            results[path] = len(queries) / REQUESTS_PER_PATH
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    return results
+
+
+if __name__ == '__main__':
+    seed_database()
+
+    before = count_queries(ttl=0)
+    after = count_queries(ttl=60)
+
+    print(f"{'Path':<32} {'Queries/request (no cache)':>28} {'Queries/request (cache)':>26}")
+    for path in BENCHMARK_PATHS:
+        print(f"{path:<32} {before[path]:>28.2f} {after[path]:>26.2f}")
@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+import argparse
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from dotenv import load_dotenv
+from app import app, database
+from app.utility_modules.poster_cache import cache_posters, prune_unused_posters, poster_directory
+
+# Load environment variables from the .env file
+load_dotenv()
+
+
+def run(limit, workers, prune):
+    print("--- Caching Posters ---")
+
+    with app.app_context():
+        # Creates the poster_image table on databases that predate it
+        database.create_all()
+
+        started = time.time()
+        summary = cache_posters(limit=limit, workers=workers)
+        elapsed = time.time() - started
+        print(f"{summary['movies']} movies due ({summary['downloads']} distinct posters): {summary['cached']} cached, "
+              f"{summary['failed']} failed in {elapsed:.1f}s ({summary['requests']} requests, {summary['retries']} retries, "
+              f"{summary['bytes'] / 1024 / 1024:.1f} MB downloaded) into {poster_directory()}")
+        for error in summary['errors']:
+            print(f"   -> {error}")
+
+        if prune:
+            print(f"Deleted {prune_unused_posters()} unused poster files.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Download the movie posters once and store their resized variants locally')
+    parser.add_argument('--limit', type=int, help='movies handled in this run (default: every movie due)')
+    parser.add_argument('--workers', type=int, help='download threads (default: POSTER_WORKERS)')
+    parser.add_argument('--prune', action='store_true', help='delete the files of posters no movie uses anymore')
+    args = parser.parse_args()
+
+    run(args.limit, args.workers, args.prune)
@@ -0,0 +1,36 @@
+import os
+import sys
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from dotenv import load_dotenv
+from app import app, database
+
+# Load environment variables from the .env file
+load_dotenv()
+
+
+def create_missing_indexes():
+    """
+    create_all() only adds indexes together with new tables, so indexes declared later
+    on existing tables (e.g. the admin filter indexes) are created here, skipping existing ones.
+    """
+    print("--- Creating Missing Indexes ---")
+
+    with app.app_context():
+        database.create_all()
+        engine = database.engine
+
+        for table in database.metadata.sorted_tables:
+            for index in table.indexes:
+                print(f"Checking {index.name} on {table.name}...")
+                index.create(engine, checkfirst=True)
+
+    print("Done creating indexes.")
+
+
+if __name__ == '__main__':
+    create_missing_indexes()
@@ -0,0 +1,84 @@
+import os
+import sys
+import csv
+import time
+import argparse
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from app import app
+from app.utility_modules.csv_files import read_csv_rows, atomic_write
+from app.utility_modules.near_duplicates import NearDuplicateIndex, canonical_title
+
+# Default input files (relative to this directory)
+DEFAULT_FILES = ['csv/movies.csv', 'csv/movies_to_add.csv', 'csv/blacklist.csv']
+
+REPORT_FIELDNAMES = ['cluster', 'action', 'similarity', 'file', 'line', 'title', 'release_year', 'canonical_title']
+
+
+def find_near_duplicates(paths, output_path, threshold, year_tolerance):
+    """
+    Streams the CSV files into a MinHash/LSH index and writes the clusters of near-duplicate
+    movies to a CSV report for review. Nothing is changed in the input files.
+    Only the signatures are kept in memory; the rows of the report are read again in a second pass.
+    """
+    index = NearDuplicateIndex(threshold=threshold, year_tolerance=year_tolerance)
+    started = time.time()
+
+    for path in paths:
+        for row in read_csv_rows(path):
+            index.add(row['title'], row.get('release_year'))
+    print(f"Indexed {len(index.canonicals)} rows from {len(paths)} files in {time.time() - started:.1f}s.")
+
+    clusters, scores = index.find()
+    print(f"Found {len(clusters)} clusters of near-duplicates ({len(scores)} similar pairs) in {time.time() - started:.1f}s.")
+
+    # Best similarity of each clustered row with another member of its cluster
+    best_score = {}
+    for (first, second), score in scores.items():
+        best_score[first] = max(best_score.get(first, 0), score)
+        best_score[second] = max(best_score.get(second, 0), score)
+
+    cluster_of = {member: number for number, members in enumerate(clusters, start=1) for member in members}
+    first_member = {members[0] for members in clusters}
+
+    # Second pass: collect the reported rows (line numbers count the header as line 1)
+    report_rows = []
+    position = 0
+    for path in paths:
+        for line, row in enumerate(read_csv_rows(path), start=2):
+            if position in cluster_of:
+                report_rows.append({
+                    'cluster': cluster_of[position],
+                    # The first row of a cluster is the one to keep, the others are to be reviewed
+                    'action': 'keep' if position in first_member else 'review',
+                    'similarity': f"{best_score[position]:.2f}",
+                    'file': os.path.relpath(path, current_dir),
+                    'line': line,
+                    'title': row['title'],
+                    'release_year': row.get('release_year'),
+                    'canonical_title': canonical_title(row['title'])
+                })
+            position += 1
+
+    report_rows.sort(key=lambda report_row: (report_row['cluster'], report_row['action'] != 'keep'))
+    with atomic_write(output_path) as report_file:
+        writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDNAMES, delimiter=';')
+        writer.writeheader()
+        writer.writerows(report_rows)
+    print(f"Report written to {output_path} ({len(report_rows)} rows).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Report near-duplicate movies in the CSV files')
+    parser.add_argument('files', nargs='*', help=f"CSV files to scan (default: {', '.join(DEFAULT_FILES)})")
+    parser.add_argument('--output', default=os.path.join(app.instance_path, 'near_duplicates.csv'))
+    parser.add_argument('--threshold', type=float, default=0.7, help='minimum title similarity (Jaccard of 3-grams)')
+    parser.add_argument('--year-tolerance', type=int, default=1, help='maximum release year difference')
+    args = parser.parse_args()
+
+    paths = args.files or [os.path.join(current_dir, name) for name in DEFAULT_FILES]
+    find_near_duplicates([path for path in paths if os.path.exists(path)], args.output, args.threshold, args.year_tolerance)
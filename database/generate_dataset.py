@@ -0,0 +1,303 @@
+"""
+Generates a production-sized synthetic dataset: users, movies with genres and
+power-law distributed ratings, seen lists and watchlists. Popular movies and
+active users get most of the rows, like on the real site.
+
+Rows are bulk loaded with COPY on PostgreSQL and batched executemany on SQLite.
+Existing data is kept, and new ids continue after the current maximum. The same
+--seed produces the same dataset.
+
+    python database/generate_dataset.py --users 100000 --movies 20000 --ratings 10000000 --seed 42
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from dotenv import load_dotenv
+from sqlalchemy import func, select
+from werkzeug.security import generate_password_hash
+from app import app, database
+from app.models import User, Movie, Genre, Rating, SeenList, ToWatchList, movie_genre_association
+from app.utility_modules.page_cache import bump_catalog_version
+from app.utility_modules.movie_features import refresh_movie_features
+from app.utility_modules.genre_mask import assign_genre_bits, refresh_genre_masks
+from app.utility_modules.bulk_loader import get_bulk_loader
+
+# Load environment variables from the .env file
+load_dotenv()
+
+# Genres in decreasing order of frequency
+GENRES = ('Drama', 'Comedy', 'Action', 'Thriller', 'Romance', 'Crime', 'Adventure', 'Horror', 'Sci-Fi',
+          'Mystery', 'Fantasy', 'Animation', 'Family', 'Biography', 'History', 'War', 'Music', 'Western')
+TITLE_ADJECTIVES = ('Silent', 'Last', 'Broken', 'Golden', 'Hidden', 'Dark', 'Lost', 'Wild', 'Crimson', 'Distant',
+                    'Frozen', 'Burning', 'Secret', 'Endless', 'Fallen', 'Midnight', 'Electric', 'Quiet')
+TITLE_NOUNS = ('River', 'Empire', 'Garden', 'Stranger', 'Horizon', 'Kingdom', 'Promise', 'Machine', 'Summer',
+               'Shadow', 'Harbor', 'Symphony', 'Frontier', 'Letter', 'Island', 'Voyage', 'Witness', 'Storm')
+RATED_VALUES = ('G', 'PG', 'PG-13', 'R')
+
+# Every generated user can log in with this password (hashed once, hashing per user would dominate the run)
+GENERATED_PASSWORD = 'password123'
+
+
+# ==========================================================================================
+# Generation
+# ==========================================================================================
+
+def next_id(model):
+    # Generated ids continue after the existing rows
+    return (database.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def timestamps(rng, count, days):
+    # Random moments of the last `days` days, formatted for both COPY and SQLite ('YYYY-MM-DD HH:MM:SS')
+    now = np.datetime64(datetime.utcnow().replace(microsecond=0), 's')
+    moments = now - rng.integers(0, days * 86400, size=count).astype('timedelta64[s]')
+    return np.char.replace(np.datetime_as_string(moments, unit='s'), 'T', ' ').tolist()
+
+
+def ensure_genres():
+    # Returns {name: id}, creating the missing genres
+    existing = {genre.name: genre.id for genre in Genre.query.all()}
+    for name in GENRES:
+        if name not in existing:
+            genre = Genre(name=name)
+            database.session.add(genre)
+            database.session.flush()
+            existing[name] = genre.id
+    database.session.commit()
+    return existing
+
+
+def generate_movies(rng, loader, count, genre_ids, batch_size):
+    """Inserts `count` movies with 1-3 genres each (frequent genres first) and returns their ids."""
+    first_id = next_id(Movie)
+    ids = np.arange(first_id, first_id + count)
+
+    years = rng.integers(1950, 2025, size=count)
+    quality = np.clip(rng.normal(6.4, 1.1, size=count), 1.5, 9.6)
+    genre_weights = 1 / np.arange(1, len(GENRES) + 1)
+    genre_weights /= genre_weights.sum()
+    genre_list = [genre_ids[name] for name in GENRES]
+
+    movie_columns = ('id', 'title', 'description', 'release_year', 'release_date', 'imdb_rating',
+                     'runtime_minutes', 'meta_score', 'imdb_votes', 'box_office', 'rated')
+
+    for start in range(0, count, batch_size):
+        end = min(start + batch_size, count)
+        movies = []
+        associations = []
+
+        for index in range(start, end):
+            title = f"The {TITLE_ADJECTIVES[rng.integers(len(TITLE_ADJECTIVES))]} {TITLE_NOUNS[rng.integers(len(TITLE_NOUNS))]}"
+            movies.append((
+                int(ids[index]), title, f"A synthetic {title.lower()} story generated for scale tests.",
+                int(years[index]), f"{years[index]}-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}",
+                round(float(quality[index]), 1), int(rng.integers(80, 180)), int(np.clip(quality[index] * 10 + rng.normal(0, 8), 10, 100)),
+                int(rng.pareto(1.2) * 5000), int(rng.pareto(1.5) * 10_000_000), RATED_VALUES[rng.integers(len(RATED_VALUES))]
+            ))
+
+            chosen = rng.choice(len(genre_list), size=rng.integers(1, 4), replace=False, p=genre_weights)
+            associations.extend((int(ids[index]), genre_list[genre]) for genre in chosen)
+
+        loader.load(Movie.__table__.name, movie_columns, movies)
+        loader.load(movie_genre_association.name, ('movie_id', 'genre_id'), associations)
+
+    return ids
+
+
+def generate_users(loader, count, batch_size):
+    """Inserts `count` confirmed users (gen<id>@example.com) and returns their ids."""
+    first_id = next_id(User)
+    password_hash = generate_password_hash(GENERATED_PASSWORD)
+    confirmed_on = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    columns = ('id', 'username', 'email', 'password', 'is_confirmed', 'confirmed_on', 'is_admin')
+
+    for start in range(first_id, first_id + count, batch_size):
+        end = min(start + batch_size, first_id + count)
+        loader.load(User.__table__.name, columns, [
+            (user_id, f"gen{user_id}", f"gen{user_id}@example.com", password_hash, True, confirmed_on, False)
+            for user_id in range(start, end)
+        ])
+
+    return np.arange(first_id, first_id + count)
+
+
+def activity_counts(user_count, total, alpha, cap):
+    """
+    Splits `total` rows over the users following a power law (Zipf weights of a shuffled
+    rank), never giving one user more than `cap`; rows above the caps go to the other users.
+    """
+    weights = 1 / np.arange(1, user_count + 1) ** alpha
+    counts = np.zeros(user_count, dtype=np.int64)
+
+    for _ in range(20):
+        remaining = total - counts.sum()
+        open_users = counts < cap
+        if remaining <= 0 or not open_users.any():
+            break
+        share = weights * open_users
+        counts = np.minimum(counts + np.floor(remaining * share / share.sum()).astype(np.int64), cap)
+
+    return counts
+
+
+def sample_distinct(rng, cdf, count):
+    # `count` distinct movie indexes drawn by popularity (inverse CDF), topped up uniformly if the tail runs dry
+    chosen = np.unique(np.searchsorted(cdf, rng.random(int(count * 1.3) + 8), side='right'))
+    for _ in range(10):
+        if len(chosen) >= count:
+            break
+        chosen = np.unique(np.concatenate([chosen, np.searchsorted(cdf, rng.random(count), side='right')]))
+    if len(chosen) < count:
+        missing = np.setdiff1d(np.arange(len(cdf)), chosen)
+        chosen = np.concatenate([chosen, rng.choice(missing, size=count - len(chosen), replace=False)])
+
+    chosen = np.minimum(chosen, len(cdf) - 1)
+    rng.shuffle(chosen)
+    return chosen[:count]
+
+
+def generate_activity(rng, loader, user_ids, args):
+    """
+    Ratings, seen entries and watchlist entries for every user. A user's movies are drawn
+    without repetition, so the unique (user, movie) constraints always hold. Every rated movie
+    is also seen (the app keeps this invariant), and watchlist movies are never seen.
+    """
+    movie_rows = database.session.execute(select(Movie.id, Movie.imdb_rating)).all()
+    movie_ids = np.array([row[0] for row in movie_rows])
+    quality = np.array([row[1] if row[1] is not None else 6.0 for row in movie_rows], dtype=float)
+
+    # Popularity: Zipf weights over a random ranking of the catalog
+    popularity = 1 / (rng.permutation(len(movie_ids)) + 1) ** args.popularity_alpha
+    cdf = np.cumsum(popularity / popularity.sum())
+
+    cap = min(args.max_per_user, len(movie_ids) // 2)
+    ratings_per_user = rng.permutation(activity_counts(len(user_ids), args.ratings, args.activity_alpha, cap))
+
+    totals = {'ratings': 0, 'seen': 0, 'watchlist': 0}
+    started = time.time()
+
+    for start in range(0, len(user_ids), args.chunk_users):
+        ratings, seen, watchlist = [], [], []
+
+        for user_id, rated_count in zip(user_ids[start:start + args.chunk_users], ratings_per_user[start:start + args.chunk_users]):
+            user_id = int(user_id)
+            seen_count = int(rated_count * args.seen_ratio)
+            watch_count = int(rated_count * args.watchlist_ratio) + int(rng.integers(0, 3))
+            total = min(int(rated_count) + seen_count + watch_count, len(movie_ids))
+            if total == 0:
+                continue
+
+            picked = sample_distinct(rng, cdf, total)
+            rated, seen_only, to_watch = np.split(picked, [min(rated_count, total), min(rated_count + seen_count, total)])
+
+            scores = np.clip(np.rint(rng.normal(quality[rated], 1.6)), 1, 10).astype(int).tolist()
+            rated_at = timestamps(rng, len(rated), args.days)
+            ratings.extend(zip([user_id] * len(rated), movie_ids[rated].tolist(), scores, rated_at))
+
+            seen_movies = np.concatenate([rated, seen_only])
+            seen.extend(zip([user_id] * len(seen_movies), movie_ids[seen_movies].tolist(), rated_at + timestamps(rng, len(seen_only), args.days)))
+            watchlist.extend(zip([user_id] * len(to_watch), movie_ids[to_watch].tolist(), timestamps(rng, len(to_watch), args.days)))
+
+        loader.load(Rating.__table__.name, ('user_id', 'movie_id', 'score', 'timestamp'), ratings)
+        loader.load(SeenList.__table__.name, ('user_id', 'movie_id', 'date_added'), seen)
+        loader.load(ToWatchList.__table__.name, ('user_id', 'movie_id', 'date_added'), watchlist)
+
+        totals['ratings'] += len(ratings)
+        totals['seen'] += len(seen)
+        totals['watchlist'] += len(watchlist)
+        elapsed = time.time() - started
+        print(f"   users {min(start + args.chunk_users, len(user_ids))}/{len(user_ids)}: "
+              f"{totals['ratings']} ratings, {totals['seen']} seen, {totals['watchlist']} watchlist "
+              f"({totals['ratings'] / max(elapsed, 0.001):,.0f} ratings/s)")
+
+    return totals
+
+
+# ==========================================================================================
+# Entry point
+# ==========================================================================================
+
+def reset_sequences(connection, models):
+    # Explicit ids do not advance PostgreSQL sequences; move them past the loaded rows
+    cursor = connection.cursor()
+    for model in models:
+        table = model.__table__.name
+        cursor.execute(f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), (SELECT COALESCE(MAX(id), 1) FROM \"{table}\"))")
+
+
+def generate_dataset(args):
+    print(f"--- Generating {args.users} users, {args.movies} movies and ~{args.ratings} ratings (seed {args.seed}) ---")
+    rng = np.random.default_rng(args.seed)
+
+    with app.app_context():
+        database.create_all()
+        genre_ids = ensure_genres()
+
+        connection = database.engine.raw_connection()
+        is_postgresql = database.engine.dialect.name == 'postgresql'
+        loader = get_bulk_loader(connection, database.engine.dialect.name)
+        if database.engine.dialect.name == 'sqlite':
+            # A crash leaves a throwaway test database behind anyway, so durability is traded for speed
+            connection.cursor().execute('PRAGMA synchronous = OFF')
+
+        started = time.time()
+        try:
+            generate_movies(rng, loader, args.movies, genre_ids, args.batch_size)
+            # Committed before the next id lookups, which use the session's own connection
+            # (on SQLite a large pending insert would keep them locked out)
+            connection.commit()
+            print(f"Movies loaded ({time.time() - started:.1f}s).")
+            user_ids = generate_users(loader, args.users, args.batch_size)
+            print(f"Users loaded ({time.time() - started:.1f}s).")
+            connection.commit()
+
+            totals = generate_activity(rng, loader, user_ids, args)
+
+            if is_postgresql:
+                reset_sequences(connection, (User, Movie))
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+        # Genre masks and recommender features of the new movies, then fresh planner statistics
+        # (also used by the admin row estimates)
+        assign_genre_bits(database.session.connection())
+        refresh_genre_masks(database.session.connection())
+        refresh_movie_features(database.session.connection())
+        database.session.commit()
+        database.session.execute(database.text('ANALYZE'))
+        database.session.commit()
+        bump_catalog_version()
+
+    print(f"Done in {time.time() - started:.1f}s: {totals['ratings']} ratings, {totals['seen']} seen entries, "
+          f"{totals['watchlist']} watchlist entries. Users log in as gen<id>@example.com / {GENERATED_PASSWORD}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a large synthetic Parallax dataset')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--movies', type=int, default=5000)
+    parser.add_argument('--ratings', type=int, default=1000000, help='target number of ratings')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--seen-ratio', type=float, default=0.3, help='extra seen (unrated) entries per rating')
+    parser.add_argument('--watchlist-ratio', type=float, default=0.2, help='watchlist entries per rating')
+    parser.add_argument('--popularity-alpha', type=float, default=1.0, help='Zipf exponent of movie popularity')
+    parser.add_argument('--activity-alpha', type=float, default=0.8, help='Zipf exponent of user activity')
+    parser.add_argument('--max-per-user', type=int, default=5000, help='ratings cap of the most active users')
+    parser.add_argument('--days', type=int, default=3 * 365, help='activity spread over this many past days')
+    parser.add_argument('--batch-size', type=int, default=50000, help='rows per COPY/executemany batch for movies and users')
+    parser.add_argument('--chunk-users', type=int, default=2000, help='users whose activity is loaded per batch')
+    generate_dataset(parser.parse_args())
@@ -0,0 +1,302 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from itertools import islice
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from dotenv import load_dotenv
+from app import app, database
+from sqlalchemy import select
+from app.models import Movie
+from app.utility_modules.catalog_loader import load_catalog
+from app.utility_modules.page_cache import bump_catalog_version
+from app.utility_modules.movie_features import refresh_movie_features
+from app.utility_modules.omdb_client import OMDbQuotaExceeded, fetch_all
+from app.utility_modules.csv_files import (MOVIE_FIELDNAMES, movie_key, movie_from_row, read_fieldnames, read_csv_rows,
+                                           read_keys, write_csv_rows, write_json, dedupe)
+from update_metadata import get_omdb_client, get_response_cache, metadata_values, write_batch
+
+# Load environment variables from the .env file
+load_dotenv()
+
+# Define file paths
+MOVIES_CSV_PATH = os.path.join(current_dir, 'csv', 'movies.csv')
+NEW_MOVIES_CSV_PATH = os.path.join(current_dir, 'csv', 'movies_to_add.csv')
+BLACKLIST_CSV_PATH = os.path.join(current_dir, 'csv', 'blacklist.csv')
+
+# Rows enriched between two checkpoints
+CHUNK_SIZE = 100
+
+# Staged ingestion of database/csv/movies_to_add.csv:
+#
+#   snapshot  copy the source file into the work directory (rows added meanwhile wait for the next run)
+#   filter    drop rows already in movies.csv or repeated in the file, and blacklisted rows
+#   enrich    look the rows up on OMDb (through the response cache); rows without poster are rejected
+#   load      merge the kept rows into the database and apply their metadata
+#   publish   append kept rows to movies.csv and rejected rows to blacklist.csv, consume movies_to_add.csv
+#
+# Rows stream from one stage to the next through CSV files in instance/ingest/. Every file is
+# written to a temporary file and renamed, and checkpoint.json records each finished stage
+# (and the enrichment progress, chunk by chunk), so an interrupted run resumes where it stopped.
+# Repeating a stage is harmless: the database load matches movies on their natural key
+# and publishing skips rows the target files already contain.
+
+
+class Pipeline:
+    """One ingestion run; its state (finished stages, options, counts) is the checkpoint file."""
+
+    def __init__(self, work_dir, enrich=True, load=True, budget=None):
+        self.work_dir = work_dir
+        self.checkpoint_path = os.path.join(work_dir, 'checkpoint.json')
+        self.state = {'stages_done': [], 'options': {'enrich': enrich, 'load': load, 'budget': budget},
+                      'counts': {}, 'enriched_rows': 0, 'chunks': 0, 'started_at': time.time()}
+
+    def path(self, name):
+        return os.path.join(self.work_dir, name)
+
+    def resume(self):
+        # Loads the checkpoint of an interrupted run; returns False if there is none
+        if not os.path.exists(self.checkpoint_path):
+            return False
+        with open(self.checkpoint_path, encoding='utf-8') as checkpoint_file:
+            self.state = json.load(checkpoint_file)
+        return True
+
+    def save(self):
+        write_json(self.checkpoint_path, self.state)
+
+    def done(self, stage, **counts):
+        self.state['stages_done'].append(stage)
+        self.state['counts'].update(counts)
+        self.save()
+
+    def chunk_files(self, kind):
+        # Enrichment output in chunk order ('kept' or 'rejected'); without enrichment every accepted row is kept
+        if not self.state['options']['enrich']:
+            return [self.path('accepted.csv')] if kind == 'kept' else []
+        return [self.path(f"{kind}-{index:05d}.csv") for index in range(self.state['chunks'])]
+
+    def read_chunks(self, kind):
+        for chunk_path in self.chunk_files(kind):
+            yield from read_csv_rows(chunk_path)
+
+    # --- Stages -------------------------------------------------------------------------------
+
+    def snapshot(self):
+        fieldnames = read_fieldnames(NEW_MOVIES_CSV_PATH) or MOVIE_FIELDNAMES
+        self.state['fieldnames'] = fieldnames
+        count = write_csv_rows(self.path('input.csv'), fieldnames, read_csv_rows(NEW_MOVIES_CSV_PATH, missing_ok=True))
+        print(f"Snapshot: {count} rows in {os.path.basename(NEW_MOVIES_CSV_PATH)}.")
+        self.done('snapshot', input=count)
+
+    def filter(self):
+        counts = {}
+        existing = read_keys(MOVIES_CSV_PATH)
+        blacklist = read_keys(BLACKLIST_CSV_PATH)
+        print(f"Filter: {len(existing)} movies in {os.path.basename(MOVIES_CSV_PATH)}, {len(blacklist)} blacklisted.")
+
+        def not_blacklisted(rows):
+            for row in rows:
+                if movie_key(row) in blacklist:
+                    counts['blacklisted'] = counts.get('blacklisted', 0) + 1
+                    continue
+                yield row
+
+        accepted = write_csv_rows(self.path('accepted.csv'), self.state['fieldnames'],
+                                  not_blacklisted(dedupe(read_csv_rows(self.path('input.csv')), existing, counts)))
+        print(f"   -> {accepted} accepted, {counts.get('duplicates', 0)} duplicates, {counts.get('blacklisted', 0)} blacklisted.")
+        self.done('filter', accepted=accepted, duplicates=counts.get('duplicates', 0), blacklisted=counts.get('blacklisted', 0))
+
+    def enrich(self):
+        if not self.state['options']['enrich']:
+            self.done('enrich')
+            return True
+
+        cache = get_response_cache()
+        client = get_omdb_client()
+        if client is None:
+            print("Enrichment needs an OMDb API key (or run with --skip-enrichment).")
+            return False
+
+        budget = self.state['options']['budget']
+        budget = app.config['OMDB_DAILY_REQUEST_BUDGET'] if budget is None else budget
+        workers = app.config['OMDB_WORKERS']
+
+        # Skip the rows enriched before the interruption
+        rows = islice(read_csv_rows(self.path('accepted.csv')), self.state['enriched_rows'], None)
+        try:
+            while True:
+                chunk = list(islice(rows, CHUNK_SIZE))
+                if not chunk:
+                    break
+
+                # Rows with a fresh cached answer cost no request
+                answers = {}
+                to_fetch = []
+                for index, row in enumerate(chunk):
+                    lookup = cache.get(row['title'], row['release_year'])
+                    if cache.is_fresh(lookup):
+                        answers[index] = lookup.as_metadata()
+                    else:
+                        to_fetch.append((index, row['title'], row['release_year']))
+
+                # With less budget left than lookups, the chunk is cut before the first row that cannot
+                # be looked up today: the rows before it are enriched and checkpointed, the rest waits
+                remaining = max(0, budget - cache.requests_used_today())
+                budget_spent = len(to_fetch) > remaining
+                if budget_spent:
+                    chunk = chunk[:to_fetch[remaining][0]]
+                    to_fetch = to_fetch[:remaining]
+                    if not chunk:
+                        print("Daily OMDb request budget spent; run again tomorrow to resume.")
+                        return False
+
+                requests_before = client.stats['requests']
+                try:
+                    for index, data, error in fetch_all(client, to_fetch, workers):
+                        if error:
+                            # Transient failure: keep the row, update_metadata.py completes it later
+                            print(f"   {chunk[index]['title']}: lookup failed ({error}), kept without metadata.")
+                            continue
+                        cache.store(chunk[index]['title'], chunk[index]['release_year'], data)
+                        answers[index] = data
+                finally:
+                    cache.record_requests(client.stats['requests'] - requests_before)
+
+                # A row is rejected only when OMDb answered and has no poster for it
+                kept = [row for index, row in enumerate(chunk) if index not in answers or (answers[index] or {}).get('poster')]
+                rejected = [row for index, row in enumerate(chunk) if index in answers and not (answers[index] or {}).get('poster')]
+
+                chunk_index = self.state['chunks']
+                write_csv_rows(self.path(f"kept-{chunk_index:05d}.csv"), self.state['fieldnames'], kept)
+                write_csv_rows(self.path(f"rejected-{chunk_index:05d}.csv"), self.state['fieldnames'], rejected)
+                self.state['chunks'] += 1
+                self.state['enriched_rows'] += len(chunk)
+                self.save()
+                print(f"Enrich: {self.state['enriched_rows']}/{self.state['counts']['accepted']} rows "
+                      f"({len(to_fetch)} OMDb lookups, {len(rejected)} rejected in this chunk).")
+                if budget_spent:
+                    print("Daily OMDb request budget spent; run again tomorrow to resume.")
+                    return False
+        except OMDbQuotaExceeded as e:
+            print(f"❌ OMDb quota reached ({e}); run again later to resume.")
+            return False
+
+        self.done('enrich')
+        return True
+
+    def load(self):
+        if not self.state['options']['load']:
+            self.done('load')
+            return
+
+        with app.app_context():
+            report = load_catalog(movie_from_row(row) for row in self.read_chunks('kept'))
+            print(f"Load: {report['inserted']} movies inserted, {report['updated']} updated, {report['unchanged']} unchanged.")
+
+            # Apply the metadata found during enrichment (from the cache, no request) to the kept movies without poster
+            updated = 0
+            if self.state['options']['enrich']:
+                cache = get_response_cache()
+                kept_keys = {movie_key(row) for row in self.read_chunks('kept')}
+                updates = []
+                for movie_id, title, year in database.session.execute(
+                    select(Movie.id, Movie.title, Movie.release_year).where((Movie.poster_url == None) | (Movie.poster_url == ''))
+                ):
+                    if movie_key({'title': title, 'release_year': year}) not in kept_keys:
+                        continue
+                    lookup = cache.get(title, year)
+                    data = lookup.as_metadata() if lookup else None
+                    if data and data.get('poster'):
+                        updates.append(metadata_values(movie_id, data))
+                write_batch(updates, [])
+                updated = len(updates)
+                if updated:
+                    refresh_movie_features(database.session.connection())
+                    database.session.commit()
+                print(f"   -> metadata applied to {updated} movies.")
+
+            if report['inserted'] or report['updated'] or updated:
+                bump_catalog_version()
+
+        self.done('load', inserted=report['inserted'], updated=report['updated'])
+
+    def publish(self):
+        fieldnames = read_fieldnames(MOVIES_CSV_PATH) or self.state['fieldnames']
+
+        # Existing rows first, then the new ones; rows already present (published before an interruption) are skipped
+        def merged(path, new_rows):
+            yield from read_csv_rows(path, missing_ok=True)
+            yield from dedupe(new_rows, read_keys(path))
+
+        total = write_csv_rows(MOVIES_CSV_PATH, fieldnames, merged(MOVIES_CSV_PATH, self.read_chunks('kept')))
+        print(f"Publish: {os.path.basename(MOVIES_CSV_PATH)} now has {total} movies.")
+
+        if self.chunk_files('rejected'):
+            blacklist_fieldnames = read_fieldnames(BLACKLIST_CSV_PATH) or fieldnames
+            total = write_csv_rows(BLACKLIST_CSV_PATH, blacklist_fieldnames, merged(BLACKLIST_CSV_PATH, self.read_chunks('rejected')))
+            print(f"   -> {os.path.basename(BLACKLIST_CSV_PATH)} now has {total} movies.")
+
+        # Consume the source file, keeping any row that was added to it during this run
+        processed = read_keys(self.path('input.csv'))
+        remaining = write_csv_rows(NEW_MOVIES_CSV_PATH, self.state['fieldnames'],
+                                   (row for row in read_csv_rows(NEW_MOVIES_CSV_PATH, missing_ok=True) if movie_key(row) not in processed))
+        print(f"   -> {os.path.basename(NEW_MOVIES_CSV_PATH)} consumed ({remaining} rows added during the run left for next time).")
+        self.done('publish')
+
+    def run(self):
+        stages = [('snapshot', self.snapshot), ('filter', self.filter), ('enrich', self.enrich),
+                  ('load', self.load), ('publish', self.publish)]
+        for name, stage in stages:
+            if name in self.state['stages_done']:
+                continue
+            if stage() is False:
+                print(f"Stopped during '{name}'; progress is saved in {self.checkpoint_path}.")
+                return False
+        return True
+
+
+def ingest_movies(enrich=True, load=True, budget=None, restart=False):
+    work_dir = os.path.join(app.instance_path, 'ingest')
+    if restart and os.path.isdir(work_dir):
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+
+    print("--- Ingesting New Movies ---\n")
+    pipeline = Pipeline(work_dir, enrich, load, budget)
+    if pipeline.resume():
+        print(f"Resuming the run started {time.ctime(pipeline.state['started_at'])} "
+              f"(finished stages: {', '.join(pipeline.state['stages_done']) or 'none'}).")
+    else:
+        pipeline.save()
+
+    if not pipeline.run():
+        return
+
+    counts = pipeline.state['counts']
+    print("\n--- Summary ---")
+    print(f"Rows read: {counts.get('input', 0)} | Duplicates: {counts.get('duplicates', 0)} | "
+          f"Blacklisted: {counts.get('blacklisted', 0)} | Accepted: {counts.get('accepted', 0)}")
+    if pipeline.state['options']['load']:
+        print(f"Database: {counts.get('inserted', 0)} inserted, {counts.get('updated', 0)} updated.")
+
+    # The run is complete: the next one starts from a fresh snapshot
+    shutil.rmtree(work_dir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ingest database/csv/movies_to_add.csv (resumes an interrupted run)')
+    parser.add_argument('--skip-enrichment', action='store_true', help='do not look the movies up on OMDb')
+    parser.add_argument('--csv-only', action='store_true', help='only merge the CSV files (no OMDb lookups, no database load)')
+    parser.add_argument('--budget', type=int, help='daily OMDb request budget (default: OMDB_DAILY_REQUEST_BUDGET)')
+    parser.add_argument('--restart', action='store_true', help='discard an interrupted run and start over')
+    args = parser.parse_args()
+
+    ingest_movies(enrich=not (args.skip_enrichment or args.csv_only), load=not args.csv_only,
+                  budget=args.budget, restart=args.restart)
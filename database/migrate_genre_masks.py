@@ -0,0 +1,48 @@
+import os
+import sys
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from dotenv import load_dotenv
+from sqlalchemy import inspect, text
+from app import app, database
+from app.utility_modules.genre_mask import assign_genre_bits, refresh_genre_masks
+
+# Load environment variables from the .env file
+load_dotenv()
+
+
+def add_missing_columns(connection):
+    # create_all() does not add columns to existing tables, so they are added here (once)
+    inspector = inspect(connection)
+    movie_columns = {column['name'] for column in inspector.get_columns('movie')}
+    genre_columns = {column['name'] for column in inspector.get_columns('genre')}
+
+    if 'genre_mask' not in movie_columns:
+        connection.execute(text("ALTER TABLE movie ADD COLUMN genre_mask BIGINT NOT NULL DEFAULT 0"))
+        print("Added movie.genre_mask.")
+    if 'bit' not in genre_columns:
+        connection.execute(text("ALTER TABLE genre ADD COLUMN bit SMALLINT"))
+        # SQLite cannot add a UNIQUE column, so uniqueness comes from an index on both databases
+        connection.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ix_genre_bit ON genre (bit)"))
+        print("Added genre.bit.")
+
+
+def migrate_genre_masks():
+    print("--- Migrating Genre Masks ---")
+
+    with app.app_context():
+        with database.engine.begin() as connection:
+            add_missing_columns(connection)
+            assigned = assign_genre_bits(connection)
+            changed = refresh_genre_masks(connection)
+        print(f"Assigned bits to {assigned} genres, updated the masks of {changed} movies.")
+
+    print("Done migrating genre masks.")
+
+
+if __name__ == '__main__':
+    migrate_genre_masks()
@@ -0,0 +1,63 @@
+import os
+import sys
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from dotenv import load_dotenv
+from sqlalchemy import inspect, text, String
+from app import app, database
+from app.utility_modules.movie_features import refresh_movie_features
+
+# Load environment variables from the .env file
+load_dotenv()
+
+# A rating as OMDb writes it: digits with an optional decimal part
+RATING_PATTERN = r'^\s*[0-9]{1,2}(\.[0-9]+)?\s*$'
+
+
+def migrate_imdb_rating(connection):
+    """
+    Converts movie.imdb_rating from its original text form to a number. Values that are
+    not a rating ('N/A', empty strings) become NULL. Does nothing if the column is already numeric.
+    """
+    column = next(column for column in inspect(connection).get_columns('movie') if column['name'] == 'imdb_rating')
+    if not isinstance(column['type'], String):
+        print("movie.imdb_rating is already numeric.")
+        return
+
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            "ALTER TABLE movie ALTER COLUMN imdb_rating TYPE NUMERIC(3, 1) "
+            "USING CASE WHEN imdb_rating ~ :pattern THEN trim(imdb_rating)::numeric(3, 1) END"
+        ).bindparams(pattern=RATING_PATTERN))
+        print("movie.imdb_rating converted to NUMERIC(3, 1).")
+    else:
+        # SQLite cannot change a column type: the values are cleaned instead, so SQL arithmetic
+        # (movie_features) works on them; a database created from scratch gets the numeric column
+        result = connection.execute(text(
+            "UPDATE movie SET imdb_rating = NULL WHERE imdb_rating IS NOT NULL "
+            "AND (trim(imdb_rating) = '' OR trim(imdb_rating) GLOB '*[^0-9.]*')"
+        ))
+        print(f"Cleared {result.rowcount} non-numeric movie.imdb_rating values.")
+
+
+def migrate_movie_features():
+    print("--- Migrating Movie Features ---")
+
+    with app.app_context():
+        # Creates the movie_features table
+        database.create_all()
+
+        with database.engine.begin() as connection:
+            migrate_imdb_rating(connection)
+            count = refresh_movie_features(connection)
+        print(f"movie_features computed for {count} movies.")
+
+    print("Done migrating movie features.")
+
+
+if __name__ == '__main__':
+    migrate_movie_features()
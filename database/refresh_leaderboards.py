@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import argparse
+
+# Adjust the system path to include the parent directory so we can import the app module
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from dotenv import load_dotenv
+from app import app, database
+from app.utility_modules.leaderboards import refresh_leaderboards
+from app.utility_modules.cold_start import refresh_cold_start_lists
+
+# Load environment variables from the .env file
+load_dotenv()
+
+
+def refresh(full):
+    print(f"--- Refreshing Leaderboards{' (full rebuild)' if full else ''} ---")
+
+    with app.app_context():
+        # Creates the rollup tables on databases that predate them
+        database.create_all()
+
+        started = time.time()
+        summary = refresh_leaderboards(full=full)
+        if summary is None:
+            print("Another refresh is running, leaderboards left as they are.")
+        else:
+            print(f"Recounted ratings from {summary['since']}: {summary['buckets']} day buckets, "
+                  f"{summary['stale']} stale movies recounted, "
+                  f"{summary['movies']} movies updated in {time.time() - started:.2f}s.")
+
+        # The cold-start lists rank movies with the refreshed rating stats
+        started = time.time()
+        lists = refresh_cold_start_lists()
+        print(f"Cold-start recommendation lists rebuilt: {lists} lists in {time.time() - started:.2f}s.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Refresh the leaderboard rollup tables and the cold-start lists once')
+    parser.add_argument('--full', action='store_true', help='rebuild from every rating instead of the recent days')
+    args = parser.parse_args()
+
+    refresh(args.full)
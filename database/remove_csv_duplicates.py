@@ -1,13 +1,17 @@
 import os
-import csv
+import sys
 
 # Determine the directory where this script is located to handle file paths correctly
 current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
 
-def clean_csv_duplicates(filename, unique_column='title', delimiter=';'):
+from app.utility_modules.csv_files import read_fieldnames, read_csv_rows, write_csv_rows, dedupe
+
+def clean_csv_duplicates(filename):
     """
-    Scans a CSV file and removes rows that have duplicate values in a specified column.
-    The function retains the first instance found and discards any subsequent duplicates.
+    Scans a CSV file and removes rows that describe the same movie (same normalized title
+    and release year). The function retains the first instance found and discards any subsequent duplicates.
+    The file is streamed twice (count, then rewrite) and replaced atomically.
     """
     file_path = os.path.join(current_dir, filename)
     
@@ -17,54 +21,32 @@ def clean_csv_duplicates(filename, unique_column='title', delimiter=';'):
         return
 
     print(f"\n--- Processing {filename} ---")
-    
-    # Initialize lists and sets to track unique data and duplicates
-    unique_rows = []
-    seen_keys = set()
-    duplicates_count = 0
-    total_rows = 0
-    fieldnames = []
 
     try:
-        # Open the source CSV file for reading
-        with open(file_path, mode='r', encoding='utf-8') as csv_file:
-            reader = csv.DictReader(csv_file, delimiter=delimiter)
-            fieldnames = reader.fieldnames
-            
-            # Check if the file is empty or missing headers
-            if not fieldnames:
-                print(f"Error: {filename} is empty or has no header.")
-                return
-
-            # Confirm that the column used for identifying duplicates exists in the headers
-            if unique_column not in fieldnames:
-                print(f"Error: Column '{unique_column}' not found in {filename}.")
-                return
-
-            # Iterate through every row in the file to identify duplicates
-            for row in reader:
-                total_rows += 1
-                # Normalize the data in the unique column by trimming spaces and converting to lowercase
-                key = row[unique_column].strip().lower()
-                
-                # Check if this key has already been processed
-                if key in seen_keys:
-                    duplicates_count += 1
-                else:
-                    seen_keys.add(key)
-                    unique_rows.append(row)
-
-        # If duplicates were found overwrite the file with the cleaned list of unique rows
+        # Check if the file is empty or missing headers
+        fieldnames = read_fieldnames(file_path)
+        if not fieldnames:
+            print(f"Error: {filename} is empty or has no header.")
+            return
+
+        # Confirm that the column used for identifying duplicates exists in the headers
+        if 'title' not in fieldnames:
+            print(f"Error: Column 'title' not found in {filename}.")
+            return
+
+        # First pass: count the duplicates without keeping the rows in memory
+        counter = {}
+        total_rows = sum(1 for _ in dedupe(read_csv_rows(file_path), counter=counter))
+        duplicates_count = counter.get('duplicates', 0)
+
+        # If duplicates were found rewrite the file with the unique rows (temporary file renamed over the original)
         if duplicates_count > 0:
-            with open(file_path, mode='w', encoding='utf-8', newline='') as csv_file:
-                writer = csv.DictWriter(csv_file, fieldnames=fieldnames, delimiter=delimiter)
-                writer.writeheader()
-                writer.writerows(unique_rows)
+            unique_count = write_csv_rows(file_path, fieldnames, dedupe(read_csv_rows(file_path)))
             
             print(f"Cleaned {filename}.")
-            print(f"   - Total rows scanned: {total_rows}")
+            print(f"   - Total rows scanned: {total_rows + duplicates_count}")
             print(f"   - Duplicates removed: {duplicates_count}")
-            print(f"   - Unique rows remaining: {len(unique_rows)}")
+            print(f"   - Unique rows remaining: {unique_count}")
         else:
             print(f"No duplicates found in {filename}.")
 
@@ -73,7 +55,7 @@ def clean_csv_duplicates(filename, unique_column='title', delimiter=';'):
 
 if __name__ == "__main__":
     # Run the duplicate cleanup function on the main movies database file
-    clean_csv_duplicates('csv/movies.csv', unique_column='title')
+    clean_csv_duplicates('csv/movies.csv')
     
     # Run the duplicate cleanup function on the blacklist file
-    clean_csv_duplicates('csv/blacklist.csv', unique_column='title')
+    clean_csv_duplicates('csv/blacklist.csv')
@@ -1,8 +1,7 @@
 import os
 import sys
 import time
-import requests
-import csv
+import argparse
 
 # Adjust the system path to include the parent directory so we can import the app module
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -10,153 +9,247 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.append(parent_dir)
 
 from app import app, database
-from app.models import Movie
+from sqlalchemy import select, update, delete, union, func
+from app.models import Movie, Rating, SeenList, ToWatchList, movie_genre_association
+from app.utility_modules.omdb_client import OMDbClient, OMDbQuotaExceeded, OMDbUnavailable, fetch_all
+from app.utility_modules.omdb_cache import OMDbResponseCache, plan_refresh, DAY
+from app.utility_modules.page_cache import bump_catalog_version
+from app.utility_modules.movie_features import refresh_movie_features
+from app.utility_modules.csv_files import read_fieldnames, read_csv_rows, read_keys, write_csv_rows, dedupe
 
 # Define the file paths for the main movie dataset and the blacklist file
-CSV_FILE_PATH = os.path.join(current_dir, 'movies.csv')
-REMOVED_CSV_PATH = os.path.join(current_dir, 'blacklist.csv')
+CSV_FILE_PATH = os.path.join(current_dir, 'csv', 'movies.csv')
+REMOVED_CSV_PATH = os.path.join(current_dir, 'csv', 'blacklist.csv')
 
 # Retrieve the OMDB API key from the system environment variables
-OMDB_API_KEY = os.environ.get('OMDB_API_KEY')
-
-def parse_int(value):
-    # Helper function that extracts integers from strings by removing non-numeric characters
-    if not value or value == 'N/A':
-        return None
-    clean_val = ''.join(filter(str.isdigit, value))
-    return int(clean_val) if clean_val else None
-
-def fetch_movie_data_local(title, year=None):
+OMDB_API_KEY = app.config['OMDB_API_KEY']
+
+# OMDb field -> Movie column (the poster is handled separately)
+METADATA_COLUMNS = {
+    'rating': 'imdb_rating',
+    'rated': 'rated',
+    'runtime': 'runtime_minutes',
+    'metascore': 'meta_score',
+    'imdb_votes': 'imdb_votes',
+    'box_office': 'box_office'
+}
+
+def get_omdb_client():
     if not OMDB_API_KEY or OMDB_API_KEY == "your_omdb_api_key":
         print("❌ ERROR: OMDB_API_KEY is missing!")
         return None
 
-    params = {'apikey': OMDB_API_KEY, 't': title}
-    if year:
-        params['y'] = year
+    return OMDbClient(
+        OMDB_API_KEY,
+        base_url=app.config['OMDB_BASE_URL'],
+        requests_per_second=app.config['OMDB_REQUESTS_PER_SECOND'],
+        burst=app.config['OMDB_BURST'],
+        max_retries=app.config['OMDB_MAX_RETRIES'],
+        pool_size=app.config['OMDB_WORKERS']
+    )
 
+def fetch_movie_data_local(title, year=None):
+    # Single lookup (kept for ad-hoc use), answered from the response cache while fresh
+    cache = get_response_cache()
+    lookup = cache.get(title, year)
+    if cache.is_fresh(lookup):
+        return lookup.as_metadata()
+
+    client = get_omdb_client()
+    if client is None:
+        return None
     try:
-        response = requests.get('http://www.omdbapi.com/', params=params)
-        if response.status_code != 200:
-            print(f"   -> HTTP Error: {response.status_code}")
-            return None
-            
-        data = response.json()
-        if data.get('Response') == 'True':
-            return {
-                'poster': data.get('Poster') if data.get('Poster') != 'N/A' else None,
-                'rating': data.get('imdbRating') if data.get('imdbRating') != 'N/A' else None,
-                'rated': data.get('Rated') if data.get('Rated') != 'N/A' else None,
-                'runtime': parse_int(data.get('Runtime')),
-                'metascore': parse_int(data.get('Metascore')),
-                'imdb_votes': parse_int(data.get('imdbVotes')),
-                'box_office': parse_int(data.get('BoxOffice'))
-            }
-        else:
-            print(f"   -> OMDb Error: {data.get('Error')}")
-            return None
-    except Exception as e:
-        print(f"   -> Exception: {e}")
-    return None
+        data = client.fetch(title, year)
+    except (OMDbQuotaExceeded, OMDbUnavailable) as e:
+        print(f"   -> OMDb Error: {e}")
+        return None
+    finally:
+        cache.record_requests(client.stats['requests'])
+    cache.store(title, year, data)
+    return data
 
 def handle_csv_changes(titles_to_remove):
     """
-    Reads the main CSV file, separates the movies into kept and removed lists,
-    appends the removed items to the blacklist, and updates the main CSV file.
+    Moves the removed movies from the main CSV file to the blacklist. Both files are
+    streamed and replaced atomically, the blacklist first, so an interruption never loses a row.
     """
     if not titles_to_remove:
         return
 
     print(f"\n--- Processing CSV files for {len(titles_to_remove)} removed movies ---")
-    
-    kept_rows = []
-    removed_rows = []
-    fieldnames = []
 
-    # Read the source CSV file and split the data into kept and removed lists
-    try:
-        with open(CSV_FILE_PATH, mode='r', encoding='utf-8') as csv_file:
-            reader = csv.DictReader(csv_file, delimiter=';') 
-            fieldnames = reader.fieldnames
-            
-            for row in reader:
-                if row['title'] in titles_to_remove:
-                    removed_rows.append(row)
-                else:
-                    kept_rows.append(row)
-    except FileNotFoundError:
+    fieldnames = read_fieldnames(CSV_FILE_PATH)
+    if not fieldnames:
         print("Error: movies.csv not found. Cannot update CSV files.")
         return
 
-    # Append the data of the removed movies to the blacklist CSV file
-    file_exists = os.path.isfile(REMOVED_CSV_PATH)
-    with open(REMOVED_CSV_PATH, mode='a', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=';')
-        if not file_exists:
-            writer.writeheader() # Write the CSV header row only if the file does not already exist
-        writer.writerows(removed_rows)
+    # Only the removed rows are kept in memory
+    removed_rows = [row for row in read_csv_rows(CSV_FILE_PATH) if row['title'] in titles_to_remove]
+
+    # Append the data of the removed movies to the blacklist CSV file (rows already blacklisted are skipped)
+    def blacklist_rows():
+        yield from read_csv_rows(REMOVED_CSV_PATH, missing_ok=True)
+        yield from dedupe(removed_rows, read_keys(REMOVED_CSV_PATH))
+
+    write_csv_rows(REMOVED_CSV_PATH, read_fieldnames(REMOVED_CSV_PATH) or fieldnames, blacklist_rows())
     print(f"   -> Added {len(removed_rows)} rows to {os.path.basename(REMOVED_CSV_PATH)}")
 
-    # Overwrite the main movies CSV file with the data of the movies that remain
-    with open(CSV_FILE_PATH, mode='w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=';')
-        writer.writeheader()
-        writer.writerows(kept_rows)
+    # Rewrite the main movies CSV file with the movies that remain
+    write_csv_rows(CSV_FILE_PATH, fieldnames, (row for row in read_csv_rows(CSV_FILE_PATH) if row['title'] not in titles_to_remove))
     print(f"   -> Updated {os.path.basename(CSV_FILE_PATH)}")
 
 
-def update_and_clean_movies():
+def metadata_values(movie_id, data):
+    # Column values for one movie (fields OMDb does not know keep their stored value)
+    values = {'id': movie_id, 'poster_url': data['poster']}
+    for field, column in METADATA_COLUMNS.items():
+        if data[field]:
+            values[column] = data[field]
+    return values
+
+def write_batch(updates, deletions):
+    """
+    Writes one batch: bulk UPDATE by primary key for the enriched movies, and one DELETE
+    for the movies without poster. Movies that already have ratings or list entries are
+    never deleted. Returns the titles of the deleted movies.
+    """
+    if updates:
+        database.session.execute(update(Movie), updates)
+
+    deleted_titles = []
+    if deletions:
+        referenced = union(
+            select(Rating.movie_id).where(Rating.movie_id.in_(deletions)),
+            select(SeenList.movie_id).where(SeenList.movie_id.in_(deletions)),
+            select(ToWatchList.movie_id).where(ToWatchList.movie_id.in_(deletions))
+        )
+        referenced_ids = set(database.session.execute(referenced).scalars())
+        deletable = [movie_id for movie_id in deletions if movie_id not in referenced_ids]
+        if deletable:
+            database.session.execute(delete(movie_genre_association).where(movie_genre_association.c.movie_id.in_(deletable)))
+            deleted_titles = database.session.execute(
+                delete(Movie).where(Movie.id.in_(deletable)).returning(Movie.title)
+            ).scalars().all()
+
+    database.session.commit()
+    return deleted_titles
+
+def get_response_cache():
+    return OMDbResponseCache(
+        app.config['OMDB_CACHE_PATH'] or os.path.join(app.instance_path, 'omdb_cache.sqlite3'),
+        volatile_ttl=app.config['OMDB_VOLATILE_TTL_DAYS'] * DAY,
+        stable_ttl=app.config['OMDB_STABLE_TTL_DAYS'] * DAY,
+        missing_ttl=app.config['OMDB_MISSING_TTL_DAYS'] * DAY
+    )
+
+def catalog_rows():
+    # (movie_id, title, year, imdb_votes, local rating count, has poster) for every movie, in one query
+    rating_counts = select(Rating.movie_id, func.count().label('ratings')).group_by(Rating.movie_id).subquery()
+    rows = database.session.execute(
+        select(Movie.id, Movie.title, Movie.release_year, Movie.imdb_votes,
+               func.coalesce(rating_counts.c.ratings, 0), Movie.poster_url)
+        .outerjoin(rating_counts, rating_counts.c.movie_id == Movie.id)
+    ).all()
+    return [(movie_id, title, year, votes, ratings, bool(poster_url))
+            for movie_id, title, year, votes, ratings, poster_url in rows]
+
+def update_and_clean_movies(budget=None):
+    """
+    Refreshes movie metadata within the daily OMDb request budget. Movies whose cached answer
+    is still fresh cost no request; due movies are fetched most urgent first (missing poster,
+    then stale and popular), and the rest waits for the next run. Movies without poster that
+    OMDb cannot complete are deleted, as before.
+    """
     titles_to_remove = set() # Initialize a set to track the titles of movies that need to be removed from the CSV
 
     with app.app_context():
-        movies = Movie.query.filter(
-            (Movie.poster_url == None) | (Movie.poster_url == '')
-        ).all()
-        
-        total = len(movies)
-        print(f"--- Starting cleanup for {total} movies without posters ---")
-        
-        updated_count = 0
-        deleted_count = 0
+        cache = get_response_cache()
+        client = get_omdb_client()
+
+        budget = app.config['OMDB_DAILY_REQUEST_BUDGET'] if budget is None else budget
+        remaining = max(0, budget - cache.requests_used_today()) if client else 0
+
+        # Plain tuples instead of ORM objects: the fetch threads never touch the session
+        movies = catalog_rows()
+        catalog = {movie_id: (title, year, has_poster) for movie_id, title, year, _, _, has_poster in movies}
+        to_fetch, cached = plan_refresh(cache, movies, remaining)
+        due_count = sum(1 for movie_id in catalog if movie_id not in cached)
 
-        for index, movie in enumerate(movies):
-            print(f"[{index + 1}/{total}] Processing: {movie.title} ({movie.release_year})...")
-            
-            data = fetch_movie_data_local(movie.title, movie.release_year)
-            got_poster = False
+        workers = app.config['OMDB_WORKERS']
+        batch_size = app.config['OMDB_WRITE_BATCH_SIZE']
+        print(f"--- {len(movies)} movies: {len(cached)} fresh in cache, {due_count} due, {len(to_fetch)} fetched now "
+              f"(budget {remaining} requests left today, {workers} workers) ---")
 
+        updated_count = 0
+        deleted_count = 0
+        failed_count = 0
+        updates, deletions = [], []
+        started = time.time()
+
+        def flush():
+            nonlocal deleted_count
+            deleted_titles = write_batch(updates, deletions)
+            titles_to_remove.update(deleted_titles)
+            deleted_count += len(deleted_titles)
+            updates.clear()
+            deletions.clear()
+
+        def apply(movie_id, data):
+            # Movies with poster get the refreshed values; movies without one are completed or deleted
+            nonlocal updated_count
+            title, year, has_poster = catalog[movie_id]
             if data and data.get('poster'):
-                movie.poster_url = data['poster']
-                if data['rating']: movie.imdb_rating = data['rating']
-                if data['rated']: movie.rated = data['rated']
-                if data['runtime']: movie.runtime_minutes = data['runtime']
-                if data['metascore']: movie.meta_score = data['metascore']
-                if data['imdb_votes']: movie.imdb_votes = data['imdb_votes']
-                if data['box_office']: movie.box_office = data['box_office']
-                
+                updates.append(metadata_values(movie_id, data))
                 updated_count += 1
-                got_poster = True
-                print("   -> Updated.")
-            
-            if not got_poster:
-                print(f"   -> No poster. Deleting '{movie.title}' from DB & moving to removed list.")
-                # Add the title to the list of movies to be removed from the CSV files
-                titles_to_remove.add(movie.title)
-                # Delete the movie record from the database
-                database.session.delete(movie)
-                deleted_count += 1
-
-            if (index + 1) % 10 == 0:
-                database.session.commit()
-
-            time.sleep(0.3)
-
-        database.session.commit()
-        print(f"--- DB FINISHED! Updated: {updated_count} | Deleted from DB: {deleted_count} ---")
+            elif not has_poster:
+                print(f"{title} ({year}): no poster, deleting from DB & moving to removed list.")
+                deletions.append(movie_id)
+
+            if len(updates) + len(deletions) >= batch_size:
+                flush()
+
+        # Movies without poster that the cache can answer (e.g. after a database rebuild) cost no request
+        for movie_id, lookup in cached.items():
+            if not catalog[movie_id][2]:
+                apply(movie_id, lookup.as_metadata())
+
+        try:
+            if to_fetch:
+                for index, (movie_id, data, error) in enumerate(fetch_all(client, to_fetch, workers)):
+                    title, year, _ = catalog[movie_id]
+                    if error:
+                        # Transient failure: leave the movie for the next run instead of deleting it
+                        print(f"[{index + 1}/{len(to_fetch)}] {title} ({year}): failed after retries ({error}), skipped.")
+                        failed_count += 1
+                        continue
+
+                    cache.store(title, year, data)
+                    apply(movie_id, data)
+                    if (index + 1) % batch_size == 0:
+                        print(f"   -> {index + 1}/{len(to_fetch)} fetched ({(index + 1) / (time.time() - started):.1f} movies/s)")
+        except OMDbQuotaExceeded as e:
+            print(f"❌ OMDb quota reached ({e}); saving progress and stopping.")
+        finally:
+            flush()
+            if client:
+                cache.record_requests(client.stats['requests'])
+
+        if updated_count or deleted_count:
+            # Recompute the recommender features from the new metadata
+            refresh_movie_features(database.session.connection())
+            database.session.commit()
+            # Invalidate the cached catalog and movie pages
+            bump_catalog_version()
+        requests_made = client.stats['requests'] if client else 0
+        print(f"--- DB FINISHED in {time.time() - started:.1f}s! Updated: {updated_count} | Deleted from DB: {deleted_count} "
+              f"| Failed: {failed_count} | OMDb requests: {requests_made} | Still due: {due_count - len(to_fetch) + failed_count} ---")
         
         # Update the CSV files if any movies were deleted from the database
         if deleted_count > 0:
             handle_csv_changes(titles_to_remove)
 
 if __name__ == "__main__":
-    update_and_clean_movies()
+    parser = argparse.ArgumentParser(description='Refresh movie metadata from OMDb')
+    parser.add_argument('--budget', type=int, help='daily request budget (default: OMDB_DAILY_REQUEST_BUDGET)')
+    args = parser.parse_args()
+    update_and_clean_movies(args.budget)
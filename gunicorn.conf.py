@@ -0,0 +1,66 @@
+# Gunicorn loads this file automatically from the working directory
+# Production serving profile: the application (torch, sklearn, the recommender catalog vectors) is loaded
+# and warmed up once in the master and shared copy-on-write by the forked workers; each worker then runs
+# its own warm-up (database connections) before it accepts a single connection.
+import gc
+import os
+import shutil
+
+bind = '0.0.0.0:5000'
+
+# Threaded workers: requests mostly wait on the database, so threads add concurrency without another copy
+# of the process memory; a few processes keep the CPU-bound recommender off a single GIL
+worker_class = 'gthread'
+workers = int(os.environ.get('GUNICORN_WORKERS') or os.cpu_count() or 2)
+threads = int(os.environ.get('GUNICORN_THREADS') or 4)
+
+# Seconds a busy worker may go silent before it is killed, and to finish requests on shutdown/restart
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 60)
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT') or 30)
+# Caddy reuses its upstream connections
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE') or 5)
+
+# Workers are replaced after this many requests (bounds slow leaks); the jitter spreads the restarts
+# so the workers do not all recycle at the same moment
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS') or 1000)
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER') or 100)
+
+# Development only: restart the workers on code changes (the code must then be loaded per worker)
+reload = os.environ.get('GUNICORN_RELOAD') == 'True'
+preload_app = not reload
+
+# Every worker writes its metrics to files in this directory and /metrics merges them
+# (prometheus_client multiprocess mode); set before the application is imported. With preload_app the
+# master imports it before on_starting, so the directory is emptied here, once per master process
+# (a configuration reload on SIGHUP runs this file again and must not delete the live files)
+metrics_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/parallax_metrics')
+if os.environ.get('PARALLAX_METRICS_DIR_OWNER') != str(os.getpid()):
+    os.environ['PARALLAX_METRICS_DIR_OWNER'] = str(os.getpid())
+    # Start from an empty directory so values of a previous run are not merged in
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def on_starting(server):
+    # The application is imported (preload_app) but the port is not open and no worker exists yet:
+    # build the shared state, so the server only starts listening once it can answer warm
+    if not preload_app:
+        return
+    from app.utility_modules.warmup import warm_up_app
+    server.log.info("Application warmed up in %.2fs", warm_up_app())
+
+    # Move everything allocated so far out of the garbage collector's reach, so collections in the
+    # workers do not write to (and copy) the shared pages
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Runs in the worker before it accepts connections, so no request ever reaches a cold worker
+    from app.utility_modules.warmup import warm_up_worker
+    worker.log.info("Worker %s warmed up in %.2fs", worker.pid, warm_up_worker())
+
+
+def child_exit(server, worker):
+    # Drop the live-only files of a dead worker (counters and histograms are kept)
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
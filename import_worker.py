@@ -0,0 +1,16 @@
+from dotenv import load_dotenv
+
+# Load environment variables from the .env file to configure the application
+load_dotenv()
+
+# Import the Flask application instance and the import worker loop
+from app import app, database
+from app.utility_modules.ratings_importer import run_import_worker
+
+if __name__ == '__main__':
+    # Make sure the import_job table exists before polling it
+    with app.app_context():
+        database.create_all()
+
+    # Process uploaded rating imports until the process is stopped
+    run_import_worker()
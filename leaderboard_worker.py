@@ -0,0 +1,16 @@
+from dotenv import load_dotenv
+
+# Load environment variables from the .env file to configure the application
+load_dotenv()
+
+# Import the Flask application instance and the leaderboard refresh loop
+from app import app, database
+from app.utility_modules.leaderboards import run_leaderboard_worker
+
+if __name__ == '__main__':
+    # Make sure the rollup tables exist before refreshing them
+    with app.app_context():
+        database.create_all()
+
+    # Refresh the leaderboards on a schedule until the process is stopped
+    run_leaderboard_worker()
@@ -0,0 +1,16 @@
+from dotenv import load_dotenv
+
+# Load environment variables from the .env file to configure the application
+load_dotenv()
+
+# Import the Flask application instance and the mail worker loop
+from app import app, database
+from app.utility_modules.mail_dispatcher import run_mail_worker
+
+if __name__ == '__main__':
+    # Make sure the outbox table exists before polling it
+    with app.app_context():
+        database.create_all()
+
+    # Deliver queued emails in batches until the process is stopped
+    run_mail_worker()
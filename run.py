@@ -6,6 +6,9 @@ load_dotenv()
 
 # Import the Flask application instance and the database object from the app package
 from app import app, database
+from app.utility_modules.mail_dispatcher import start_mail_worker_thread
+from app.utility_modules.ratings_importer import start_import_worker_thread
+from app.utility_modules.warmup import warm_up_app, warm_up_worker
 
 if __name__ == '__main__':
     # Check if the script is executed directly rather than being imported as a module
@@ -17,6 +20,19 @@ if __name__ == '__main__':
         database.create_all()
         print("Database tables were created successfully.")     # Print a confirmation message to the console
     
+    # Optionally deliver queued emails from this process (only in the reloader child, not in the watcher)
+    if app.config['MAIL_WORKER_THREAD'] and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_mail_worker_thread()
+
+    # Same for uploaded rating imports
+    if app.config['IMPORT_WORKER_THREAD'] and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_import_worker_thread()
+
+    # Warm up the serving process (the reloader child) like a Gunicorn worker, so /readyz reports ready
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_up_app()
+        warm_up_worker()
+
     # Start the Flask development server with debugging enabled
     app.run(debug=True)
     print("Application is running locally.")